@@ -1,6 +1,6 @@
 "use client";
 
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import {
   AlertCircle,
   ChevronDown,
@@ -28,10 +28,12 @@ import {
   Tooltip,
   CartesianGrid,
 } from "recharts";
-import type { PredictionState } from "@/lib/type";
+import type { PredictionState, TopContributor } from "@/lib/type";
 
 export interface BlackoutPredictionProps {
   prediction?: PredictionState;
+  // dipanggil saat panel kontributor terbuka dan tick tidak membawa top_contributors (skor rendah)
+  onExplain?: () => Promise<TopContributor[]>;
 }
 
 export default function BlackoutPrediction({
@@ -48,9 +50,22 @@ export default function BlackoutPrediction({
       { name: "g1_exhaust_gas_temperature_celsius", contribution: 1.50, percent: 0.081 },
     ],
   },
+  onExplain,
 }: BlackoutPredictionProps) {
   const [openPrediksi, setOpenPrediksi] = useState(false);
   const [openContrib, setOpenContrib] = useState(false);
+  const [explained, setExplained] = useState<TopContributor[]>([]);
+
+  const needExplain = openContrib && prediction.ready && !prediction.top_contributors?.length;
+  useEffect(() => {
+    if (!needExplain || !onExplain) return;
+    let live = true;
+    onExplain().then((top) => live && setExplained(top));
+    return () => {
+      live = false;
+    };
+  }, [needExplain, onExplain, prediction.score]);
+  const contributors = prediction.top_contributors?.length ? prediction.top_contributors : explained;
 
   // Simulasi data 1 jam terakhir
   const historyData = Array.from({ length: 12 }).map((_, i) => ({
@@ -225,8 +240,8 @@ export default function BlackoutPrediction({
             </CollapsibleTrigger>
 
             <CollapsibleContent className="mt-3 rounded-lg border bg-card/40 p-4 space-y-3">
-              {prediction.top_contributors && prediction.top_contributors.length > 0 ? (
-                prediction.top_contributors.map((c, i) => (
+              {contributors.length > 0 ? (
+                contributors.map((c, i) => (
                   <div
                     key={i}
                     className="flex items-center justify-between border-b border-border pb-1"
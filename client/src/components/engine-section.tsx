@@ -37,7 +37,7 @@ function statusStyle(s?: "operational" | "warning" | "critical") {
 }
 
 export default function EngineSection() {
-  const { data } = useSocketData();
+  const { data, explain } = useSocketData();
   const status = "operational";
   const sStyle = useMemo(() => statusStyle(status), [status]);
   const SIcon = sStyle.Icon;
@@ -120,7 +120,7 @@ export default function EngineSection() {
         </div>
 
         {/* Komponen prediksi blackout tetap */}
-        <BlackoutPrediction prediction={data?.prediction} />
+        <BlackoutPrediction prediction={data?.prediction} onExplain={explain} />
 
         {/* 🔹 Kotak bawah sekarang jadi notifikasi aktif */}
         <div
@@ -1,22 +1,63 @@
 "use client";
 
+import { FrameDecoder, type FrameSchema } from "@/lib/frames";
 import { getSocket } from "@/lib/socket-client";
-import { JsonDataFormat } from "@/lib/type";
-import { useEffect, useMemo, useState } from "react";
+import { DriftReport, JsonDataFormat, RecentHistory, TopContributor } from "@/lib/type";
+import { useCallback, useEffect, useMemo, useState } from "react";
+
+// Riwayat di memori tab dibatasi; riwayat panjang ada di server (store).
+const MAX_HISTORY = 600;
+
+type HistoryMessage = { vessel: string; columns: string[]; n: number; ts: ArrayBuffer; values: ArrayBuffer };
+
+// ts: float64 (n,), values: float32 (n, columns) row-major, little-endian
+function decodeHistory(msg: HistoryMessage): RecentHistory {
+    const n = msg.n;
+    const C = msg.columns.length;
+    const tsView = new DataView(msg.ts);
+    const valView = new DataView(msg.values);
+    const ts = new Float64Array(n);
+    const values = msg.columns.map(() => new Float32Array(n));
+    for (let i = 0; i < n; i++) {
+        ts[i] = tsView.getFloat64(i * 8, true);
+        for (let c = 0; c < C; c++) values[c][i] = valView.getFloat32((i * C + c) * 4, true);
+    }
+    return { vessel: msg.vessel, columns: msg.columns, ts, values };
+}
 
 export function useSocketData() {
     const [data, setData] = useState<JsonDataFormat>();
     const [historicalData, setHistoricalData] = useState<JsonDataFormat[]>([]);
+    const [history, setHistory] = useState<RecentHistory>();
+    const [drift, setDrift] = useState<DriftReport>();
 
     useEffect(() => {
         const s = getSocket();
         const onData = (jsonData: JsonDataFormat) => {
             setData(jsonData);
-            setHistoricalData((prev) => [...prev, jsonData]);
+            setHistoricalData((prev) =>
+                prev.length >= MAX_HISTORY ? [...prev.slice(prev.length - MAX_HISTORY + 1), jsonData] : [...prev, jsonData]
+            );
         };
 
         s.on("telemetry", onData);
 
+        let decoder: FrameDecoder | null = null;
+        const onSchema = (schema: FrameSchema) => {
+            decoder = new FrameDecoder(schema);
+        };
+        const onFrame = (buf: ArrayBuffer) => {
+            const decoded = decoder?.decode(buf) ?? null;
+            if (decoded) onData(decoded);
+            else s.emit("frame_resync");
+        };
+        s.on("frame_schema", onSchema);
+        s.on("frame", onFrame);
+
+        const onHistory = (msg: HistoryMessage) => setHistory(decodeHistory(msg));
+        s.on("history", onHistory);
+        s.on("drift", setDrift);
+
         const onServerInfo = (_msg: unknown) => {
             console.log(_msg);
         };
@@ -24,15 +65,33 @@ export function useSocketData() {
 
         return () => {
             s.off("telemetry", onData);
+            s.off("frame_schema", onSchema);
+            s.off("frame", onFrame);
+            s.off("history", onHistory);
+            s.off("drift", setDrift);
             s.off("server_info", onServerInfo);
         };
     }, []);
 
+    // Skor di bawah explain_above x threshold datang tanpa top_contributors; minta ke server bila perlu.
+    const explain = useCallback(
+        () =>
+            new Promise<TopContributor[]>((resolve) => {
+                getSocket().emit("explain", null, (res?: { top_contributors?: TopContributor[] }) =>
+                    resolve(res?.top_contributors ?? [])
+                );
+            }),
+        []
+    );
+
     return useMemo(
         () => ({
             data,
             historicalData,
+            history,
+            drift,
+            explain,
         }),
-        [data]
+        [data, history, drift, explain]
     );
 }
@@ -0,0 +1,160 @@
+// Decoder for the compact binary telemetry frames (server/lib/frames.py).
+// The server sends "frame_schema" once, then one "frame" (ArrayBuffer) per tick:
+//   header      u8 kind (1 key, 2 delta), u8 version, u16 n_fields, u32 seq, f64 timestamp (epoch s)
+//   key body    f32[n_fields]
+//   delta body  bitmask[ceil(n/8)] + i16 per changed field (value += q * step)
+//   prediction  u8 flags (1 ready, 2 dropped, 4 pre-filter), f32 score, f32 blackout_prob, u16 stale_for, u8 k, k * (u8 idx, f32, f16)
+import type { JsonDataFormat, TelemetryGeneratorReading } from "@/lib/type";
+
+export type FrameSchema = {
+    version: number;
+    fields: string[];
+    steps: number[];
+    threshold: number;
+    constants: {
+        heavy_consumers_status: Record<string, string>;
+        maintenance_quality: Record<string, number | null>;
+    };
+};
+
+const KEY = 1;
+const HEADER_BYTES = 16;
+const MODES: Record<number, JsonDataFormat["data"]["mode"]> = {
+    1: "startup",
+    2: "stable",
+    3: "high_load",
+    4: "bad_env",
+};
+
+function f16(bits: number): number {
+    const sign = bits & 0x8000 ? -1 : 1;
+    const exp = (bits >> 10) & 0x1f;
+    const frac = bits & 0x3ff;
+    if (exp === 0) return sign * frac * 2 ** -24;
+    if (exp === 0x1f) return frac ? NaN : sign * Infinity;
+    return sign * (1 + frac / 1024) * 2 ** (exp - 15);
+}
+
+export class FrameDecoder {
+    private fields: string[];
+    private steps: Float32Array;
+    private state: Float32Array | null = null;
+    private seq: number | null = null;
+
+    constructor(private schema: FrameSchema) {
+        this.fields = schema.fields;
+        this.steps = Float32Array.from(schema.steps);
+    }
+
+    /** null = frame cannot be applied (no keyframe yet / missed a frame): emit "frame_resync". */
+    decode(buf: ArrayBuffer): JsonDataFormat | null {
+        const dv = new DataView(buf);
+        const kind = dv.getUint8(0);
+        const n = dv.getUint16(2, true);
+        const seq = dv.getUint32(4, true);
+        const ts = dv.getFloat64(8, true);
+        let off = HEADER_BYTES;
+
+        if (kind === KEY) {
+            this.state = new Float32Array(n);
+            for (let i = 0; i < n; i++, off += 4) this.state[i] = dv.getFloat32(off, true);
+        } else {
+            if (this.state === null || this.seq === null || seq !== ((this.seq + 1) >>> 0)) return null;
+            const maskOff = off;
+            off += (n + 7) >> 3;
+            for (let i = 0; i < n; i++) {
+                if (!(dv.getUint8(maskOff + (i >> 3)) & (1 << (i & 7)))) continue;
+                const q = dv.getInt16(off, true);
+                off += 2;
+                // same float32 rounding as the encoder: ref += f32(q * step)
+                this.state[i] = Math.fround(this.state[i] + Math.fround(q * this.steps[i]));
+            }
+        }
+        this.seq = seq;
+
+        const flags = dv.getUint8(off);
+        const score = dv.getFloat32(off + 1, true);
+        const prob = dv.getFloat32(off + 5, true);
+        const staleFor = dv.getUint16(off + 9, true);
+        const k = dv.getUint8(off + 11);
+        off += 12;
+        const top = [];
+        for (let j = 0; j < k; j++, off += 7) {
+            const idx = dv.getUint8(off);
+            top.push({
+                name: this.fields[idx] ?? "?",
+                contribution: dv.getFloat32(off + 1, true),
+                percent: f16(dv.getUint16(off + 5, true)),
+            });
+        }
+
+        return {
+            data: this.nested(ts),
+            prediction: {
+                ready: (flags & 1) !== 0,
+                score: Number.isNaN(score) ? (null as unknown as number) : score,
+                threshold: this.schema.threshold,
+                blackout_prob: prob,
+                top_contributors: top,
+                stale_for: staleFor,
+                engine: (flags & 1) === 0 ? null : (flags & 4) !== 0 ? "prefilter" : staleFor ? "stride" : "lstm",
+                ...((flags & 2) !== 0 ? { dropped: true } : {}),
+            },
+        };
+    }
+
+    private nested(ts: number): JsonDataFormat["data"] {
+        const val: Record<string, number | null> = {};
+        this.fields.forEach((f, i) => {
+            const v = this.state![i];
+            val[f] = Number.isNaN(v) ? null : v;
+        });
+        const mode = MODES[val["mode_code"] ?? 0] ?? ("unknown" as JsonDataFormat["data"]["mode"]);
+        const gen = (i: number): TelemetryGeneratorReading => {
+            if (!val[`g${i}_online`]) return null;
+            const p = `g${i}_`;
+            return {
+                load_kw: val[`${p}load_kw`] ?? null,
+                frequency_hz: val[`${p}frequency_hz`] ?? null,
+                lube_oil_pressure_bar: val[`${p}lube_oil_pressure_bar`] ?? null,
+                coolant_temperature_celsius: val[`${p}coolant_temperature_celsius`] ?? null,
+                exhaust_gas_temperature_celsius: val[`${p}exhaust_gas_temperature_celsius`] ?? null,
+                vibration_level_mm_s: val[`${p}vibration_level_mm_s`] ?? null,
+            };
+        };
+        const numOnline = val["num_generators_online"] ?? 0;
+        const { constants } = this.schema;
+
+        return {
+            timestamp: Number.isNaN(ts) ? new Date().toISOString() : new Date(ts * 1000).toISOString(),
+            mode,
+            num_generators_online: numOnline,
+            main_features: {
+                generator_1: gen(1),
+                generator_2: gen(2),
+                generator_3: gen(3),
+                generator_4: gen(4),
+            },
+            distribution_features: {
+                msb_total_active_power_kw: val["msb_total_active_power_kw"] ?? null,
+                msb_busbar_voltage_v: val["msb_busbar_voltage_v"] ?? null,
+            },
+            contextual_features: {
+                system_status: {
+                    num_generators_online: numOnline,
+                    pms_mode: mode,
+                    heavy_consumers_status: constants.heavy_consumers_status,
+                },
+                maintenance_quality: constants.maintenance_quality as JsonDataFormat["data"]["contextual_features"]["maintenance_quality"],
+                environmental: {
+                    wave_height_meters: val["wave_height_meters"] ?? null,
+                    wind_speed_knots: val["wind_speed_knots"] ?? null,
+                    ship_pitch_degrees: val["ship_pitch_degrees"] ?? null,
+                    ship_roll_degrees: val["ship_roll_degrees"] ?? null,
+                    wind_direction_degrees: null,
+                    ocean_current_speed_knots: null,
+                },
+            },
+        };
+    }
+}
@@ -7,6 +7,8 @@ let socket: Socket | null = null;
 export function getSocket(): Socket {
     if (!socket) {
         socket = io("http://localhost:8000", {
+            // "frames" = biner ringkas (lib/frames.ts); "json" = payload nested penuh seperti dulu
+            query: { format: process.env.NEXT_PUBLIC_TELEMETRY_FORMAT ?? "frames" },
             transports: ["websocket", "polling"],
             autoConnect: true,
             reconnection: true,
@@ -90,6 +90,10 @@ export type JsonPredictionFormat = {
         contribution: number;
         percent: number;
     }[];
+    stale_for?: number;
+    // "lstm" = scored on this tick; "prefilter" / "stride" = last score kept; null = not ready
+    engine?: "lstm" | "prefilter" | "stride" | null;
+    dropped?: boolean;
 };
 
 export type JsonDataFormat = {
@@ -103,6 +107,31 @@ export type HistoryPoint = {
     v: number; // value
 };
 
+// Recent history sent by the server on connect ("history" event), columnar
+export type RecentHistory = {
+    vessel: string;
+    columns: string[];
+    ts: Float64Array; // epoch seconds, oldest first
+    values: Float32Array[]; // one array per column, same length as ts
+};
+
+// Live feature distribution vs the scaler ("drift" event / GET /drift, server/lib/stats.py).
+// shift / spread / nan_rate: one array per horizon, in `features` order; shift in scaler units from the
+// center, spread = live std / scaler scale
+export type DriftReport = {
+    vessel: string;
+    version: string | null;
+    samples: number;
+    features: string[];
+    horizons: number[];
+    shift: number[][];
+    spread: number[][];
+    nan_rate: number[][];
+    nan_total: number[];
+    window_std: number[];
+    flagged: { name: string; horizon: number; shift: number; spread: number; nan_rate: number }[];
+};
+
 export type TopContributor = {
     name: string
     contribution: number
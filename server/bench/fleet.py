@@ -0,0 +1,80 @@
+"""
+Throughput FleetEvaluator: satu forward (B,L,D) untuk B kapal sekaligus.
+
+Jalankan dari folder server:
+    python -m bench.fleet
+    python -m bench.fleet --sizes 1 16 128 1024 --reps 5
+"""
+import argparse, time
+import numpy as np
+
+from lib.fleet import FleetEvaluator
+from lib.generator1 import SimpleShipSim, row_to_nested_json
+
+
+def make_samples(fleet: FleetEvaluator, n_rows: int, seed: int) -> np.ndarray:
+    sim = SimpleShipSim(seed=seed)
+    return fleet.core.schema.to_matrix(row_to_nested_json(sim.step()) for _ in range(n_rows))
+
+
+def fill(fleet: FleetEvaluator, n_ships: int, rows: np.ndarray) -> None:
+    # tiap kapal mulai di offset berbeda supaya window tidak identik
+    L = fleet.seq_len
+    for s in range(n_ships):
+        off = (s * 7) % (len(rows) - L)
+        for r in rows[off:off + L]:
+            fleet.push_vector(s, r)
+
+
+def bench_size(fleet: FleetEvaluator, n_ships: int, rows: np.ndarray, reps: int) -> dict:
+    fleet.buffers.clear()
+    fill(fleet, n_ships, rows)
+    fleet.evaluate()                                   # warm-up
+    times = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        res = fleet.evaluate()
+        times.append(time.perf_counter() - t0)
+    assert all(r["ready"] for r in res.values())
+    t = float(np.median(times))
+    return {"ships": n_ships, "tick_ms": t * 1e3, "ships_per_s": n_ships / t}
+
+
+def bench_loop(fleet: FleetEvaluator, n_ships: int, rows: np.ndarray, reps: int) -> float:
+    """Pembanding: satu forward (1,L,D) per kapal, seperti produce_loop sekarang."""
+    fleet.buffers.clear()
+    fill(fleet, n_ships, rows)
+    ids = list(fleet.buffers.keys())
+    times = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        for sid in ids:
+            fleet.evaluate([sid])
+        times.append(time.perf_counter() - t0)
+    return n_ships / float(np.median(times))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="FleetEvaluator throughput benchmark")
+    ap.add_argument("--artifacts", default="artifacts")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 128, 1024])
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--loop-max", type=int, default=128, help="bandingkan dengan loop per kapal sampai B ini")
+    args = ap.parse_args()
+
+    fleet = FleetEvaluator(artifacts_dir=args.artifacts)
+    rows = make_samples(fleet, n_rows=fleet.seq_len + 400, seed=346)
+
+    print(f"{'B':>6} {'tick ms':>10} {'ships/s':>12} {'loop ships/s':>14} {'speedup':>8}")
+    for B in args.sizes:
+        r = bench_size(fleet, B, rows, args.reps)
+        if B <= args.loop_max:
+            loop = bench_loop(fleet, B, rows, max(1, args.reps // 2))
+            extra = f"{loop:14.1f} {r['ships_per_s'] / loop:7.1f}x"
+        else:
+            extra = f"{'-':>14} {'-':>8}"
+        print(f"{B:6d} {r['tick_ms']:10.2f} {r['ships_per_s']:12.1f} {extra}")
+
+
+if __name__ == "__main__":
+    main()
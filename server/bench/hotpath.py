@@ -0,0 +1,211 @@
+"""
+Micro-benchmark + regression gate untuk jalur per-tick telemetry.
+
+Tiap stage diukur sendiri-sendiri dan end-to-end: served_tick = jalur yang dijalankan server per tick,
+make_sample -> InferenceWorker.submit (thread inference) -> record_tick (metrik, frame, enqueue store, ring)
+-> emit_tick (tanpa client terhubung), di event loop milik bench. Latency p50/p90/p99 (us) dan alokasi heap
+Python per panggilan (tracemalloc; alokasi torch di C++ tidak terhitung).
+
+Jalankan dari folder server:
+    python -m bench.hotpath                       # tampilkan hasil
+    python -m bench.hotpath --save                # tulis bench/baseline.json
+    python -m bench.hotpath --check               # bandingkan p50 dengan baseline, exit 1 bila regresi
+    python -m bench.hotpath --check --max-regression 15 --stages model_forward served_tick
+"""
+import argparse, asyncio, atexit, json, os, platform, shutil, sys, tempfile, time, tracemalloc
+import numpy as np
+import torch
+
+from lib.pred import LSTMAE_Evaluator
+from lib.generator1 import SimpleShipSim, row_to_nested_json
+from lib.frames import FrameEncoder
+from lib.history import RecentRing
+from lib.inference import InferenceWorker
+from lib.store import StoreWriter, TimeSeriesStore
+from server import KEYFRAME_EVERY, data_check, emit_tick, flatten_nested_for_model, make_sample, record_tick
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def served_tick(pred: LSTMAE_Evaluator, data_generator: SimpleShipSim):
+    """
+    Satu tick produce_loop + consume_loop tanpa sleep, sebagai callable tanpa argumen. Store ke folder
+    sementara (dihapus saat exit), worker + writer ditutup saat exit.
+    """
+    loop = asyncio.new_event_loop()
+    worker = InferenceWorker(pred, maxsize=8)
+    store_dir = tempfile.mkdtemp(prefix="hotpath-store-")
+    writer = StoreWriter(TimeSeriesStore(store_dir, pred.feature_cols))
+    encoder = FrameEncoder(pred.feature_cols, pred.threshold, keyframe_every=KEYFRAME_EVERY)
+    ring = RecentRing(600, list(pred.feature_cols) + ["score", "blackout_prob"])
+
+    async def tick():
+        nested, vec = make_sample(worker.pred, data_generator)
+        out = await worker.submit(vec)
+        payload, frame = record_tick(encoder, writer, ring, nested, vec, out)
+        await emit_tick(encoder, payload, frame, False)
+
+    def close():
+        worker.close()
+        writer.close()
+        loop.close()
+        shutil.rmtree(store_dir, ignore_errors=True)
+    atexit.register(close)
+    return lambda: loop.run_until_complete(tick())
+
+
+def build_stages(pred: LSTMAE_Evaluator) -> dict:
+    """name -> zero-arg callable. Inputs are prepared once so each stage is measured alone."""
+    sim = SimpleShipSim(seed=346)
+    for _ in range(300):                       # lewati startup, semua generator sudah aktif/berubah
+        sim.step()
+    row = sim.step()
+    nested = row_to_nested_json(row)
+    flat = flatten_nested_for_model(nested, pred.feature_cols)
+    checked = data_check(dict(flat), nested, pred)
+
+    tick = served_tick(LSTMAE_Evaluator(artifacts_dir=pred.art_dir, device=pred.device), SimpleShipSim(seed=346))
+    for _ in range(pred.seq_len):             # window penuh: tiap tick berikutnya di-score
+        tick()
+
+    raw = np.stack([pred.schema.to_vector(row_to_nested_json(sim.step())) for _ in range(pred.seq_len)])
+    window = raw.copy()
+    pred._impute_scale_rows(window)
+    x = torch.from_numpy(window).unsqueeze(0).to(pred.device)
+    with torch.no_grad():
+        recon = pred.model(x)
+    for v in raw:
+        pred.push_vector(v)
+
+    def forward():
+        with torch.no_grad():
+            return pred.model(x)
+
+    def score():
+        with torch.no_grad():
+            return pred._score_with_explanations(x, recon)
+
+    def kernel():
+        with torch.no_grad():
+            return pred._score_batch(x, recon, explain=False)
+
+    return {
+        "sim_step": sim.step,
+        "row_to_nested_json": lambda: row_to_nested_json(row),
+        "flatten_nested_for_model": lambda: flatten_nested_for_model(nested, pred.feature_cols),
+        "data_check": lambda: data_check(dict(flat), nested, pred),
+        "vectorize": lambda: pred.vectorize(checked),
+        "schema_to_vector": lambda: pred.schema.to_vector(nested),
+        "impute_scale_window": lambda: pred._impute_scale_inplace(raw.copy()),
+        "model_forward": forward,
+        "score_with_explanations": score,
+        "score_kernel": kernel,
+        "push_vector_and_eval": lambda: pred.push_vector_and_eval(raw[-1]),
+        "served_tick": tick,
+    }
+
+
+def timings(fn, n: int) -> np.ndarray:
+    ts = np.empty(n)
+    clock = time.perf_counter_ns
+    for i in range(n):
+        t0 = clock(); fn(); ts[i] = clock() - t0
+    return ts / 1e3                               # us
+
+
+def allocations(fn, alloc_calls: int) -> int:
+    tracemalloc.start()
+    allocs = []
+    for _ in range(alloc_calls):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        allocs.append(peak - base)
+    tracemalloc.stop()
+    return int(np.median(allocs))
+
+
+def measure_all(stages: dict, names: list, n: int, rounds: int, warmup: int, alloc_calls: int) -> dict:
+    """
+    Stages run round-robin in `rounds` rounds of n/rounds calls, so host noise (CPU steal, frequency
+    changes) hits every stage alike. p50_us is the best per-round median -- the figure the gate uses;
+    p90/p99 are over all calls.
+    """
+    for name in names:
+        for _ in range(warmup):
+            stages[name]()
+    per = max(1, n // rounds)
+    samples = {name: [] for name in names}
+    for _ in range(rounds):
+        for name in names:
+            samples[name].append(timings(stages[name], per))
+
+    out = {}
+    for name in names:
+        ts = np.concatenate(samples[name])
+        out[name] = {
+            "n": int(ts.size),
+            "mean_us": float(ts.mean()),
+            "p50_us": float(min(np.median(r) for r in samples[name])),
+            "p90_us": float(np.percentile(ts, 90)),
+            "p99_us": float(np.percentile(ts, 99)),
+            "alloc_bytes": allocations(stages[name], alloc_calls),
+        }
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Hot-path micro-benchmarks with a baseline regression gate")
+    ap.add_argument("--artifacts", default="artifacts")
+    ap.add_argument("-n", type=int, default=300, help="panggilan per stage")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=30)
+    ap.add_argument("--alloc-calls", type=int, default=20)
+    ap.add_argument("--stages", nargs="*", help="subset stage (default: semua)")
+    ap.add_argument("--threads", type=int, default=1, help="torch.set_num_threads (1 = stabil antar mesin)")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save", action="store_true", help="simpan hasil sebagai baseline")
+    ap.add_argument("--check", action="store_true", help="gagal bila p50 stage naik melebihi --max-regression")
+    ap.add_argument("--max-regression", type=float, default=25.0, help="persen")
+    args = ap.parse_args()
+
+    torch.set_num_threads(args.threads)
+    pred = LSTMAE_Evaluator(artifacts_dir=args.artifacts, device="cpu")
+    stages = build_stages(pred)
+    names = args.stages or list(stages)
+
+    results = measure_all(stages, names, args.n, args.rounds, args.warmup, args.alloc_calls)
+    print(f"{'stage':<26} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'alloc B':>9}")
+    for name, r in results.items():
+        print(f"{name:<26} {r['p50_us']:10.1f} {r['p90_us']:10.1f} {r['p99_us']:10.1f} {r['alloc_bytes']:9d}")
+
+    if args.save:
+        doc = {"host": platform.node(), "python": platform.python_version(), "torch": torch.__version__,
+               "threads": args.threads, "stages": results}
+        with open(args.baseline, "w") as f:
+            json.dump(doc, f, indent=4)
+        print(f"baseline -> {args.baseline}")
+
+    if args.check:
+        with open(args.baseline) as f:
+            base = json.load(f)["stages"]
+        failed = []
+        for name, r in results.items():
+            if name not in base:            # stage baru: tidak boleh lolos tanpa baseline
+                print(f"{name:<26} tidak ada di baseline: jalankan --save")
+                failed.append(name)
+                continue
+            change = (r["p50_us"] / base[name]["p50_us"] - 1.0) * 100.0
+            flag = "REGRESSION" if change > args.max_regression else "ok"
+            print(f"{name:<26} {base[name]['p50_us']:10.1f} -> {r['p50_us']:10.1f} us ({change:+6.1f}%) {flag}")
+            if change > args.max_regression:
+                failed.append(name)
+        if failed:
+            print(f"FAILED: {len(failed)} stage(s) regressed more than {args.max_regression:.0f}% or have no baseline: "
+                  f"{', '.join(failed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Load generator untuk bulk ingest: FleetShipSim berperan sebagai kapal-kapal yang mengirim batch.
+
+Tiap sender mewakili sekelompok kapal; tiap request berisi `--batch` sampel per kapal. Default
+in-process (ASGI transport ke server.asgi_app, tanpa socket); --url untuk server yang sedang jalan.
+
+Jalankan dari folder server:
+    python -m bench.ingest
+    python -m bench.ingest --vessels 200 --senders 8 --batch 30 --requests 20
+    python -m bench.ingest --url http://localhost:8000
+"""
+import argparse, asyncio, json, time
+import numpy as np
+import httpx
+
+from lib.generator1 import FleetShipSim, row_to_nested_json
+
+
+def make_bodies(vessel_ids, n_requests: int, batch: int, seed: int) -> list:
+    """Pre-generated request bodies (bytes) so the generator itself is not measured."""
+    sim = FleetShipSim(n_ships=len(vessel_ids), seed=seed)
+    bodies = []
+    for _ in range(n_requests):
+        docs = {vid: [] for vid in vessel_ids}
+        for _ in range(batch):
+            for vid, row in zip(vessel_ids, sim.step()):
+                docs[vid].append(row_to_nested_json(row))
+        bodies.append(json.dumps({"vessels": docs}).encode())
+    return bodies
+
+
+async def sender(client: httpx.AsyncClient, bodies: list, latencies: list) -> int:
+    n = 0
+    for body in bodies:
+        t0 = time.perf_counter()
+        r = await client.post("/ingest", content=body, headers={"content-type": "application/json"})
+        latencies.append(time.perf_counter() - t0)
+        r.raise_for_status()
+        n += r.json()["samples"]
+    return n
+
+
+async def run(args) -> None:
+    groups = [[f"ship-{s}-{v}" for v in range(s, args.vessels, args.senders)] for s in range(args.senders)]
+    groups = [g for g in groups if g]
+    print(f"membuat {args.requests} request x {len(groups)} sender ...")
+    bodies = [make_bodies(g, args.requests, args.batch, seed=i) for i, g in enumerate(groups)]
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+    else:
+        import server
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.asgi_app), base_url="http://bench",
+                                   timeout=120)
+    async with client:
+        # warm-up: load model + isi window supaya pengukuran = steady state
+        await client.post("/ingest", content=bodies[0][0], headers={"content-type": "application/json"})
+        latencies = []
+        t0 = time.perf_counter()
+        counts = await asyncio.gather(*(sender(client, b[1:], latencies) for b in bodies))
+        elapsed = time.perf_counter() - t0
+
+    lat = np.array(latencies) * 1e3
+    total = sum(counts)
+    print(f"{total} sampel, {len(lat)} request dalam {elapsed:.2f}s -> {total / elapsed:.0f} sampel/s")
+    print(f"latency request: p50 {np.percentile(lat, 50):.1f} ms, p99 {np.percentile(lat, 99):.1f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk ingest load generator (FleetShipSim)")
+    ap.add_argument("--url", default=None, help="server yang sedang jalan (default: in-process)")
+    ap.add_argument("--vessels", type=int, default=100)
+    ap.add_argument("--senders", type=int, default=4, help="request paralel")
+    ap.add_argument("--batch", type=int, default=20, help="sampel per kapal per request")
+    ap.add_argument("--requests", type=int, default=10, help="request per sender")
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Pre-filter (lib/prefilter.py) vs LSTM tiap sampel: CPU yang dihemat per kapal dan delay deteksi anomali.
+
+Tiap kapal = satu stream (SimpleShipSim seed berbeda, atau rekaman --recording lewat ReplaySource). Per jenis
+anomali stream diputar ulang dengan anomali disuntikkan mulai tick `inject`, sekali dengan LSTM tiap sampel
+(perilaku lama, stride 1) dan sekali dengan pre-filter. Alarm = skor yang dilaporkan (boleh stale) melewati
+max(threshold, skor maksimum 60 tick sebelum injeksi) * margin, sama dengan bench/stride.py.
+Exit 1 bila ada anomali yang terdeteksi lebih lambat dengan pre-filter, atau bila CPU yang dihemat (semua kapal)
+di bawah --min-saving: pre-filter (config.json "prefilter" / env PREFILTER) sebaiknya hanya diaktifkan bila lolos.
+
+Jalankan dari folder server:
+    python -m bench.prefilter
+    python -m bench.prefilter --vessels 5 --background-stride 20
+    python -m bench.prefilter --recording data/recording.parquet
+"""
+import argparse, sys, time
+import numpy as np
+
+from lib.pred import LSTMAE_Evaluator
+from lib.generator1 import SimpleShipSim, row_to_nested_json
+
+
+def _ramp(n: int, per_tick: float) -> np.ndarray:
+    return np.arange(1, n + 1) * per_tick
+
+
+# nama -> fungsi(rows setelah injeksi (n,D) raw, name_to_idx), mengubah in place
+ANOMALIES = {
+    "oil_freq_step": lambda r, i: (r[:, i["g1_lube_oil_pressure_bar"]].__imul__(0.4),
+                                   r[:, i["g1_frequency_hz"]].__isub__(0.8)),
+    "voltage_sag": lambda r, i: r[:, i["msb_busbar_voltage_v"]].__imul__(0.93),
+    "coolant_drift": lambda r, i: r[:, i["g1_coolant_temperature_celsius"]].__iadd__(_ramp(len(r), 0.08)),
+    "vibration": lambda r, i: r[:, i["g1_vibration_level_mm_s"]].__imul__(3.0),
+    "freq_oscillation": lambda r, i: r[:, i["g1_frequency_hz"]].__iadd__(0.6 * np.sin(np.arange(len(r)) / 2.0)),
+}
+
+
+def sim_stream(ev: LSTMAE_Evaluator, seed: int, n_ticks: int) -> np.ndarray:
+    sim = SimpleShipSim(seed=seed)
+    return ev.schema.to_matrix(row_to_nested_json(sim.step()) for _ in range(n_ticks))
+
+
+def recording_stream(ev: LSTMAE_Evaluator, path: str, n_ticks: int) -> np.ndarray:
+    from lib.replay import ReplaySource
+    src = ReplaySource(path, ev.feature_cols, loop=True)
+    return ev.schema.to_matrix(row_to_nested_json(src.step()) for _ in range(n_ticks))
+
+
+def run(ev: LSTMAE_Evaluator, rows: np.ndarray, prefilter) -> tuple:
+    """Skor yang dilaporkan per tick, CPU detik, jumlah evaluasi LSTM."""
+    ev.prefilter = prefilter
+    ev.reset()
+    scores = np.zeros(rows.shape[0])
+    fresh = 0
+    t0 = time.process_time()
+    for t, vec in enumerate(rows):
+        out = ev.push_vector_and_eval(vec)
+        if out["ready"]:
+            scores[t] = out["score"]
+            fresh += out["engine"] == "lstm"
+    return scores, time.process_time() - t0, fresh
+
+
+def delay(ev: LSTMAE_Evaluator, scores: np.ndarray, inject: int, margin: float) -> float:
+    level = max(ev.threshold, float(scores[inject - 60:inject].max())) * margin
+    hit = np.nonzero(scores[inject:] > level)[0]
+    return float(hit[0]) if hit.size else np.inf
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pre-filter: CPU saved per vessel vs detection delay")
+    ap.add_argument("--artifacts", default="artifacts")
+    ap.add_argument("--vessels", type=int, default=3, help="stream simulator (seed 200..)")
+    ap.add_argument("--recording", nargs="*", default=[], help="rekaman (lib/replay.py), satu kapal per file")
+    ap.add_argument("--ticks", type=int, default=800)
+    ap.add_argument("--inject", type=int, default=600)
+    ap.add_argument("--margin", type=float, default=1.05)
+    ap.add_argument("--background-stride", type=int, default=None)
+    ap.add_argument("--anomalies", nargs="*", default=list(ANOMALIES))
+    ap.add_argument("--min-saving", type=float, default=0.1, help="hemat CPU bersih minimum agar lolos (0.1 = 10%%)")
+    args = ap.parse_args()
+
+    ev = LSTMAE_Evaluator(artifacts_dir=args.artifacts, device="cpu", stride=1, prefilter=False)
+    settings = {} if args.background_stride is None else {"background_stride": args.background_stride}
+    from lib.prefilter import StreamingPrefilter
+    pf = StreamingPrefilter.for_evaluator(ev, **settings)
+
+    vessels = [(f"sim-{200 + k}", sim_stream(ev, 200 + k, args.ticks)) for k in range(args.vessels)]
+    vessels += [(path, recording_stream(ev, path, args.ticks)) for path in args.recording]
+
+    print(f"{'vessel':<14} {'anomaly':<17} {'LSTM runs':>9} {'cpu ms/sample':>14} {'saved':>6} "
+          f"{'delay lama':>10} {'delay pf':>8}")
+    later = []
+    total_base = total_pf = 0.0
+    for name, clean in vessels:
+        cpu_base = cpu_pf = 0.0
+        n = 0
+        for kind in args.anomalies:
+            rows = clean.copy()
+            ANOMALIES[kind](rows[args.inject:], ev.name_to_idx)
+            s_base, c_base, _ = run(ev, rows, None)
+            s_pf, c_pf, runs = run(ev, rows, pf)
+            d_base, d_pf = delay(ev, s_base, args.inject, args.margin), delay(ev, s_pf, args.inject, args.margin)
+            if d_pf > d_base:
+                later.append((name, kind, d_base, d_pf))
+            cpu_base += c_base; cpu_pf += c_pf; n += rows.shape[0]
+            print(f"{name:<14} {kind:<17} {runs / rows.shape[0]:9.1%} "
+                  f"{c_base / rows.shape[0] * 1e3:6.3f} -> {c_pf / rows.shape[0] * 1e3:5.3f} "
+                  f"{1 - c_pf / c_base:6.0%} {d_base:10.0f} {d_pf:8.0f}")
+        print(f"{name:<14} {'(total)':<17} {'':>9} {cpu_base / n * 1e3:6.3f} -> {cpu_pf / n * 1e3:5.3f} "
+              f"{1 - cpu_pf / cpu_base:6.0%}")
+        total_base += cpu_base; total_pf += cpu_pf
+    print("trip pre-filter:", pf.trips)
+
+    saving = 1 - total_pf / total_base
+    for name, kind, a, b in later:
+        print(f"LEBIH LAMBAT: {name} {kind}: {a:.0f} -> {b:.0f} tick")
+    if not later:
+        print("tidak ada anomali yang terdeteksi lebih lambat dengan pre-filter")
+    print(f"hemat CPU bersih {saving:.0%} (minimum {args.min_saving:.0%})")
+    if later or saving < args.min_saving:
+        print("jangan aktifkan pre-filter untuk data ini")
+        sys.exit(1)
+    print('lolos: pre-filter boleh diaktifkan ("prefilter": true di config.json atau PREFILTER=1)')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark cold start server.py: time-to-listening dan time-to-first-score, diukur dari luar proses.
+
+Tiap run menjalankan `python server.py` sebagai proses baru (port sendiri, STORE_DIR kosong) dan mengukur:
+  listening    sampai port menerima koneksi TCP
+  first score  sampai /metrics memuat startup_seconds{phase="first_score"} (poll tiap --poll ms)
+plus fase internal dari startup_seconds (model_loaded, first_score; dihitung sejak import server.py).
+
+Skor pertama butuh window penuh. Run pemanasan (TICK_RATE_HZ tinggi) mengisi window dan menyimpan
+snapshot ke STATE_DIR sementara, jadi run yang diukur langsung mendapat skor di tick pertama (= restart).
+
+Jalankan dari folder server:
+    python -m bench.startup
+    python -m bench.startup --runs 5 --port 8765
+"""
+import argparse, os, re, signal, socket, subprocess, sys, tempfile, time
+import numpy as np
+import httpx
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PHASE = re.compile(r'^startup_seconds\{phase="(\w+)"\} (\S+)$', re.M)
+
+
+def listening(port: int) -> bool:
+    with socket.socket() as s:
+        s.settimeout(0.05)
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+def phases(port: int) -> dict:
+    try:
+        text = httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1.0).text
+    except httpx.HTTPError:
+        return {}
+    return {k: float(v) for k, v in _PHASE.findall(text)}
+
+
+def run_once(port: int, env: dict, poll: float, timeout: float) -> dict:
+    """Satu cold start; return waktu (detik sejak spawn) + fase internal."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "server.py"], cwd=SERVER_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    out = {}
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server.py keluar dengan kode {proc.returncode}")
+            if "listening" not in out:
+                if listening(port):
+                    out["listening"] = time.perf_counter() - t0
+            else:
+                ph = phases(port)
+                if "first_score" in ph:
+                    out["first_score"] = time.perf_counter() - t0
+                    out.update({f"internal_{k}": v for k, v in ph.items()})
+                    break
+            time.sleep(poll)
+        else:
+            raise RuntimeError(f"tidak ada skor dalam {timeout:.0f}s")
+    finally:
+        proc.send_signal(signal.SIGINT)          # shutdown normal: snapshot ditulis ulang
+        try:
+            proc.wait(15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold start server.py: time-to-listening / time-to-first-score")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--poll", type=float, default=10.0, help="interval poll (ms)")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as state:
+        env = dict(os.environ, PORT=str(args.port), STORE_DIR="", STATE_DIR=state, PYTHONWARNINGS="ignore")
+        print("pemanasan: isi window + snapshot ...")
+        run_once(args.port, dict(env, TICK_RATE_HZ="50"), args.poll / 1e3, args.timeout)
+
+        rows = []
+        for i in range(args.runs):
+            r = run_once(args.port, env, args.poll / 1e3, args.timeout)
+            rows.append(r)
+            print(f"run {i + 1}: listening {r['listening']:.2f}s, first score {r['first_score']:.2f}s "
+                  f"(internal: model_loaded {r.get('internal_model_loaded', float('nan')):.2f}s, "
+                  f"first_score {r.get('internal_first_score', float('nan')):.2f}s sejak import server)")
+
+    for key in ("listening", "first_score"):
+        v = np.array([r[key] for r in rows])
+        print(f"{key:12s} median {np.median(v):.2f}s  min {v.min():.2f}s  max {v.max():.2f}s")
+
+
+if __name__ == "__main__":
+    main()
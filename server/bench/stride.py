@@ -0,0 +1,73 @@
+"""
+Trade-off CPU vs delay deteksi untuk stride scoring LSTMAE_Evaluator.
+
+Tiap trial: SimpleShipSim (seed berbeda), anomali disuntikkan mulai tick `inject`
+(lube oil pressure g1 turun, frekuensi g1 bergeser). Alarm = skor yang dilaporkan
+(boleh stale) melewati max(threshold, skor maksimum 60 tick sebelum injeksi) * margin.
+
+Jalankan dari folder server:
+    python -m bench.stride
+    python -m bench.stride --strides 1 2 5 10 --band 0.2 --trials 5
+"""
+import argparse, time
+import numpy as np
+
+from lib.pred import LSTMAE_Evaluator
+from lib.generator1 import SimpleShipSim, row_to_nested_json
+
+
+def make_trial(ev: LSTMAE_Evaluator, seed: int, n_ticks: int, inject: int) -> np.ndarray:
+    sim = SimpleShipSim(seed=seed)
+    rows = ev.schema.to_matrix(row_to_nested_json(sim.step()) for _ in range(n_ticks))
+    i = ev.name_to_idx
+    rows[inject:, i["g1_lube_oil_pressure_bar"]] *= 0.4
+    rows[inject:, i["g1_frequency_hz"]] -= 0.8
+    return rows
+
+
+def run(ev: LSTMAE_Evaluator, rows: np.ndarray, stride: int, band) -> tuple:
+    ev.reset()
+    ev.stride, ev.adaptive_band = stride, band
+    scores = np.zeros(rows.shape[0])
+    fresh = 0
+    t0 = time.process_time()
+    for t, vec in enumerate(rows):
+        out = ev.push_vector_and_eval(vec)
+        if out["ready"]:
+            scores[t] = out["score"]
+            fresh += out["stale_for"] == 0
+    return scores, time.process_time() - t0, fresh
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stride scoring: CPU vs detection delay")
+    ap.add_argument("--artifacts", default="artifacts")
+    ap.add_argument("--strides", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    ap.add_argument("--band", type=float, default=0.2, help="adaptive_band untuk baris adaptif")
+    ap.add_argument("--trials", type=int, default=3)
+    ap.add_argument("--ticks", type=int, default=700)
+    ap.add_argument("--inject", type=int, default=500)
+    ap.add_argument("--margin", type=float, default=1.05)
+    args = ap.parse_args()
+
+    ev = LSTMAE_Evaluator(artifacts_dir=args.artifacts, device="cpu")
+    trials = [make_trial(ev, 100 + k, args.ticks, args.inject) for k in range(args.trials)]
+
+    configs = [(k, None) for k in args.strides] + [(k, args.band) for k in args.strides if k > 1]
+    print(f"{'stride':>6} {'band':>5} {'cpu ms/sample':>14} {'LSTM runs':>10} {'delay mean':>11} {'delay max':>10}")
+    for stride, band in configs:
+        cpu, runs, delays, n = 0.0, 0, [], 0
+        for rows in trials:
+            scores, c, fresh = run(ev, rows, stride, band)
+            cpu += c; runs += fresh; n += rows.shape[0]
+            ref = scores[args.inject - 60:args.inject]
+            level = max(ev.threshold, float(ref.max())) * args.margin
+            hit = np.nonzero(scores[args.inject:] > level)[0]
+            delays.append(int(hit[0]) if hit.size else np.inf)
+        d = np.array(delays, dtype=float)
+        print(f"{stride:6d} {('-' if band is None else f'{band:.2f}'):>5} {cpu / n * 1e3:14.3f} "
+              f"{runs / n:10.1%} {np.mean(d):11.1f} {np.max(d):10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import hashlib, json, os, torch
+import torch.nn as nn
+
+# Inference backends for LSTMAutoencoder.
+#   eager       : plain nn.Module (default, today's path)
+#   torchscript : traced + frozen graph
+#   int8        : dynamic int8 quantization of LSTM/Linear weights, then traced (CPU only)
+BACKENDS = ("eager", "torchscript", "int8")
+
+ARTIFACT_FILES = {
+    "torchscript": "lstm_ae_best.ts.pt",
+    "int8": "lstm_ae_best.int8.pt",
+}
+# Extra file inside every exported artifact: sha256 of the lstm_ae_best.pth it was built from
+SOURCE_FILE = "source.json"
+
+
+class StaleBackend(RuntimeError):
+    """An exported artifact that was not built from the current weights file."""
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def artifact_path(artifacts_dir: str, backend: str) -> str:
+    return os.path.join(artifacts_dir, ARTIFACT_FILES[backend])
+
+
+def build_backend(model: nn.Module, backend: str, seq_len: int, n_features: int, device="cpu"):
+    """Wrap an eval-mode eager model into the requested backend. Returns a callable (B,L,D) -> (B,L,D)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}.")
+    model.eval()
+    if backend == "eager":
+        return model
+
+    if backend == "int8":
+        if str(device) != "cpu":
+            raise RuntimeError("int8 backend (dynamic quantization) runs on CPU only.")
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+    example = torch.zeros(1, seq_len, n_features, device=device)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example, check_trace=False)
+    traced.eval()
+    if backend == "torchscript":
+        # freeze folds weights/attributes into the graph; batch size stays dynamic
+        traced = torch.jit.freeze(traced)
+    return traced
+
+
+def save_backend(model, path: str, source_pth: str) -> None:
+    """torch.jit.save with the source weights' sha256 recorded inside the artifact."""
+    torch.jit.save(model, path, _extra_files={SOURCE_FILE: json.dumps({"pth_sha256": file_sha256(source_pth)})})
+
+
+def load_backend(artifacts_dir: str, backend: str, device="cpu", source_pth: str = None):
+    """
+    Load an exported backend artifact (see lib/export_model.py), or None if it was not exported.
+    With source_pth, raises StaleBackend when the artifact does not record that file's sha256 (retrained
+    weights that were not re-exported, or an export older than the record).
+    """
+    if backend == "eager":
+        return None
+    path = artifact_path(artifacts_dir, backend)
+    if not os.path.exists(path):
+        return None
+    extra = {SOURCE_FILE: ""}
+    m = torch.jit.load(path, map_location=device, _extra_files=extra)
+    if source_pth is not None:
+        recorded = json.loads(extra[SOURCE_FILE] or "{}").get("pth_sha256")
+        if recorded != file_sha256(source_pth):
+            raise StaleBackend(f"{os.path.basename(path)} was not exported from the current "
+                               f"{os.path.basename(source_pth)}")
+    m.eval()
+    return m
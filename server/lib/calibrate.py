@@ -0,0 +1,248 @@
+"""
+Threshold / prob_alpha calibration from large corpora of normal windows, written as a new model version.
+
+Jalankan dari folder server:
+    python -m lib.calibrate base-cal --sim-seeds 0-63 --sim-ticks 20000 --workers 4
+    python -m lib.calibrate v2-cal --from v2 --recording normal/*.csv --far 1e-2 1e-3 1e-4 --use-far 1e-3
+    python -m lib.calibrate x --sim-seeds 0-3 --dry-run --report cal.json      # report only
+
+Every source (simulator seed or recording, as in lib/train.py) is read in chunks, imputed + scaled by the
+evaluator of the version being calibrated, cut into sliding windows (every --hop rows) and scored in batches
+of --batch-size. Sources are spread over --workers processes, each with its own evaluator on --threads torch
+threads. Scores go into one KLL sketch per operating mode (mode_code of the window's last row: startup,
+stable, high_load, bad_env) in high-rank-accuracy mode (lib/sketch.py), so memory is a few thousand floats per
+mode whatever the corpus size, and the tail quantiles behind small false-alarm rates stay accurate. Worker
+sketches are merged in the main process. Windows that fail the live scaling sanity check are counted and
+left out, as the live path never scores them.
+
+Proposal, per false-alarm rate (FAR = share of normal windows over the threshold):
+    per mode   quantile 1 - FAR of that mode's scores
+    global     quantile 1 - FAR of all scores (the overall FAR is the target)
+    max-mode   the largest per-mode threshold (no mode exceeds the target)
+The config gets threshold = --policy at --use-far. prob_alpha is set so that the median normal window gets
+blackout_prob = --prob-median (blackout_prob = sigmoid((score - threshold) / (prob_alpha * threshold)), see
+LSTMAE_Evaluator._prob_from_score). The new version copies the calibrated version's files and carries the
+whole report under "calibration" in config.json.
+"""
+import argparse, json, math, os, shutil, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from lib.schema import FeatureSchema
+from lib.sketch import KLLSketch
+from lib.train import Source, iter_chunks, parse_seeds
+from lib.versions import active_version, publish_version, staging_dir, version_dir
+
+MODES = {v: k for k, v in FeatureSchema.MODE_MAP.items()}      # 1.0 -> "startup", ...
+UNKNOWN = "unknown"
+
+_ev = None              # evaluator of this process (workers build theirs in _init_worker)
+
+
+def _init_worker(art_dir: str, threads: Optional[int]) -> None:
+    global _ev
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    from lib.pred import LSTMAE_Evaluator
+    _ev = LSTMAE_Evaluator(artifacts_dir=art_dir, device="cpu")
+
+
+def new_sketches(k: int) -> Dict[str, KLLSketch]:
+    return {m: KLLSketch(k, hra=True) for m in list(MODES.values()) + [UNKNOWN]}
+
+
+def score_source(source: Source, hop: int, batch_size: int, chunk: int, k: int) -> Dict[str, Any]:
+    """Score every window of one source with this process's evaluator -> per-mode sketches + counts."""
+    from lib.score_batch import sliding_windows, window_sanity_ok
+    ev, t0 = _ev, time.perf_counter()
+    L, D = ev.seq_len, ev.n_features
+    mode_idx = ev.feature_cols.index("mode_code") if "mode_code" in ev.feature_cols else None
+    sketches = new_sketches(k)
+    windows = rejected = 0
+    tail, skip = None, 0            # rows carried into the next chunk / rows to skip at its start
+    for X in iter_chunks(source, ev.feature_cols, chunk):
+        # the raw mode_code rides along as column D, so every window carries the mode of its last row
+        mode = X[:, mode_idx].copy() if mode_idx is not None else np.zeros(X.shape[0], np.float32)
+        ev._impute_scale_rows(X)
+        X = np.column_stack([X, mode])
+        ext = X if tail is None else np.concatenate([tail, X])
+        w = sliding_windows(ext[skip:], L, hop)
+        ok = window_sanity_ok(ev, ext[skip:], hop) if w.shape[0] else np.empty(0, bool)
+        nxt = skip + w.shape[0] * hop
+        tail, skip = ext[min(nxt, ext.shape[0]):], max(0, nxt - ext.shape[0])
+        if not ok.any():
+            rejected += w.shape[0]
+            continue
+        good = w[ok]                                        # fancy index: (n,L,D+1) copy of the good windows
+        scores, _, _ = ev.score_windows(good[:, :, :D], batch_size=batch_size, explain=False)
+        modes = good[:, -1, D]
+        for code in np.unique(modes):
+            sketches[MODES.get(float(code), UNKNOWN)].update(scores[modes == code])
+        windows += good.shape[0]
+        rejected += w.shape[0] - good.shape[0]
+    return {"source": f"{source[0]}:{source[1]}", "sketches": sketches, "windows": windows,
+            "rejected": rejected, "seconds": time.perf_counter() - t0}
+
+
+def score_corpus(sources: Sequence[Source], art_dir: str, hop: int = 1, batch_size: int = 1024,
+                 chunk: int = 4096, k: int = 400, workers: int = 0, threads: Optional[int] = None) -> Dict[str, Any]:
+    """All sources -> merged per-mode sketches, window counts, throughput. workers=0: this process only."""
+    sketches = new_sketches(k)
+    windows = rejected = 0
+    t0 = time.perf_counter()
+
+    def add(part):
+        nonlocal windows, rejected
+        for m, sk in part["sketches"].items():
+            sketches[m].merge(sk)
+        windows += part["windows"]
+        rejected += part["rejected"]
+        dt = time.perf_counter() - t0
+        print(f"  {part['source']}: {part['windows']} windows in {part['seconds']:.1f}s | total {windows} "
+              f"windows, {windows / max(dt, 1e-9):.0f} windows/s")
+
+    if workers > 0:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(art_dir, threads)) as pool:
+            for fut in as_completed([pool.submit(score_source, s, hop, batch_size, chunk, k) for s in sources]):
+                add(fut.result())
+    else:
+        _init_worker(art_dir, threads)
+        for s in sources:
+            add(score_source(s, hop, batch_size, chunk, k))
+    dt = time.perf_counter() - t0
+    return {"sketches": sketches, "windows": windows, "rejected": rejected, "seconds": dt,
+            "windows_per_s": windows / max(dt, 1e-9)}
+
+
+def propose(sketches: Dict[str, KLLSketch], fars: Sequence[float]) -> Dict[str, Any]:
+    """Per-mode / global / max-mode thresholds for each FAR, plus the score quantiles they came from."""
+    every = KLLSketch(next(iter(sketches.values())).k, hra=True)
+    for sk in sketches.values():
+        every.merge(sk)
+    modes = {m: sk for m, sk in sketches.items() if sk.n}
+    out: Dict[str, Any] = {"windows": {m: sk.n for m, sk in modes.items()}, "thresholds": {}}
+    for far in fars:
+        per_mode = {m: sk.quantile(1.0 - far) for m, sk in modes.items()}
+        out["thresholds"][f"{far:g}"] = {"global": every.quantile(1.0 - far),
+                                         "max_mode": max(per_mode.values()), "per_mode": per_mode}
+    out["quantiles"] = {m: dict(zip(("p50", "p90", "p99", "p999"), sk.quantiles([0.5, 0.9, 0.99, 0.999]).tolist()))
+                        for m, sk in [("all", every), *modes.items()]}
+    out["_all"] = every
+    return out
+
+
+def prob_alpha_for(median: float, threshold: float, prob_median: float) -> Optional[float]:
+    """prob_alpha giving blackout_prob(median) = prob_median; None when the median is not below the threshold."""
+    if not (0.0 < prob_median < 0.5) or not (median < threshold) or threshold <= 0:
+        return None
+    logit = math.log(prob_median / (1.0 - prob_median))         # < 0
+    return (median - threshold) / (threshold * logit)
+
+
+def write_calibrated(root: str, name: str, src_dir: str, cfg: Dict[str, Any], force: bool = False) -> str:
+    """New version = the calibrated version's files (weights, scaler, exported backends) + the new config.json."""
+    tmp = staging_dir(root, name)
+    for f in os.listdir(src_dir):
+        path = os.path.join(src_dir, f)
+        if os.path.isfile(path) and f not in ("config.json", "ACTIVE") and not f.startswith("."):
+            shutil.copy2(path, tmp)
+    with open(os.path.join(tmp, "config.json"), "w") as f:
+        json.dump(cfg, f, indent=4)
+    from lib.pred import LSTMAE_Evaluator
+    LSTMAE_Evaluator(artifacts_dir=tmp, device="cpu")      # must load exactly as the server will
+    return publish_version(root, name, tmp, force)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Calibrate threshold / prob_alpha from normal windows into a new version")
+    ap.add_argument("name", help="versi baru: artifacts/versions/<name>/")
+    ap.add_argument("--root", default="artifacts", help="folder artifacts (lib/versions.py)")
+    ap.add_argument("--from", dest="source", default=None, help="versi yang dikalibrasi (default: versi aktif)")
+    ap.add_argument("--sim-seeds", default=None, help='simulator per seed, mis. "0-63" (default bila tanpa --recording)')
+    ap.add_argument("--sim-ticks", type=int, default=5000, help="baris per seed simulator")
+    ap.add_argument("--recording", nargs="*", default=[], help="rekaman normal (.csv / .parquet / .npz)")
+    ap.add_argument("--mapping", default=None, help="file JSON pemetaan kolom rekaman (lib/replay.py)")
+    ap.add_argument("--hop", type=int, default=1, help="skor setiap window ke-hop")
+    ap.add_argument("--batch-size", type=int, default=1024)
+    ap.add_argument("--chunk", type=int, default=4096, help="baris per chunk sumber")
+    ap.add_argument("--workers", type=int, default=0, help="proses scoring (0 = proses ini)")
+    ap.add_argument("--threads", type=int, default=None, help="torch.set_num_threads per proses")
+    ap.add_argument("--sketch-k", type=int, default=400)
+    ap.add_argument("--far", type=float, nargs="+", default=[1e-2, 1e-3, 1e-4], help="target false-alarm rate")
+    ap.add_argument("--use-far", type=float, default=1e-3, help="FAR yang ditulis ke config.json")
+    ap.add_argument("--policy", choices=("global", "max_mode"), default="global")
+    ap.add_argument("--prob-median", type=float, default=0.05, help="blackout_prob window normal median (0 = prob_alpha tetap)")
+    ap.add_argument("--report", default=None, help="tulis laporan JSON ke file ini")
+    ap.add_argument("--dry-run", action="store_true", help="hanya laporan, tanpa versi baru")
+    ap.add_argument("--force", action="store_true", help="timpa versi yang sudah ada")
+    args = ap.parse_args()
+
+    source = args.source or active_version(args.root)
+    src_dir = version_dir(args.root, source)
+    if not args.dry_run and os.path.exists(version_dir(args.root, args.name)) and not args.force:
+        raise SystemExit(f"version {args.name!r} exists; pick another name or --force")
+    with open(os.path.join(src_dir, "config.json")) as f:
+        cfg = json.load(f)
+    fars = sorted(set(args.far) | {args.use_far}, reverse=True)
+    mapping = None
+    if args.mapping:
+        from lib.replay import load_mapping
+        mapping = load_mapping(args.mapping)
+    seeds = parse_seeds(args.sim_seeds) if args.sim_seeds else ([] if args.recording else parse_seeds("0-7"))
+    sources: List[Source] = [("sim", s, args.sim_ticks) for s in seeds]
+    sources += [("file", p, mapping) for p in args.recording]
+    print(f"calibrating {source} ({src_dir}) on {len(sources)} source(s), hop {args.hop}, workers {args.workers}")
+
+    res = score_corpus(sources, src_dir, args.hop, args.batch_size, args.chunk, args.sketch_k, args.workers,
+                       args.threads)
+    if not res["windows"]:
+        raise SystemExit("no window passed the sanity check; nothing to calibrate")
+    prop = propose(res["sketches"], fars)
+    every = prop.pop("_all")
+    chosen = prop["thresholds"][f"{args.use_far:g}"]["global" if args.policy == "global" else "max_mode"]
+    median = every.quantile(0.5)
+    alpha = prob_alpha_for(median, chosen, args.prob_median) if args.prob_median else None
+    old_alpha = float(cfg.get("prob_alpha", 0.25))
+
+    print(f"{res['windows']} windows ({res['rejected']} rejected by the sanity check) in {res['seconds']:.1f}s = "
+          f"{res['windows_per_s']:.0f} windows/s; sketch memory {sum(sk.size() for sk in res['sketches'].values())} "
+          f"values")
+    print(f"{'mode':<10} {'windows':>9} " + " ".join(f"{'FAR ' + format(f, 'g'):>10}" for f in fars))
+    for m, n in prop["windows"].items():
+        print(f"{m:<10} {n:>9} " + " ".join(f"{prop['thresholds'][f'{f:g}']['per_mode'][m]:10.4f}" for f in fars))
+    print(f"{'global':<10} {res['windows']:>9} " +
+          " ".join(f"{prop['thresholds'][f'{f:g}']['global']:10.4f}" for f in fars))
+    print(f"{'max_mode':<10} {'':>9} " + " ".join(f"{prop['thresholds'][f'{f:g}']['max_mode']:10.4f}" for f in fars))
+    est_far = {m: 1.0 - sk.rank(chosen) for m, sk in res["sketches"].items() if sk.n}
+    print(f"threshold {cfg['threshold']} -> {chosen:.4f} ({args.policy}, FAR {args.use_far:g}); "
+          f"estimated FAR per mode: " + ", ".join(f"{m} {v:.2e}" for m, v in est_far.items()))
+    if alpha is None and args.prob_median:
+        print(f"prob_alpha stays {old_alpha}: median score {median:.4f} is not below the threshold")
+    else:
+        print(f"prob_alpha {old_alpha} -> {alpha if alpha is None else round(alpha, 4)} "
+              f"(median score {median:.4f} -> blackout_prob {args.prob_median})")
+
+    report = {"from": source, "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+              "sources": [f"{k}:{a}" for k, a, _ in sources], "hop": args.hop, "windows": res["windows"],
+              "rejected": res["rejected"], "windows_per_s": round(res["windows_per_s"], 1),
+              "sketch": {"kind": "kll-hra", "k": args.sketch_k}, "policy": args.policy, "use_far": args.use_far,
+              "previous": {"threshold": cfg["threshold"], "prob_alpha": old_alpha},
+              "estimated_far": est_far, "median_score": median, **prop}
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.dry_run:
+        return
+    new_cfg = {**cfg, "threshold": chosen, "prob_alpha": alpha if alpha is not None else old_alpha,
+               "calibration": report}
+    path = write_calibrated(args.root, args.name, src_dir, new_cfg, args.force)
+    print(f"wrote {path}")
+    print(f"aktifkan: POST /admin/model/activate {{\"version\": \"{args.name}\"}} atau tulis nama ke "
+          f"{os.path.join(args.root, 'ACTIVE')}")
+
+
+if __name__ == "__main__":
+    main()
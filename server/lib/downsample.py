@@ -0,0 +1,82 @@
+"""
+Downsampling of (t, y) series to a point budget.
+
+bucket_stats  -- n / sum / min / max per equal-width time bucket (NaN ignored). Works on raw points and on
+                 pre-aggregated rows (minute rollups: pass n, mean, min, max), and the results of both can be
+                 merged bucket by bucket (merge_stats), so a range can be served partly from rollups.
+lttb          -- largest-triangle-three-buckets: picks `n_out` real points that keep the visual shape.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def bucket_edges(t0: float, t1: float, n_buckets: int) -> np.ndarray:
+    return np.linspace(t0, t1, int(n_buckets) + 1)
+
+
+def bucket_stats(t: np.ndarray, y: np.ndarray, edges: np.ndarray, n: Optional[np.ndarray] = None,
+                 y_min: Optional[np.ndarray] = None, y_max: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    t sorted. Raw points: bucket_stats(t, y, edges). Aggregated rows: y = mean, n = count per row, y_min /
+    y_max = per-row extremes. Returns n, sum, min, max, each (len(edges)-1,); empty buckets: n=0, NaN min/max.
+    """
+    nb = edges.size - 1
+    y = np.asarray(y, np.float64)
+    ok = ~np.isnan(y)
+    w = ok.astype(np.float64) if n is None else np.where(ok, np.asarray(n, np.float64), 0.0)
+    lo = y if y_min is None else np.asarray(y_min, np.float64)
+    hi = y if y_max is None else np.asarray(y_max, np.float64)
+
+    starts = np.searchsorted(t, edges[:-1], "left")
+    stop = np.searchsorted(t, edges[-1], "left")
+    bounds = np.append(starts, stop)
+    nonempty = bounds[1:] > bounds[:-1]
+
+    out = {"n": np.zeros(nb), "sum": np.zeros(nb), "min": np.full(nb, np.nan), "max": np.full(nb, np.nan)}
+    if not nonempty.any():
+        return out
+    # empty buckets have zero width, so consecutive non-empty starts delimit each bucket; the last one ends at `stop`
+    s = starts[nonempty]
+    out["n"][nonempty] = np.add.reduceat(w[:stop], s)
+    out["sum"][nonempty] = np.add.reduceat(np.where(ok, y * w, 0.0)[:stop], s)
+    out["min"][nonempty] = np.fmin.reduceat(lo[:stop], s)
+    out["max"][nonempty] = np.fmax.reduceat(hi[:stop], s)
+    return out
+
+
+def merge_stats(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {"n": a["n"] + b["n"], "sum": a["sum"] + b["sum"],
+            "min": np.fmin(a["min"], b["min"]), "max": np.fmax(a["max"], b["max"])}
+
+
+def finish_stats(stats: Dict[str, np.ndarray], edges: np.ndarray) -> Dict[str, np.ndarray]:
+    """Non-empty buckets only: t (bucket start), mean, min, max, n."""
+    keep = stats["n"] > 0
+    return {"t": edges[:-1][keep], "mean": stats["sum"][keep] / stats["n"][keep],
+            "min": stats["min"][keep], "max": stats["max"][keep], "n": stats["n"][keep]}
+
+
+def lttb(t: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the n_out points chosen by largest-triangle-three-buckets (NaN points are skipped)."""
+    idx_all = np.nonzero(~np.isnan(y))[0]
+    N = idx_all.size
+    if n_out >= N or n_out < 3:
+        return idx_all if n_out >= N else idx_all[np.linspace(0, N - 1, max(n_out, 0)).astype(int)]
+    x = np.asarray(t, np.float64)[idx_all]
+    v = np.asarray(y, np.float64)[idx_all]
+
+    # bucket i (1..n_out-2) covers [edges[i-1], edges[i]) of points 1..N-2
+    edges = (np.linspace(1, N - 1, n_out - 1)).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, N - 1
+    a = 0
+    for i in range(n_out - 2):
+        s, e = edges[i], edges[i + 1]
+        ns, ne = edges[i + 1], (edges[i + 2] if i + 2 < edges.size else N)
+        cx, cy = x[ns:ne].mean(), v[ns:ne].mean()             # average of the next bucket
+        bx, by = x[s:e], v[s:e]
+        area = np.abs((x[a] - cx) * (by - v[a]) - (x[a] - bx) * (cy - v[a]))
+        a = s + int(np.argmax(area))
+        out[i + 1] = a
+    return idx_all[out]
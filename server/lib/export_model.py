@@ -0,0 +1,166 @@
+"""
+Export optimized inference backends next to lstm_ae_best.pth, with a parity report against eager.
+
+Jalankan dari folder server:
+    python -m lib.export_model --backend torchscript int8
+    python -m lib.export_model --backend int8 --max-flip-rate 0.0
+
+For every backend the simulated corpus is scored by eager and by the backend. The report
+(<artifact>.parity.json) has score differences, threshold-decision flips, top-1 contributor
+agreement, per-window latency and the corpus spread: windows are picked on both sides of the
+threshold, weighted towards it, so the flip rate measures real decisions. A backend whose decision
+flip rate exceeds --max-flip-rate is refused: the report is still written, the artifact is not,
+and the exit code is 1.
+Pick the exported backend with LSTMAE_Evaluator(backend=...) or "backend" in config.json.
+"""
+import argparse, json, os, sys, time
+import numpy as np, torch
+
+from lib.backends import BACKENDS, artifact_path, build_backend, file_sha256, save_backend
+from lib.generator1 import SimpleShipSim, row_to_nested_json
+from lib.pred import LSTMAE_Evaluator
+
+
+def build_corpus(ev: LSTMAE_Evaluator, n_windows: int, n_seeds: int = 8, anomaly_frac: float = 0.2,
+                 oversample: int = 4, seed: int = 0):
+    """
+    (N,L,D) scaled windows from SimpleShipSim with their eager scores, half below and half above the threshold.
+    A fraction of raw rows gets one sensor perturbed, with a strength that grows per seed. The simulator alone
+    may sit entirely above the threshold, so each candidate's continuous columns are pulled towards the eager
+    reconstruction by a random factor (scores fall roughly with its square). Of oversample x n_windows
+    candidates, each side keeps its windows nearest the threshold (where a backend can flip a decision) plus a
+    random draw from the rest. Raises ValueError when every candidate still lands on one side.
+    """
+    rng = np.random.default_rng(seed)
+    L = ev.seq_len
+    per_seed = max(1, oversample * n_windows // n_seeds)
+    cont = ev.scale_idx
+    out = []
+    for k, strength in enumerate(np.linspace(0.05, 0.9, n_seeds)):
+        sim = SimpleShipSim(seed=seed + k)
+        rows = ev.schema.to_matrix(row_to_nested_json(sim.step()) for _ in range(per_seed + L - 1))
+        hit = rng.random(rows.shape[0]) < anomaly_frac
+        cols = rng.choice(cont, size=int(hit.sum()))
+        rows[np.nonzero(hit)[0], cols] *= rng.uniform(1 - strength, 1 + strength, size=cols.shape[0]).astype(np.float32)
+        ev._impute_scale_rows(rows)
+        win = np.lib.stride_tricks.sliding_window_view(rows, L, axis=0)    # (n,D,L) view
+        out.append(win.transpose(0, 2, 1))
+    cand = np.concatenate(out, axis=0)
+    with torch.no_grad():
+        recon = torch.cat([ev.model(torch.from_numpy(cand[i:i + 1024])) for i in range(0, cand.shape[0], 1024)])
+    recon = recon.cpu().numpy()[:, :, cont]
+    pull = rng.uniform(0.4, 1.0, size=(cand.shape[0], 1, 1)).astype(np.float32)
+    cand[:, :, cont] = recon + pull * (cand[:, :, cont] - recon)
+    total, _, _ = ev.score_windows(cand, explain=False)
+
+    dist = np.abs(np.log(np.maximum(total, 1e-12) / ev.threshold))
+    keep = []
+    for side in (np.nonzero(total <= ev.threshold)[0], np.nonzero(total > ev.threshold)[0]):
+        if side.size == 0:
+            raise ValueError(f"all {cand.shape[0]} corpus windows are on one side of the threshold "
+                             f"({ev.threshold:.4g}); scores {total.min():.4g}..{total.max():.4g}")
+        side = side[np.argsort(dist[side], kind="stable")]
+        k = min(n_windows // 2, side.size)
+        near = k // 2
+        keep.append(side[:near])
+        keep.append(rng.choice(side[near:], size=k - near, replace=False))
+    idx = np.sort(np.concatenate(keep))
+    return np.ascontiguousarray(cand[idx]), total[idx]
+
+
+def corpus_spread(total: np.ndarray, threshold: float) -> dict:
+    """Where the corpus scores sit relative to the threshold (reported next to the flip rate)."""
+    ratio = total / threshold
+    return {
+        "n_windows": int(total.size),
+        "n_above": int((total > threshold).sum()),
+        "n_below": int((total <= threshold).sum()),
+        "frac_within_10pct": float((np.abs(ratio - 1.0) <= 0.1).mean()),
+        "score_over_threshold_quantiles": {f"p{q}": float(np.quantile(ratio, q / 100)) for q in (1, 10, 50, 90, 99)},
+    }
+
+
+def latency_ms(model, L: int, D: int, device, reps: int = 50) -> float:
+    x = torch.zeros(1, L, D, device=device)
+    with torch.no_grad():
+        for _ in range(5):
+            model(x)
+        ts = []
+        for _ in range(reps):
+            t0 = time.perf_counter(); model(x); ts.append(time.perf_counter() - t0)
+    return float(np.median(ts) * 1e3)
+
+
+def parity_report(ev: LSTMAE_Evaluator, windows: np.ndarray, backend: str, model,
+                  ref_total: np.ndarray, ref_top1: np.ndarray) -> dict:
+    total, per_feat, _ = ev.score_windows(windows, model=model)
+    diff = np.abs(total - ref_total)
+    flips = (total > ev.threshold) != (ref_total > ev.threshold)
+    return {
+        "backend": backend,
+        "n_windows": int(windows.shape[0]),
+        "threshold": float(ev.threshold),
+        "score_abs_diff_max": float(diff.max()),
+        "score_abs_diff_mean": float(diff.mean()),
+        "score_abs_diff_p99": float(np.quantile(diff, 0.99)),
+        "score_rel_diff_max": float((diff / np.maximum(np.abs(ref_total), 1e-12)).max()),
+        "decision_flips": int(flips.sum()),
+        "decision_flip_rate": float(flips.mean()),
+        "top1_agreement": float((per_feat.argmax(axis=1) == ref_top1).mean()),
+        "latency_ms_b1": latency_ms(model, ev.seq_len, ev.n_features, ev.device),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export optimized LSTMAutoencoder backends with a parity report")
+    ap.add_argument("--artifacts", default="artifacts")
+    ap.add_argument("--backend", nargs="+", default=["torchscript", "int8"], choices=[b for b in BACKENDS if b != "eager"])
+    ap.add_argument("--windows", type=int, default=4000, help="ukuran korpus simulasi (jumlah window)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-flip-rate", type=float, default=0.001,
+                    help="tolak backend bila fraksi keputusan (score > threshold) yang berbeda dari eager melebihi ini")
+    args = ap.parse_args()
+
+    ev = LSTMAE_Evaluator(artifacts_dir=args.artifacts, device="cpu", backend="eager")
+    pth = os.path.join(args.artifacts, "lstm_ae_best.pth")
+    try:
+        windows, _ = build_corpus(ev, args.windows, seed=args.seed)
+    except ValueError as e:
+        sys.exit(f"[export] korpus tidak bisa dipakai: {e}")
+    ref_total, ref_feat, _ = ev.score_windows(windows)
+    ref_top1 = ref_feat.argmax(axis=1)
+    spread = corpus_spread(ref_total, ev.threshold)
+    eager_ms = latency_ms(ev.model, ev.seq_len, ev.n_features, ev.device)
+    q = spread["score_over_threshold_quantiles"]
+    print(f"corpus: {spread['n_windows']} windows, {spread['n_below']} below / {spread['n_above']} above threshold, "
+          f"{spread['frac_within_10pct']:.1%} within 10%; score/threshold p1={q['p1']:.2f} p50={q['p50']:.2f} "
+          f"p99={q['p99']:.2f}; eager {eager_ms:.2f} ms/window")
+
+    failed = False
+    for backend in args.backend:
+        model = build_backend(ev.model, backend, ev.seq_len, ev.n_features, ev.device)
+        rep = parity_report(ev, windows, backend, model, ref_total, ref_top1)
+        rep["latency_ms_b1_eager"] = eager_ms
+        rep["corpus"] = spread
+        rep["max_flip_rate"] = args.max_flip_rate
+        rep["accepted"] = rep["decision_flip_rate"] <= args.max_flip_rate
+
+        path = artifact_path(args.artifacts, backend)
+        rep["source_sha256"] = file_sha256(pth)
+        if rep["accepted"]:
+            save_backend(model, path, pth)      # records the .pth hash: a later retrain makes it stale
+            rep["artifact"] = os.path.basename(path)
+        with open(path + ".parity.json", "w") as f:
+            json.dump(rep, f, indent=4)
+
+        status = "OK  " if rep["accepted"] else "REFUSED"
+        print(f"[{status}] {backend:<12} max|d|={rep['score_abs_diff_max']:.2e} flips={rep['decision_flips']} "
+              f"({rep['decision_flip_rate']:.3%}) top1={rep['top1_agreement']:.1%} "
+              f"{rep['latency_ms_b1']:.2f} ms/window -> {path if rep['accepted'] else path + '.parity.json'}")
+        failed |= not rep["accepted"]
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import numpy as np
+from typing import Dict, List, Any, Hashable, Iterable, Optional
+
+from lib.pred import LSTMAE_Evaluator, WindowRing
+from lib.score_batch import sliding_windows
+from lib.versions import carry_rows, same_scaling
+
+
+class FleetEvaluator:
+    """
+    One LSTMAutoencoder + scaler shared by many ships.
+    Keeps a window per ship_id and scores every ready ship in a single (B,L,D) forward pass.
+    Per-ship results have the same shape as LSTMAE_Evaluator.push_sample_and_eval.
+    With a shadow evaluator (set_shadow), ingest() also scores the same windows with it ("shadow_score").
+    """
+
+    def __init__(self, artifacts_dir="artifacts", device=None, prob_alpha=None, topk=5, backend=None):
+        # the single-ship evaluator owns config, scaler, masks and model; we only reuse them
+        self.core = LSTMAE_Evaluator(artifacts_dir=artifacts_dir, device=device, prob_alpha=prob_alpha, topk=topk,
+                                     backend=backend)
+        self.device = self.core.device
+        self.feature_cols: List[str] = self.core.feature_cols
+        self.seq_len: int = self.core.seq_len
+        self.threshold: float = self.core.threshold
+        self.n_features: int = self.core.n_features
+
+        self.buffers: Dict[Hashable, WindowRing] = {}
+        self._batch = np.empty((0, self.seq_len, self.n_features), dtype=np.float32)  # reusable (B,L,D) input, grows
+        self.shadow: Optional[LSTMAE_Evaluator] = None
+        self._shadow_same = True                # shadow reads the windows as-is (same scaler)
+
+    # ---------- model versions (lib/versions.py) ----------
+    def swap_core(self, core: LSTMAE_Evaluator) -> None:
+        """Score with `core` from now on; every ship's window is carried over into its scaled space."""
+        windows = {sid: carry_rows(ring.view(), self.core, core) for sid, ring in self.buffers.items()}
+        self.core = core
+        self.device = core.device
+        self.feature_cols = core.feature_cols
+        self.seq_len = core.seq_len
+        self.threshold = core.threshold
+        self.n_features = core.n_features
+        self.buffers = {}
+        self._batch = np.empty((0, self.seq_len, self.n_features), dtype=np.float32)
+        self.restore_windows(windows)
+        if self.shadow is core:
+            self.shadow = None
+        elif self.shadow is not None:
+            self.set_shadow(self.shadow)
+
+    def set_shadow(self, shadow: Optional[LSTMAE_Evaluator]) -> None:
+        """Also score ingested windows with `shadow` (same feature_cols and seq_len); None stops it."""
+        if shadow is not None and (shadow.seq_len != self.seq_len or shadow.feature_cols != self.feature_cols):
+            raise ValueError("shadow model needs the same feature_cols and seq_len as the primary")
+        self.shadow = shadow
+        self._shadow_same = shadow is None or same_scaling(self.core, shadow)
+
+    # ---------- window management ----------
+    def push(self, ship_id: Hashable, flat_sample: Dict[str, float]) -> None:
+        """Append one flat sample (keys = feature_cols, maybe 'mode') to the window of ship_id."""
+        self.push_vector(ship_id, self.core.vectorize(flat_sample))
+
+    def push_vector(self, ship_id: Hashable, vec: np.ndarray) -> None:
+        """Append one raw (D,) vector; it is imputed + scaled once, on arrival."""
+        ring = self.buffers.get(ship_id)
+        if ring is None:
+            ring = self.buffers[ship_id] = WindowRing(self.seq_len, self.n_features)
+        row = np.array(vec, dtype=np.float32).reshape(1, -1)
+        self.core._impute_scale_rows(row)
+        ring.append(row[0])
+
+    def restore_windows(self, windows: Dict[Hashable, np.ndarray]) -> None:
+        """Append already imputed + scaled rows (e.g. from lib/snapshot.py) to each ship's window."""
+        for ship_id, rows in windows.items():
+            ring = self.buffers.get(ship_id)
+            if ring is None:
+                ring = self.buffers[ship_id] = WindowRing(self.seq_len, self.n_features)
+            ring.extend(rows)
+
+    def drop(self, ship_id: Hashable) -> None:
+        self.buffers.pop(ship_id, None)
+
+    def ready_ids(self) -> List[Hashable]:
+        return [sid for sid, buf in self.buffers.items() if len(buf) == self.seq_len]
+
+    # ---------- batched evaluation ----------
+    def evaluate(self, ship_ids: Optional[Iterable[Hashable]] = None) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Score ship_ids (default: every known ship). Ships whose window is not full yet get the usual
+        ready=False result; ships failing the scaling sanity check get ready=False plus 'error'.
+        """
+        ids = list(self.buffers.keys()) if ship_ids is None else list(ship_ids)
+        out: Dict[Hashable, Dict[str, Any]] = {}
+        ready = []
+        for sid in ids:
+            buf = self.buffers.get(sid)
+            if buf is None or len(buf) < self.seq_len:
+                out[sid] = self.core._not_ready_result()
+            else:
+                ready.append(sid)
+        if not ready:
+            return out
+
+        B = len(ready)
+        if self._batch.shape[0] < B:
+            self._batch = np.empty((B, self.seq_len, self.n_features), dtype=np.float32)
+        windows = self._batch[:B]
+        for b, sid in enumerate(ready):
+            windows[b] = self.buffers[sid].view()       # single gather per ship, rows already scaled
+
+        bad = self.core._sanity_failures(windows)
+        if bad.any():
+            for b in np.nonzero(bad)[0]:
+                res = self.core._not_ready_result()
+                res["error"] = "Runtime scaling sanity failed: scaled std too large (scaler/columns mismatch or raw inputs)."
+                out[ready[b]] = res
+            keep = ~bad
+            windows = windows[keep]
+            ready = [sid for sid, ok in zip(ready, keep) if ok]
+            if not ready:
+                return out
+
+        total, _, tops = self.core.score_windows(windows)
+
+        for b, sid in enumerate(ready):
+            out[sid] = self.core._ready_result(float(total[b]), tops[b])
+        return out
+
+    def ingest(self, batches: Dict[Hashable, np.ndarray]) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Bulk path: batches = {ship_id: raw (n,D) rows, oldest first}. Every row is pushed and every row
+        whose window is full gets a score; the windows of all ships go through one batched forward.
+        Per ship: ready (n,) bool, score / blackout_prob (n,) float32 (NaN when not scored),
+        sanity_ok (n,) bool and top_contributors of the last scored row; with a shadow also
+        shadow_score (n,) float32 from the same windows.
+        """
+        L = self.seq_len
+        parts, spans = [], []
+        for sid, X in batches.items():
+            ring = self.buffers.get(sid)
+            if ring is None:
+                ring = self.buffers[sid] = WindowRing(L, self.n_features)
+            X = np.array(X, dtype=np.float32).reshape(-1, self.n_features)
+            self.core._impute_scale_rows(X)
+            n_prev = len(ring)
+            ext = np.concatenate([ring.view(), X])            # scaled history + new rows
+            first = max(n_prev, L - 1)                         # first row index in ext with a full window
+            w = sliding_windows(ext, L)[first - (L - 1):]
+            ring.extend(X)
+            spans.append((sid, X.shape[0], X.shape[0] - w.shape[0]))
+            parts.append(w)
+
+        windows = np.concatenate(parts) if parts else np.empty((0, L, self.n_features), np.float32)
+        bad = self.core._sanity_failures(windows) if windows.shape[0] else np.empty(0, bool)
+        good = windows[~bad]
+        total, per_feat, _ = self.core.score_windows(good, explain=False)
+        scores = np.full(windows.shape[0], np.nan, dtype=np.float32)
+        scores[~bad] = total
+        shadow = None
+        if self.shadow is not None:
+            shadow = np.full(windows.shape[0], np.nan, dtype=np.float32)
+            w = good if self._shadow_same else carry_rows(good, self.core, self.shadow)
+            shadow[~bad] = self.shadow.score_windows(w, explain=False)[0]
+        feats = np.zeros((windows.shape[0], self.n_features), dtype=np.float32)
+        feats[~bad] = per_feat
+        probs = self.core.probs_from_scores(scores).astype(np.float32)
+
+        out: Dict[Hashable, Dict[str, Any]] = {}
+        i = 0
+        for sid, n, n_wait in spans:
+            m = n - n_wait
+            ready = np.zeros(n, dtype=bool); ready[n_wait:] = True
+            sanity = np.ones(n, dtype=bool); sanity[n_wait:] = ~bad[i:i + m]
+            score = np.full(n, np.nan, dtype=np.float32); score[n_wait:] = scores[i:i + m]
+            prob = np.full(n, np.nan, dtype=np.float32); prob[n_wait:] = probs[i:i + m]
+            scored = np.nonzero(~bad[i:i + m])[0]
+            top = self.core._top_contributors(feats[i + scored[-1]]) if scored.size else []
+            out[sid] = {"ready": ready, "score": score, "blackout_prob": prob, "sanity_ok": sanity,
+                        "top_contributors": top}
+            if shadow is not None:
+                out[sid]["shadow_score"] = np.full(n, np.nan, dtype=np.float32)
+                out[sid]["shadow_score"][n_wait:] = shadow[i:i + m]
+            i += m
+        return out
+
+    def push_and_eval(self, samples: Dict[Hashable, Dict[str, float]]) -> Dict[Hashable, Dict[str, Any]]:
+        """samples: {ship_id: flat_sample}. Pushes one sample per ship, then scores those ships in one batch."""
+        for sid, flat in samples.items():
+            self.push(sid, flat)
+        return self.evaluate(samples.keys())
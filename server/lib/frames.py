@@ -0,0 +1,194 @@
+"""
+Compact binary telemetry frames (Socket.IO binary attachments) instead of the full nested JSON per tick.
+
+The schema (field order, quantization steps, constants) goes to a client once ("frame_schema"); after
+that every tick is one "frame" of bytes, little-endian:
+
+    header      <BBHId   kind (1 = key, 2 = delta), version, n_fields, seq, timestamp (epoch s, NaN = none)
+    key body    float32[n_fields]                     values in feature_cols order, NaN = offline sensor
+    delta body  mask[ceil(n/8)] + int16[popcount]     per changed field: round((v - ref) / step)
+    prediction  <BffHB  flags (1 ready, 2 dropped, 4 kept by the pre-filter), score (NaN = None), blackout_prob, stale_for, k
+                k * <Bfe  feature index, contribution, percent (float16)
+
+Deltas are taken against the value the client reconstructs (`ref`, float32), not the previous raw value,
+so quantization error stays below step/2 and never accumulates. A keyframe is sent every
+`keyframe_every` frames and whenever a delta cannot be expressed (NaN in/out, int16 overflow).
+FrameDecoder is the reference decoder (client/src/lib/frames.ts does the same in the browser).
+"""
+import math, struct
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from lib.schema import doc_epoch
+
+VERSION = 1
+KEY, DELTA = 1, 2
+_HEADER = struct.Struct("<BBHId")
+_PRED = struct.Struct("<BffHB")
+_TOP = struct.Struct("<Bfe")
+_INT16_MAX = 32767
+
+# quantization step per unit suffix (max error = step / 2)
+STEPS = (("_online", 1.0), ("mode_code", 1.0), ("num_generators_online", 1.0), ("_hz", 0.001),
+         ("_v", 0.01), ("_kw", 0.1), ("_bar", 0.001), ("_celsius", 0.01), ("_mm_s", 0.001),
+         ("_meters", 0.001), ("_knots", 0.01), ("_degrees", 0.001))
+DEFAULT_STEP = 0.001
+
+# row_to_nested_json placeholders that never change; sent once with the schema
+CONSTANTS = {
+    "heavy_consumers_status": {"bow_thruster_1": "INACTIVE", "stabilizers": "INACTIVE"},
+    "maintenance_quality": {"generator_1_lube_oil_running_hours": None, "generator_2_lube_oil_running_hours": None,
+                            "generator_3_lube_oil_running_hours": None, "active_fuel_tank_cat_fines_ppm": None},
+}
+
+
+def quant_step(name: str) -> float:
+    for suffix, step in STEPS:
+        if name.endswith(suffix):
+            return step
+    return DEFAULT_STEP
+
+
+class FrameEncoder:
+    """One shared stream per producer; every client that holds a keyframe can apply the same deltas."""
+
+    def __init__(self, feature_cols: List[str], threshold: float, keyframe_every: int = 30):
+        self.feature_cols = list(feature_cols)
+        self.n = len(self.feature_cols)
+        self.name_to_idx = {c: i for i, c in enumerate(self.feature_cols)}
+        self.steps = np.array([quant_step(c) for c in self.feature_cols], dtype=np.float32)
+        self.threshold = float(threshold)
+        self.keyframe_every = int(keyframe_every)
+        self.ref = np.full(self.n, np.nan, dtype=np.float32)
+        self.seq = 0
+        self.since_key = 0
+        self._ts = math.nan
+        self._pred = b""
+        self.keyframes = 0
+
+    def schema(self) -> Dict[str, Any]:
+        return {"version": VERSION, "fields": self.feature_cols, "steps": self.steps.tolist(),
+                "threshold": self.threshold, "constants": CONSTANTS}
+
+    def encode(self, vec: np.ndarray, nested: Dict[str, Any], prediction: Dict[str, Any]) -> bytes:
+        """Next frame of the shared stream (delta when possible)."""
+        v = np.asarray(vec, dtype=np.float32)
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self._ts = doc_epoch(nested)
+        self._pred = self._pack_prediction(prediction)
+
+        body = None
+        if self.since_key + 1 < self.keyframe_every:
+            body = self._delta_body(v)
+        if body is None:
+            self.ref[:] = v
+            self.since_key = 0
+            self.keyframes += 1
+            return _HEADER.pack(KEY, VERSION, self.n, self.seq, self._ts) + self.ref.tobytes() + self._pred
+        self.since_key += 1
+        return _HEADER.pack(DELTA, VERSION, self.n, self.seq, self._ts) + body + self._pred
+
+    def sync_frame(self) -> bytes:
+        """Keyframe of the current stream state (same seq as the last frame), for a client joining mid-stream."""
+        return _HEADER.pack(KEY, VERSION, self.n, self.seq, self._ts) + self.ref.tobytes() + self._pred
+
+    def _delta_body(self, v: np.ndarray) -> Optional[bytes]:
+        nan_v, nan_r = np.isnan(v), np.isnan(self.ref)
+        if (nan_v != nan_r).any():
+            return None
+        live = ~nan_v
+        q = np.zeros(self.n, dtype=np.float64)
+        q[live] = np.rint((v[live].astype(np.float64) - self.ref[live]) / self.steps[live])
+        if np.abs(q).max(initial=0) > _INT16_MAX:
+            return None
+        changed = q != 0
+        qi = q[changed].astype(np.float32)
+        # same float32 ops as the decoder: ref += float32(q * step)
+        self.ref[changed] = self.ref[changed] + qi * self.steps[changed]
+        return np.packbits(changed, bitorder="little").tobytes() + q[changed].astype("<i2").tobytes()
+
+    def _pack_prediction(self, p: Dict[str, Any]) -> bytes:
+        flags = (1 if p.get("ready") else 0) | (2 if p.get("dropped") else 0) | \
+            (4 if p.get("engine") == "prefilter" else 0)
+        score = p.get("score")
+        top = p.get("top_contributors") or []
+        out = [_PRED.pack(flags, math.nan if score is None else float(score), float(p.get("blackout_prob") or 0.0),
+                          min(int(p.get("stale_for") or 0), 0xFFFF), len(top))]
+        for t in top:
+            out.append(_TOP.pack(self.name_to_idx.get(t["name"], 255), float(t["contribution"]), float(t["percent"])))
+        return b"".join(out)
+
+
+class FrameDecoder:
+    """Reference decoder: frames -> the legacy {"data": nested, "prediction": ...} payload."""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.fields = list(schema["fields"])
+        self.n = len(self.fields)
+        self.steps = np.array(schema["steps"], dtype=np.float32)
+        self.threshold = float(schema["threshold"])
+        self.constants = schema["constants"]
+        self.state: Optional[np.ndarray] = None
+        self.seq: Optional[int] = None
+
+    def decode(self, buf: bytes) -> Optional[Dict[str, Any]]:
+        """None when the frame cannot be applied (no keyframe yet / gap in seq): ask for a resync."""
+        kind, _, n, seq, ts = _HEADER.unpack_from(buf, 0)
+        off = _HEADER.size
+        if kind == KEY:
+            self.state = np.frombuffer(buf, dtype="<f4", count=n, offset=off).copy()
+            off += 4 * n
+        else:
+            if self.state is None or seq != ((self.seq or 0) + 1) & 0xFFFFFFFF:
+                return None
+            nb = (n + 7) // 8
+            changed = np.unpackbits(np.frombuffer(buf, np.uint8, nb, off), bitorder="little")[:n].astype(bool)
+            off += nb
+            q = np.frombuffer(buf, dtype="<i2", count=int(changed.sum()), offset=off)
+            off += 2 * q.size
+            self.state[changed] = self.state[changed] + q.astype(np.float32) * self.steps[changed]
+        self.seq = seq
+
+        flags, score, prob, stale, k = _PRED.unpack_from(buf, off)
+        off += _PRED.size
+        top = []
+        for _ in range(k):
+            i, c, pct = _TOP.unpack_from(buf, off)
+            off += _TOP.size
+            top.append({"name": self.fields[i] if i < self.n else "?", "contribution": c, "percent": float(pct)})
+        engine = None if not flags & 1 else "prefilter" if flags & 4 else "stride" if stale else "lstm"
+        prediction = {"ready": bool(flags & 1), "score": None if math.isnan(score) else score,
+                      "threshold": self.threshold, "blackout_prob": prob, "top_contributors": top, "stale_for": stale,
+                      "engine": engine}
+        if flags & 2:
+            prediction["dropped"] = True
+        return {"data": self.nested(ts), "prediction": prediction}
+
+    def nested(self, ts: float) -> Dict[str, Any]:
+        val = {f: (None if math.isnan(x) else float(x)) for f, x in zip(self.fields, self.state)}
+        modes = {1.0: "startup", 2.0: "stable", 3.0: "high_load", 4.0: "bad_env"}
+        mode = modes.get(val.get("mode_code"), "unknown")
+        gens = {}
+        for i in range(1, 5):
+            if not val.get(f"g{i}_online"):
+                gens[f"generator_{i}"] = None
+                continue
+            p = f"g{i}_"
+            gens[f"generator_{i}"] = {f[len(p):]: v for f, v in val.items() if f.startswith(p) and f != p + "online"}
+        env_keys = ("wave_height_meters", "wind_speed_knots", "ship_pitch_degrees", "ship_roll_degrees")
+        return {
+            "timestamp": None if math.isnan(ts) else datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+            "mode": mode,
+            "num_generators_online": val.get("num_generators_online"),
+            "main_features": gens,
+            "distribution_features": {k: val.get(k) for k in ("msb_total_active_power_kw", "msb_busbar_voltage_v")},
+            "contextual_features": {
+                "system_status": {"num_generators_online": val.get("num_generators_online"), "pms_mode": mode,
+                                  "heavy_consumers_status": self.constants["heavy_consumers_status"]},
+                "maintenance_quality": self.constants["maintenance_quality"],
+                "environmental": {**{k: val.get(k) for k in env_keys},
+                                  "wind_direction_degrees": None, "ocean_current_speed_knots": None},
+            },
+        }
@@ -1,23 +1,23 @@
 import numpy as np
 import random
 from datetime import datetime, timezone, timedelta
-import pandas as pd 
 import time
 
 SEED = 99
 
 class ARParam:
-    def __init__(self, base, rel_sigma=0.002, min_val=None, max_val=None):
+    def __init__(self, base, rel_sigma=0.002, min_val=None, max_val=None, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.value = float(base)
         self.rel_sigma = rel_sigma
         self.min_val = min_val
         self.max_val = max_val
     def step(self, drift=0.0, anomaly=False, anomaly_scale=0.2):
         if anomaly:
-            jump = np.random.normal(0, max(abs(self.value)*anomaly_scale, 1e-3))
+            jump = self.rng.normal(0, max(abs(self.value)*anomaly_scale, 1e-3))
             self.value += jump + drift
         else:
-            noise = np.random.normal(0, max(abs(self.value)*self.rel_sigma, 1e-6))
+            noise = self.rng.normal(0, max(abs(self.value)*self.rel_sigma, 1e-6))
             self.value += noise + drift
         if self.min_val is not None: self.value = max(self.min_val, self.value)
         if self.max_val is not None: self.value = min(self.max_val, self.value)
@@ -26,7 +26,8 @@ class ARParam:
 class SimpleShipSim:
     """State machine: startup → stable ↔ {bad_env, high_load}; korelasi wave→(roll,pitch)→vibration, load→(coolant, exhaust, lube)."""
     def __init__(self, seed=0, dt_seconds=5, startup_secs=240, min_stable=60, min_env=40, cooldown=60):
-        random.seed(seed); np.random.seed(seed)
+        # RNG sendiri (seperti FleetShipSim): membuat sim tidak mereset random / np.random global
+        self.rng = np.random.default_rng(seed); self.random = random.Random(seed)
         self.t = datetime.now(timezone.utc); self.dt = dt_seconds
         self.mode = "startup"; self.m_t = 0
         self.startup_secs = startup_secs; self.min_stable=min_stable
@@ -35,26 +36,30 @@ class SimpleShipSim:
         self.num_online = 2
 
         self.env = {
-            "wave_height_meters": ARParam(0.5, rel_sigma=0.05, min_val=0),
-            "wind_speed_knots": ARParam(8.0, rel_sigma=0.05, min_val=0),
-            "ship_roll_degrees": ARParam(0.5, rel_sigma=0.02),
-            "ship_pitch_degrees": ARParam(0.5, rel_sigma=0.02),
+            "wave_height_meters": ARParam(0.5, rel_sigma=0.05, min_val=0, rng=self.rng),
+            "wind_speed_knots": ARParam(8.0, rel_sigma=0.05, min_val=0, rng=self.rng),
+            "ship_roll_degrees": ARParam(0.5, rel_sigma=0.02, rng=self.rng),
+            "ship_pitch_degrees": ARParam(0.5, rel_sigma=0.02, rng=self.rng),
         }
 
         self.g = {}
         for i in range(1,5):
             base_load = 900.0 + (i-1)*40.0
             self.g[f"g{i}"] = {
-                "load_kw": ARParam(base_load*0.5, rel_sigma=0.01, min_val=0),
-                "frequency_hz": ARParam(50.0, rel_sigma=0.0004, min_val=49.5, max_val=50.5),
-                "lube_oil_pressure_bar": ARParam(1.6, rel_sigma=0.01, min_val=0),
-                "coolant_temperature_celsius": ARParam(40.0, rel_sigma=0.01, min_val=-10),
-                "exhaust_gas_temperature_celsius": ARParam(180.0, rel_sigma=0.01, min_val=0),
-                "vibration_level_mm_s": ARParam(0.7 + 0.05*(i-1), rel_sigma=0.03, min_val=0),
+                "load_kw": ARParam(base_load*0.5, rel_sigma=0.01, min_val=0, rng=self.rng),
+                "frequency_hz": ARParam(50.0, rel_sigma=0.0004, min_val=49.5, max_val=50.5, rng=self.rng),
+                "lube_oil_pressure_bar": ARParam(1.6, rel_sigma=0.01, min_val=0, rng=self.rng),
+                "coolant_temperature_celsius": ARParam(40.0, rel_sigma=0.01, min_val=-10, rng=self.rng),
+                "exhaust_gas_temperature_celsius": ARParam(180.0, rel_sigma=0.01, min_val=0, rng=self.rng),
+                "vibration_level_mm_s": ARParam(0.7 + 0.05*(i-1), rel_sigma=0.03, min_val=0, rng=self.rng),
             }
 
         self.msb_voltage_base = 690.0
 
+    def advance(self, n):
+        """Majukan jam simulator n langkah tanpa membuat sampel (deadline tick yang dilewati)."""
+        self.t += timedelta(seconds=self.dt * n)
+
     def _enter(self, m, n_online=None):
         self.mode = m; self.m_t = 0
         if n_online is not None: self.num_online = n_online
@@ -66,10 +71,10 @@ class SimpleShipSim:
         if self.mode=="startup" and self.m_t >= self.startup_secs:
             self._enter("stable", n_online=3)
         elif self.mode=="stable" and self.m_t>=self.min_stable and (self.t.timestamp()-self.last_env_exit)>=self.cooldown:
-            u = random.random()
+            u = self.random.random()
             if u < 0.03: self._enter("high_load", n_online=3)
             elif u < 0.08: self._enter("bad_env", n_online=3)
-        elif self.mode in ("bad_env","high_load") and self.m_t>=self.min_env and random.random()<0.08:
+        elif self.mode in ("bad_env","high_load") and self.m_t>=self.min_env and self.random.random()<0.08:
             self.last_env_exit = self.t.timestamp(); self._enter("stable", n_online=3)
 
         # environment + correlations
@@ -83,7 +88,7 @@ class SimpleShipSim:
 
         # num gens (ramp during startup)
         if self.mode=="startup" and self.m_t%20==0: self.num_online = min(4, self.num_online+1)
-        elif self.mode!="startup" and random.random()<0.003: self.num_online = min(4, max(1, self.num_online+random.choice([-1,1])))
+        elif self.mode!="startup" and self.random.random()<0.003: self.num_online = min(4, max(1, self.num_online+self.random.choice([-1,1])))
 
         # per-timestep row
         row = {
@@ -134,10 +139,200 @@ class SimpleShipSim:
                     f"{gk}_vibration_level_mm_s": 0,
                 })
 
-        row["msb_total_active_power_kw"] = float(total_kw + np.random.normal(0, 3.0))
-        row["msb_busbar_voltage_v"] = float(self.msb_voltage_base + np.random.normal(0,2.0) - 0.02*roll)
+        row["msb_total_active_power_kw"] = float(total_kw + self.rng.normal(0, 3.0))
+        row["msb_busbar_voltage_v"] = float(self.msb_voltage_base + self.rng.normal(0,2.0) - 0.02*roll)
         return row
 
+class FleetShipSim:
+    """
+    Versi vektor dari SimpleShipSim untuk S kapal sekaligus: semua state AR (S kapal x F sensor) di array NumPy,
+    RNG per instance (np.random.Generator, tidak menyentuh random/np.random global), noise diambil per blok.
+    Perilaku statistik sama: state machine mode, wave -> roll/pitch -> vibration, load -> suhu/exhaust.
+
+    step()            -> list S dict baris (format sama dengan SimpleShipSim.step)
+    generate(n_steps) -> dict kolom: "timestamp" (T,) epoch detik, "mode_code" (T,S) int8 (MODES), sisanya (T,S) float
+    """
+    MODES = ("startup", "stable", "high_load", "bad_env")           # mode_code 1..4, sama dengan MODE_MAP
+    _STARTUP, _STABLE, _HIGH, _BAD = 1, 2, 3, 4
+    _ENV_MULT = np.array([0.0, 0.4, 1.0, 1.2, 2.0])                 # index = mode_code
+    ENV_KEYS = ("wave_height_meters", "wind_speed_knots", "ship_roll_degrees", "ship_pitch_degrees")
+    GEN_KEYS = ("load_kw", "frequency_hz", "lube_oil_pressure_bar", "coolant_temperature_celsius",
+                "exhaust_gas_temperature_celsius", "vibration_level_mm_s")
+
+    def __init__(self, n_ships=1, seed=0, dt_seconds=5, startup_secs=240, min_stable=60, min_env=40, cooldown=60,
+                 block=256):
+        self.S = int(n_ships)
+        self.rng = np.random.default_rng(seed)
+        self.t = datetime.now(timezone.utc).timestamp(); self.dt = dt_seconds
+        self.startup_secs = startup_secs; self.min_stable = min_stable
+        self.min_env = min_env; self.cooldown = cooldown
+        self.block = int(block)
+
+        S = self.S
+        self.mode = np.full(S, self._STARTUP, np.int8)
+        self.m_t = np.zeros(S, np.int64)
+        self.last_env_exit = np.full(S, -1e9)
+        self.num_online = np.full(S, 2, np.int64)
+
+        # env AR: wave, wind, roll, pitch
+        self.env = np.tile(np.array([0.5, 8.0, 0.5, 0.5]), (S, 1))
+        self.env_sigma = np.array([0.05, 0.05, 0.02, 0.02])
+        self.env_min = np.array([0.0, 0.0, -np.inf, -np.inf])
+
+        # generator AR: (S, 4 gens, 6 sensors) in GEN_KEYS order
+        g = np.empty((4, 6))
+        for i in range(4):
+            g[i] = [(900.0 + i * 40.0) * 0.5, 50.0, 1.6, 40.0, 180.0, 0.7 + 0.05 * i]
+        self.gen = np.tile(g, (S, 1, 1))
+        self.gen_sigma = np.array([0.01, 0.0004, 0.01, 0.01, 0.01, 0.03])
+        self.gen_min = np.array([0.0, 49.5, 0.0, -10.0, 0.0, 0.0])
+        self.gen_max = np.array([np.inf, 50.5, np.inf, np.inf, np.inf, np.inf])
+        self.gen_base = np.array([900.0 + 40.0 * i for i in range(4)])
+
+        self.msb_voltage_base = 690.0
+        self._z = None; self._u = None; self._k = self.block      # noise blocks
+
+    # ---------- noise in blocks ----------
+    def _draw(self):
+        if self._k >= self.block:
+            self._z = self.rng.standard_normal((self.block, self.S, 4 + 24 + 2))
+            self._u = self.rng.random((self.block, self.S, 3))
+            self._k = 0
+        z, u = self._z[self._k], self._u[self._k]
+        self._k += 1
+        return z, u
+
+    # ---------- one tick for all ships ----------
+    def _advance(self):
+        S = self.S
+        z, u = self._draw()
+        self.t += self.dt; self.m_t += 1
+
+        # transitions (dwell + cooldown), same order/conditions as SimpleShipSim
+        mode = self.mode
+        to_stable_startup = (mode == self._STARTUP) & (self.m_t >= self.startup_secs)
+        in_stable = (mode == self._STABLE) & (self.m_t >= self.min_stable) & ((self.t - self.last_env_exit) >= self.cooldown)
+        to_high = in_stable & (u[:, 0] < 0.03)
+        to_bad = in_stable & (u[:, 0] >= 0.03) & (u[:, 0] < 0.08)
+        in_env = ((mode == self._BAD) | (mode == self._HIGH)) & (self.m_t >= self.min_env) & (u[:, 0] < 0.08)
+        self.last_env_exit = np.where(in_env, self.t, self.last_env_exit)
+        new_mode = mode.copy()
+        new_mode[to_stable_startup | in_env] = self._STABLE
+        new_mode[to_high] = self._HIGH
+        new_mode[to_bad] = self._BAD
+        changed = new_mode != mode
+        self.m_t[changed] = 0
+        self.num_online[changed] = 3
+        self.mode = mode = new_mode
+
+        # environment + correlations
+        env_mult = self._ENV_MULT[mode]
+        e = self.env
+        drift = np.empty((S, 4))
+        drift[:, 0] = (1.0 * env_mult - e[:, 0]) * 0.02
+        drift[:, 1] = (8.0 * env_mult - e[:, 1]) * 0.01
+        sig = np.maximum(np.abs(e) * self.env_sigma, 1e-6)
+        # wave & wind first: roll/pitch drift on the *new* wave height
+        e[:, :2] = np.maximum(e[:, :2] + z[:, :2] * sig[:, :2] + drift[:, :2], self.env_min[:2])
+        wh = e[:, 0]
+        drift[:, 2] = (1.4 * wh - e[:, 2]) * 0.15
+        drift[:, 3] = (0.7 * wh - e[:, 3]) * 0.1
+        e[:, 2:] = e[:, 2:] + z[:, 2:4] * sig[:, 2:] + drift[:, 2:]
+        wind, roll = e[:, 1], e[:, 2]
+
+        # num gens (ramp during startup, random +/-1 otherwise)
+        startup = mode == self._STARTUP
+        ramp = startup & (self.m_t % 20 == 0)
+        self.num_online[ramp] = np.minimum(4, self.num_online[ramp] + 1)
+        flip = ~startup & (u[:, 1] < 0.003)
+        step = np.where(u[:, 2] < 0.5, -1, 1)
+        self.num_online[flip] = np.clip(self.num_online[flip] + step[flip], 1, 4)
+
+        # generators: only online ones advance
+        base_load = np.where(startup, 600.0, 900.0) * np.where(mode == self._HIGH, 1.5, 1.0)
+        elf = 1.0 + 0.02 * wh + 0.005 * wind
+        target = base_load[:, None] + (self.gen_base[None, :] * elf[:, None] - 900.0)        # (S,4)
+        online = np.arange(1, 5)[None, :] <= self.num_online[:, None]                        # (S,4)
+
+        g = self.gen
+        gz = z[:, 4:28].reshape(S, 4, 6)
+        sig = np.maximum(np.abs(g) * self.gen_sigma, 1e-6)
+        new = g.copy()
+        load = np.maximum(g[..., 0] + gz[..., 0] * sig[..., 0] + (target - g[..., 0]) * 0.05, 0.0)
+        new[..., 0] = load
+        new[..., 1:3] = g[..., 1:3] + gz[..., 1:3] * sig[..., 1:3]
+        new[..., 3] = g[..., 3] + gz[..., 3] * sig[..., 3] + 0.02 * (load - 600.0) / 10.0
+        new[..., 4] = g[..., 4] + gz[..., 4] * sig[..., 4] + 0.15 * load / 1000.0
+        new[..., 5] = g[..., 5] + gz[..., 5] * sig[..., 5] + 0.02 * (0.12 * np.abs(roll))[:, None] * g[..., 5]
+        np.clip(new, self.gen_min, self.gen_max, out=new)
+        self.gen = np.where(online[..., None], new, g)
+
+        total_kw = np.where(online, self.gen[..., 0], 0.0).sum(axis=1)
+        msb_kw = total_kw + z[:, 28] * 3.0
+        msb_v = self.msb_voltage_base + z[:, 29] * 2.0 - 0.02 * roll
+        return online, msb_kw, msb_v
+
+    def step(self):
+        """Satu tick untuk semua kapal -> list S dict baris (format SimpleShipSim.step)."""
+        online, msb_kw, msb_v = self._advance()
+        ts = datetime.fromtimestamp(self.t, timezone.utc).isoformat()
+        rows = []
+        for s in range(self.S):
+            row = {
+                "timestamp": ts, "mode": self.MODES[self.mode[s] - 1],
+                "num_generators_online": float(self.num_online[s]),
+            }
+            for j, k in enumerate(self.ENV_KEYS):
+                row[k] = float(self.env[s, j])
+            for i in range(4):
+                gk = f"g{i+1}"
+                on = bool(online[s, i])
+                row[f"{gk}_online"] = 1.0 if on else 0.0
+                for j, k in enumerate(self.GEN_KEYS):
+                    row[f"{gk}_{k}"] = float(self.gen[s, i, j]) if on else 0
+            row["msb_total_active_power_kw"] = float(msb_kw[s])
+            row["msb_busbar_voltage_v"] = float(msb_v[s])
+            rows.append(row)
+        return rows
+
+    def generate(self, n_steps):
+        """n_steps tick untuk semua kapal -> dict kolom (T,S); generator offline -> sensor NaN, gK_online 0."""
+        T, S = int(n_steps), self.S
+        out = {"timestamp": np.empty(T), "mode_code": np.empty((T, S), np.int8),
+               "num_generators_online": np.empty((T, S))}
+        env = np.empty((T, S, 4))
+        gen = np.empty((T, S, 4, 6))
+        on = np.empty((T, S, 4), bool)
+        msb = np.empty((T, S, 2))
+        for t in range(T):
+            online, msb_kw, msb_v = self._advance()
+            out["timestamp"][t] = self.t
+            out["mode_code"][t] = self.mode
+            out["num_generators_online"][t] = self.num_online
+            env[t] = self.env; gen[t] = self.gen; on[t] = online
+            msb[t, :, 0] = msb_kw; msb[t, :, 1] = msb_v
+        gen[~on] = np.nan
+        for j, k in enumerate(self.ENV_KEYS):
+            out[k] = env[..., j]
+        for i in range(4):
+            out[f"g{i+1}_online"] = on[..., i].astype(np.float64)
+            for j, k in enumerate(self.GEN_KEYS):
+                out[f"g{i+1}_{k}"] = gen[:, :, i, j]
+        out["msb_total_active_power_kw"] = msb[..., 0]
+        out["msb_busbar_voltage_v"] = msb[..., 1]
+        return out
+
+    @staticmethod
+    def to_features(cols, feature_cols):
+        """Kolom generate() -> matriks fitur mentah (T,S,D) float32 urut feature_cols (mode_code = kode mode)."""
+        T, S = cols["mode_code"].shape
+        X = np.zeros((T, S, len(feature_cols)), np.float32)
+        for d, c in enumerate(feature_cols):
+            if c in cols:
+                X[..., d] = cols[c]
+        return X
+
+
 def row_to_nested_json(row):
     # row: pandas.Series dari df.iloc[idx]
     def gen_block(i):
@@ -0,0 +1,129 @@
+"""
+Parallel Monte-Carlo evaluation harness (dipakai oleh generate-test.py).
+
+Each scenario: SimpleShipSim(seed) for n_ticks samples, optionally one feature scaled by a factor
+from anomaly_start on, then every sliding window scored in batches (lib/score_batch.score_matrix).
+Scenarios fan out over a process pool; each worker loads config/scaler/model once.
+"""
+import json, os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from lib.generator1 import SimpleShipSim, row_to_nested_json
+
+_EV = None          # per-worker LSTMAE_Evaluator
+_HOP = 1
+
+
+def _init_worker(artifacts_dir: str, backend: Optional[str], hop: int, threads: int) -> None:
+    global _EV, _HOP
+    import torch
+    torch.set_num_threads(threads)      # workers = cores; keep torch from oversubscribing
+    from lib.pred import LSTMAE_Evaluator
+    _EV = LSTMAE_Evaluator(artifacts_dir=artifacts_dir, device="cpu", backend=backend)
+    _HOP = hop
+
+
+def make_scenarios(n: int, seed: int = 0, min_ticks: int = 500, max_ticks: int = 1000,
+                   inject: bool = False, feature_cols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Scenario specs, reproducible from `seed`. With inject=True one random feature is scaled by 0.3..1.7."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        n_ticks = int(rng.integers(min_ticks, max_ticks + 1))
+        spec = {"index": i, "seed": n_ticks + 1000 * i, "n_ticks": n_ticks,
+                "anomaly_col": None, "anomaly_start": None, "anomaly_factor": None}
+        if inject and feature_cols:
+            spec["anomaly_col"] = str(rng.choice([c for c in feature_cols if not c.endswith("_online")]))
+            spec["anomaly_start"] = int(rng.integers(n_ticks // 2, n_ticks - 10))
+            spec["anomaly_factor"] = float(rng.choice([rng.uniform(0.3, 0.7), rng.uniform(1.3, 1.7)]))
+        out.append(spec)
+    return out
+
+
+def run_scenario(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs in a worker. Returns per-window arrays + a final-sample summary."""
+    from lib.score_batch import score_matrix
+    ev = _EV
+    sim = SimpleShipSim(seed=spec["seed"])
+    X = ev.schema.to_matrix(row_to_nested_json(sim.step()) for _ in range(spec["n_ticks"]))
+    if spec["anomaly_col"] is not None:
+        X[spec["anomaly_start"]:, ev.name_to_idx[spec["anomaly_col"]]] *= spec["anomaly_factor"]
+    raw_tail = X[-ev.seq_len:].copy()       # raw values of the last window, for the contributor averages
+
+    cols = score_matrix(ev, X, hop=_HOP)
+    k = sum(1 for c in cols if c.startswith("top") and c.endswith("_name"))
+    last = -1
+    top_names = [str(cols[f"top{j + 1}_name"][last]) for j in range(k)]
+    summary = {
+        **spec,
+        "final_score": float(cols["score"][last]),
+        "final_blackout_prob": float(cols["blackout_prob"][last]),
+        "above_rate": float(cols["above_threshold"].mean()),
+        "top_contributors": top_names,
+        "top_contributor_means": [float(np.nanmean(raw_tail[:, ev.name_to_idx[n]])) for n in top_names],
+    }
+    if spec["anomaly_start"] is not None:
+        after = cols["end_row"] >= spec["anomaly_start"]
+        before = cols["score"][~after][-ev.seq_len:]        # reference: the last L windows before the fault
+        level = max(ev.threshold, float(before.max()) if before.size else ev.threshold)
+        hit = np.nonzero(cols["score"][after] > level)[0]
+        summary["detect_delay"] = int(cols["end_row"][after][hit[0]] - spec["anomaly_start"]) if hit.size else None
+    return {"summary": summary, "end_row": cols["end_row"], "score": cols["score"],
+            "blackout_prob": cols["blackout_prob"]}
+
+
+def run(scenarios: List[Dict[str, Any]], artifacts_dir: str = "artifacts", workers: Optional[int] = None,
+        backend: Optional[str] = None, hop: int = 1, threads_per_worker: int = 1):
+    workers = workers or os.cpu_count() or 1
+    init = (artifacts_dir, backend, hop, threads_per_worker)
+    if workers == 1:
+        _init_worker(*init)
+        return [run_scenario(s) for s in scenarios]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init) as pool:
+        return list(pool.map(run_scenario, scenarios, chunksize=max(1, len(scenarios) // (workers * 4))))
+
+
+def aggregate(results: List[Dict[str, Any]], threshold: float) -> Dict[str, Any]:
+    """Summary statistics over all scenarios."""
+    final = np.array([r["summary"]["final_score"] for r in results])
+    allw = np.concatenate([r["score"] for r in results]) if results else np.empty(0)
+    out = {
+        "n_scenarios": len(results),
+        "n_windows": int(allw.size),
+        "threshold": threshold,
+        "window_score_mean": float(allw.mean()) if allw.size else None,
+        "window_score_p50": float(np.quantile(allw, 0.5)) if allw.size else None,
+        "window_score_p95": float(np.quantile(allw, 0.95)) if allw.size else None,
+        "window_score_p99": float(np.quantile(allw, 0.99)) if allw.size else None,
+        "window_above_rate": float((allw > threshold).mean()) if allw.size else None,
+        "final_score_mean": float(final.mean()) if final.size else None,
+        "final_above_rate": float((final > threshold).mean()) if final.size else None,
+    }
+    delays = [r["summary"].get("detect_delay") for r in results if r["summary"]["anomaly_col"] is not None]
+    if delays:
+        got = [d for d in delays if d is not None]
+        out["injected"] = len(delays)
+        out["detected"] = len(got)
+        out["detect_delay_mean"] = float(np.mean(got)) if got else None
+        out["detect_delay_max"] = int(np.max(got)) if got else None
+    return out
+
+
+def write_results(results: List[Dict[str, Any]], stats: Dict[str, Any], path: str) -> None:
+    """
+    One compact columnar file with every scored window (scenario, end_row, score, blackout_prob)
+    plus <path>.summary.json with per-scenario summaries and the aggregate statistics.
+    """
+    from lib.score_batch import write_columns
+    cols = {
+        "scenario": np.concatenate([np.full(r["score"].shape[0], r["summary"]["index"], np.int32) for r in results]),
+        "end_row": np.concatenate([r["end_row"].astype(np.int32) for r in results]),
+        "score": np.concatenate([r["score"] for r in results]),
+        "blackout_prob": np.concatenate([r["blackout_prob"] for r in results]),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_columns(cols, path)
+    with open(os.path.splitext(path)[0] + ".summary.json", "w") as f:
+        json.dump({"stats": stats, "scenarios": [r["summary"] for r in results]}, f, indent=4)
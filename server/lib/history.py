@@ -0,0 +1,142 @@
+"""
+History queries over the time-series store (lib/store.py) and the recent in-memory ring.
+
+    query_history(store, "sim", "score", t0, t1, points=1000, method="minmax")
+
+series: "score", "blackout_prob" or a feature column. method:
+    minmax / mean -- equal-width buckets with n / mean / min / max. When a bucket is a minute or wider the
+                     edges snap to whole minutes, the rolled-up part of the range is served from the minute
+                     rollups and only the unsealed tail is read raw (a week of 1 Hz data touches ~10k rollup
+                     rows instead of 600k raw rows)
+    lttb          -- `points` samples picked by largest-triangle-three-buckets: raw samples for short ranges,
+                     minute means (+ raw tail) once a bucket is a minute or wider, and minute means for the
+                     part of a range already past raw retention
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from lib.downsample import bucket_edges, bucket_stats, finish_stats, lttb, merge_stats
+from lib.store import TimeSeriesStore
+
+METHODS = ("minmax", "mean", "lttb")
+MAX_POINTS = 10000
+_ROLLUP_COL = {"score": "score", "blackout_prob": "prob"}
+_RAW_COL = {"score": "score", "blackout_prob": "prob"}
+
+
+def _floats(a: np.ndarray, digits: int = 6) -> List[Optional[float]]:
+    return [None if math.isnan(v) else v for v in np.round(np.asarray(a, np.float64), digits).tolist()]
+
+
+class RecentRing:
+    """Last `capacity` ticks (ts + one float32 row per tick) for the history sent on connect."""
+
+    def __init__(self, capacity: int, columns: List[str]):
+        self.capacity = int(capacity)
+        self.columns = list(columns)
+        self.ts = np.zeros(self.capacity, np.float64)
+        self.values = np.zeros((self.capacity, len(self.columns)), np.float32)
+        self.pos = 0
+        self.count = 0
+
+    def append(self, ts: float, row) -> None:
+        self.ts[self.pos] = ts
+        self.values[self.pos] = row
+        self.pos = (self.pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def snapshot(self, since: float = -np.inf):
+        """(ts (n,), values (n,C)) oldest first, copies."""
+        order = np.arange(self.pos - self.count, self.pos) % self.capacity
+        ts, values = self.ts[order], self.values[order]
+        keep = ts >= since
+        return ts[keep], values[keep]
+
+    def message(self, vessel: str, since: float = -np.inf) -> Dict[str, Any]:
+        """Compact Socket.IO payload: column names + little-endian float64 ts / float32 (n,C) values as bytes."""
+        ts, values = self.snapshot(since)
+        return {"vessel": vessel, "columns": self.columns, "n": int(ts.size),
+                "ts": ts.astype("<f8").tobytes(), "values": values.astype("<f4").tobytes()}
+
+
+def query_history(store: TimeSeriesStore, vessel: str, series: str, t0: float, t1: float,
+                  points: int = 1000, method: str = "minmax") -> Dict[str, Any]:
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}; expected one of {METHODS}")
+    if not (t1 > t0):
+        raise ValueError("end must be after start")
+    points = max(3, min(int(points), MAX_POINTS))
+    if series in _RAW_COL:
+        raw_col, j = _RAW_COL[series], None
+    elif series in store.feature_cols:
+        raw_col, j = "x", store.feature_cols.index(series)
+    else:
+        raise ValueError(f"Unknown series {series!r}")
+    roll_col = _ROLLUP_COL.get(series, "x")
+
+    def raw(a: float, b: float):
+        r = store.read(vessel, a, b, columns=("ts", raw_col))
+        y = r[raw_col] if j is None else r[raw_col][:, j]
+        return np.asarray(r["ts"]), np.asarray(y, np.float32)
+
+    def rollup(a: float, b: float):
+        r = store.read_rollup(vessel, a, b)
+        if not r:
+            return None
+        pick = (lambda k: r[f"{roll_col}_{k}"]) if j is None else (lambda k: r[f"{roll_col}_{k}"][:, j])
+        return r["ts"], pick("n"), pick("mean"), pick("min"), pick("max")
+
+    cut = store.unsealed_start(vessel)              # rows from here on exist only raw
+    out: Dict[str, Any] = {"vessel": vessel, "series": series, "method": method, "start": t0, "end": t1}
+
+    width = (t1 - t0) / points
+    use_rollup = width >= 60.0
+
+    if method == "lttb":
+        # buckets of a minute or more: LTTB over the minute means of the rolled-up part (+ raw tail)
+        raw_from, parts_t, parts_y = t0, [], []
+        if use_rollup:
+            ro = rollup(t0, min(cut, t1))
+            if ro is not None:
+                parts_t.append(ro[0] + 30.0); parts_y.append(ro[2])
+                raw_from = max(t0, cut)
+        if raw_from < t1:
+            t, y = raw(raw_from, t1)
+            if t.size and t[0] > raw_from and not parts_t:          # older than raw retention
+                ro = rollup(raw_from, t[0])
+                if ro is not None:
+                    parts_t.append(ro[0] + 30.0); parts_y.append(ro[2])
+            parts_t.append(t); parts_y.append(y)
+        t, y = np.concatenate(parts_t), np.concatenate(parts_y)
+        idx = lttb(t, y, points)
+        out.update({"source": "raw" if len(parts_t) == 1 else "rollup+raw", "t": _floats(t[idx], 3),
+                    "v": _floats(y[idx])})
+        return out
+
+    stats, source = None, "raw"
+    raw_from = t0
+    if use_rollup:
+        # bucket edges on whole minutes so every minute rollup falls in exactly one bucket
+        width = math.ceil(width / 60.0) * 60.0
+        start = math.floor(t0 / 60.0) * 60.0
+        edges = start + width * np.arange(math.ceil((t1 - start) / width) + 1)
+    else:
+        edges = bucket_edges(t0, t1, points)
+    if use_rollup:
+        ro = rollup(t0, min(cut, t1))
+        if ro is not None:
+            rt, n, mean, lo, hi = ro
+            stats = bucket_stats(rt, mean, edges, n=n, y_min=lo, y_max=hi)
+            raw_from = max(t0, cut)
+            source = "rollup" if raw_from >= t1 else "rollup+raw"
+    if raw_from < t1:
+        t, y = raw(raw_from, t1)
+        rs = bucket_stats(t, y, edges)
+        stats = rs if stats is None else merge_stats(stats, rs)
+    b = finish_stats(stats, edges)
+    out.update({"source": source, "t": _floats(b["t"], 3), "mean": _floats(b["mean"]), "n": b["n"].astype(int).tolist()})
+    if method == "minmax":
+        out.update({"min": _floats(b["min"]), "max": _floats(b["max"])})
+    return out
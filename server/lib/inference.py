@@ -0,0 +1,252 @@
+"""
+Model inference off the asyncio event loop.
+
+InferenceWorker owns one LSTMAE_Evaluator and runs push_vector_and_eval on a dedicated thread, so the
+forward pass, scaling and sanity checks never block uvicorn (Socket.IO heartbeats, connects, emits).
+
+    worker = InferenceWorker(pred, maxsize=8, threads=2, registry=metrics)
+    fut = worker.submit(vec)                # queued right away; the caller may go on producing
+    out = await fut                         # same dict as pred.push_vector_and_eval(vec)
+    worker.close()
+
+Backpressure is drop-oldest: when `maxsize` samples are already waiting, the oldest one is not scored.
+Its row is still pushed into the window (the next score sees a continuous window) and its future
+resolves right away with the last result marked "dropped": True. The policy only applies to callers that
+keep submitting without awaiting each result: the server's produce_loop submits once per tick and hands
+the futures to consume_loop, so the queue fills (and drops) whenever scoring is slower than the tick rate.
+A caller that awaits every submit() never has more than one sample waiting.
+
+Model changes (lib/versions.py) also run on the inference thread, between two samples:
+
+    await worker.swap(candidate)            # window carried over, next sample is scored by the candidate
+    await worker.set_shadow(candidate, ShadowStats(...))    # also score each fresh window with it
+    await worker.set_shadow(None)
+"""
+import asyncio, collections, threading, time
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from lib.metrics import Histogram, Registry
+from lib.versions import ShadowStats, carry_rows, same_scaling
+
+
+class InferenceWorker:
+    def __init__(self, pred, maxsize: int = 8, threads: Optional[int] = None,
+                 registry: Optional[Registry] = None, stage_seconds: Optional[Histogram] = None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        if threads:
+            import torch                            # the evaluator has loaded it already
+            torch.set_num_threads(int(threads))     # intra-op threads are process-wide
+        self.pred = pred
+        self.maxsize = int(maxsize)
+        self.stage_seconds = stage_seconds          # observes pred.last_timings per stage
+        self._queue: Deque[list] = collections.deque()          # [row, future, loop, t_submit]
+        self._skipped: Deque[np.ndarray] = collections.deque(maxlen=pred.seq_len)   # rows of dropped samples
+        self._control: Deque[tuple] = collections.deque()        # (fn, future, loop), before the next sample
+        self.shadow = None
+        self.shadow_stats: Optional[ShadowStats] = None
+        self._shadow_own_ring = False               # False: shadow scores the primary's window as-is
+        self._cond = threading.Condition()
+        self._closed = False
+        self.processed = 0
+        self.dropped = 0
+
+        self._m_depth = self._m_dropped = self._m_wait = None
+        if registry is not None:
+            self._m_depth = registry.gauge("inference_queue_depth", "Samples waiting for the inference thread")
+            self._m_dropped = registry.counter("inference_dropped_total", "Samples pushed without scoring (drop-oldest)")
+            self._m_wait = registry.histogram("inference_queue_wait_seconds", "Time from submit to start of scoring")
+
+        self._thread = threading.Thread(target=self._run, name="inference", daemon=True)
+        self._thread.start()
+
+    # ---------- loop side ----------
+    def submit(self, vec) -> "asyncio.Future":
+        """Queue one raw (D,) vector. Must be called from the event loop; returns a future with the result."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._enqueue(vec, fut, loop)
+        return fut
+
+    def push(self, vec) -> None:
+        """Queue one raw (D,) vector that only enters the window (no scoring, no result)."""
+        self._enqueue(vec, None, None)
+
+    def _enqueue(self, vec, fut, loop) -> None:
+        row = np.array(vec, dtype=np.float32).reshape(-1)
+        dropped = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("InferenceWorker is closed")
+            if len(self._queue) >= self.maxsize:
+                dropped = self._queue.popleft()
+                self._skipped.append(dropped[0])
+                self.dropped += 1
+            self._queue.append([row, fut, loop, time.perf_counter()])
+            depth = len(self._queue)
+            self._cond.notify()
+        if self._m_depth is not None:
+            self._m_depth.set(depth)
+        if dropped is not None:
+            if self._m_dropped is not None:
+                self._m_dropped.inc()
+            if dropped[1] is not None and not dropped[1].done():
+                dropped[1].set_result(self._dropped_result())
+
+    def _dropped_result(self) -> Dict[str, Any]:
+        last = self.pred._last_result
+        out = dict(last) if last is not None else self.pred._not_ready_result()
+        out["dropped"] = True
+        return out
+
+    def call(self, fn) -> "asyncio.Future":
+        """Run fn() on the inference thread before the next sample (nothing else touches the evaluators then)."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("InferenceWorker is closed")
+            self._control.append((fn, fut, loop))
+            self._cond.notify()
+        return fut
+
+    def swap(self, pred) -> "asyncio.Future":
+        """Score with `pred` from the next sample on; resolves with the previous evaluator."""
+        def apply():
+            pred.ring.clear()
+            pred.ring.extend(carry_rows(self.pred.ring.view(), self.pred, pred))
+            old, self.pred = self.pred, pred
+            if self.shadow is pred:                 # shadow promoted to primary
+                self.shadow = self.shadow_stats = None
+            elif self.shadow is not None:
+                self._attach_shadow(self.shadow)
+            return old
+        return self.call(apply)
+
+    def set_shadow(self, pred, stats: Optional[ShadowStats] = None) -> "asyncio.Future":
+        """Start (pred) or stop (None) shadow scoring; resolves with the previous ShadowStats."""
+        def apply():
+            if pred is not None:
+                self._attach_shadow(pred)
+            old, self.shadow, self.shadow_stats = self.shadow_stats, pred, stats
+            return old
+        return self.call(apply)
+
+    def _attach_shadow(self, pred) -> None:
+        self._shadow_own_ring = pred.seq_len != self.pred.seq_len or not same_scaling(self.pred, pred)
+        if self._shadow_own_ring:                   # other scaler: its own window, fed with the same rows
+            pred.ring.clear()
+            pred.ring.extend(carry_rows(self.pred.ring.view(), self.pred, pred))
+
+    def qsize(self) -> int:
+        return len(self._queue)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the thread; samples still queued are cancelled."""
+        with self._cond:
+            self._closed = True
+            pending: List[list] = list(self._queue)
+            self._queue.clear()
+            control = list(self._control)
+            self._control.clear()
+            self._cond.notify()
+        for _, fut, loop, _ in pending:
+            if fut is not None:
+                loop.call_soon_threadsafe(_cancel, fut)
+        for _, fut, loop in control:
+            loop.call_soon_threadsafe(_cancel, fut)
+        self._thread.join(timeout)
+
+    # ---------- worker thread ----------
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._control and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                control = self._control.popleft() if self._control else None
+            if control is not None:
+                fn, fut, loop = control
+                try:
+                    out, err = fn(), None
+                except Exception as e:
+                    out, err = None, e
+                loop.call_soon_threadsafe(_resolve, fut, out, err)
+                continue
+
+            with self._cond:
+                row, fut, loop, t_submit = self._queue.popleft()
+                skipped = list(self._skipped)
+                self._skipped.clear()
+                depth = len(self._queue)
+            if self._m_depth is not None:
+                self._m_depth.set(depth)
+
+            try:
+                for r in skipped:                   # keep the window continuous
+                    self._push(r)
+                if fut is None:                     # push-only sample
+                    self._push(row)
+                    continue
+                if self._m_wait is not None:
+                    self._m_wait.observe(time.perf_counter() - t_submit)
+                out, err = self.pred.push_vector_and_eval(row), None
+                if self.shadow is not None:
+                    self._shadow_step(row, out)
+            except Exception as e:
+                if fut is None:
+                    continue
+                out, err = None, e
+            self.processed += 1
+            if self.stage_seconds is not None:
+                for stage, dt in self.pred.last_timings.items():
+                    self.stage_seconds.observe(dt, stage)
+            loop.call_soon_threadsafe(_resolve, fut, out, err)
+
+    def _push(self, row: np.ndarray) -> None:
+        self.pred.push_vector(row)
+        if self.shadow is not None and self._shadow_own_ring:
+            self.shadow.push_vector(row)
+
+    def _shadow_step(self, row: np.ndarray, out: Dict[str, Any]) -> None:
+        """Shadow window follows every row; it is scored only when the primary produced a fresh score."""
+        t0 = time.perf_counter()
+        try:
+            shadow = self.shadow
+            ring = shadow.ring if self._shadow_own_ring else self.pred.ring
+            if self._shadow_own_ring:
+                shadow.push_vector(row)
+            if out["ready"] and out["stale_for"] == 0 and len(ring) == shadow.seq_len:
+                score = shadow.score_windows(ring.view()[None], explain=False)[0]
+                self.shadow_stats.observe("sim", out["score"], score)
+        except Exception as e:                      # never let the candidate disturb the primary
+            print(f"[shadow] {getattr(self.shadow, 'version', '?')} stopped: {e}")
+            self.shadow = self.shadow_stats = None
+        if self.stage_seconds is not None:
+            self.stage_seconds.observe(time.perf_counter() - t0, "shadow")
+
+
+def _resolve(fut: "asyncio.Future", out, err) -> None:
+    if fut.done():                                  # caller gave up (cancelled / timed out)
+        return
+    if err is not None:
+        fut.set_exception(err)
+    else:
+        fut.set_result(out)
+
+
+def _cancel(fut: "asyncio.Future") -> None:
+    if not fut.done():
+        fut.cancel()
+
+
+async def monitor_loop_lag(hist: Histogram, interval: float = 0.1) -> None:
+    """Observe event-loop lag (how late a sleep(interval) wakes up) into `hist` until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        hist.observe(max(0.0, loop.time() - t0 - interval))
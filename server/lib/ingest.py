@@ -0,0 +1,138 @@
+"""
+Bulk telemetry ingest: batches of nested documents (row_to_nested_json shape) keyed by vessel ID.
+
+    POST /ingest            {"vessels": {"<vessel_id>": [doc, doc, ...], ...}}
+    Socket.IO "ingest"      same body, the response comes back as the ack
+
+Per vessel, documents are validated and converted in one pass (FeatureSchema.to_matrix_checked), the
+valid rows go into that vessel's window (FleetEvaluator) and every row with a full window is scored;
+the windows of all vessels in the request share one batched forward pass. Response:
+
+    {"vessels": {"<vessel_id>": {"accepted": n, "rejected": [{"index": i, "error": "..."}],
+                                 "ready": [...], "score": [...], "blackout_prob": [...],
+                                 "sanity_ok": [...], "top_contributors": [...]}},
+     "samples": N, "elapsed_ms": t}
+
+score / blackout_prob are null for rows that were not scored (window not full yet / sanity failure);
+arrays cover the accepted rows, in order. Documents must be oldest first within a vessel. Vessel IDs match
+lib/store.py VESSEL_ID (letters, digits, "_", ".", "-"; 1-128 characters, starting with a letter or digit).
+With a StoreWriter the accepted rows and their scores are also persisted (lib/store.py).
+A shadow model (set_shadow, lib/versions.py) scores the same windows; its scores only reach ShadowStats.
+"""
+import math, threading, time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from lib.metrics import Registry
+from lib.schema import doc_epoch
+from lib.snapshot import copy_windows
+from lib.store import VESSEL_ID, valid_vessel_id
+
+MAX_SAMPLES = 20000          # per request
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def parse_request(body: Any, max_samples: int = MAX_SAMPLES) -> Dict[str, List[Any]]:
+    """Request body -> {vessel_id: [docs]}. Raises ValueError (BatchTooLarge over max_samples)."""
+    vessels = body.get("vessels") if isinstance(body, dict) else None
+    if not isinstance(vessels, dict) or not vessels:
+        raise ValueError('body must be {"vessels": {"<vessel_id>": [documents]}}')
+    total = 0
+    for vid, docs in vessels.items():
+        if not valid_vessel_id(vid):
+            raise ValueError(f"invalid vessel id {str(vid)[:128]!r}: expected {VESSEL_ID.pattern}")
+        if not isinstance(docs, list):
+            raise ValueError(f"vessel {vid!r}: documents must be a list")
+        total += len(docs)
+    if total > max_samples:
+        raise BatchTooLarge(f"{total} samples in one request (max {max_samples})")
+    return vessels
+
+
+def _floats(a: np.ndarray) -> List[Optional[float]]:
+    return [None if math.isnan(x) else x for x in a.tolist()]
+
+
+class IngestService:
+    """Thread-safe wrapper around one FleetEvaluator; ingest() blocks, call it off the event loop."""
+
+    def __init__(self, artifacts_dir: str = "artifacts", device=None, backend=None,
+                 registry: Optional[Registry] = None, max_samples: int = MAX_SAMPLES, writer=None):
+        from lib.fleet import FleetEvaluator     # torch: only once a service is actually created
+        self.fleet = FleetEvaluator(artifacts_dir=artifacts_dir, device=device, backend=backend)
+        self.schema = self.fleet.core.schema
+        self.max_samples = max_samples
+        self.writer = writer
+        self.shadow_stats = None
+        self._lock = threading.Lock()
+
+        self._m_samples = self._m_seconds = None
+        if registry is not None:
+            self._m_samples = registry.counter("ingest_samples_total", "Ingested documents", labels=("status",))
+            self._m_seconds = registry.histogram("ingest_request_seconds", "Validate + score time per ingest request")
+
+    def copy_windows(self) -> Dict[str, np.ndarray]:
+        """Per-vessel window rows for a snapshot (lib/snapshot.py), taken between requests."""
+        with self._lock:
+            return copy_windows(self.fleet.buffers)
+
+    def restore_windows(self, windows: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self.fleet.restore_windows(windows)
+
+    def swap(self, core) -> None:
+        """Replace the model between requests (windows carried over, lib/versions.py)."""
+        with self._lock:
+            self.fleet.swap_core(core)
+            if self.fleet.shadow is None:
+                self.shadow_stats = None
+
+    def set_shadow(self, core, stats=None) -> None:
+        """Start (core + ShadowStats) or stop (None) shadow scoring."""
+        with self._lock:
+            self.fleet.set_shadow(core)
+            self.shadow_stats = stats if core is not None else None
+
+    def handle(self, body: Any) -> Dict[str, Any]:
+        """Parse + ingest one request body. Raises ValueError on a malformed request."""
+        return self.ingest(parse_request(body, self.max_samples))
+
+    def ingest(self, vessels: Dict[str, List[Any]]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        checked = {vid: self.schema.to_matrix_checked(docs) for vid, docs in vessels.items()}
+        with self._lock:
+            res = self.fleet.ingest({vid: X for vid, (X, _, _) in checked.items()})
+            stats = self.shadow_stats
+
+        out, n_ok, n_bad = {}, 0, 0
+        for vid, (X, ok, errors) in checked.items():
+            r = res[vid]
+            out[vid] = {
+                "accepted": int(X.shape[0]),
+                "rejected": [{"index": i, "error": e} for i, e in sorted(errors.items())],
+                "ready": r["ready"].tolist(),
+                "score": _floats(r["score"]),
+                "blackout_prob": _floats(r["blackout_prob"]),
+                "sanity_ok": r["sanity_ok"].tolist(),
+                "top_contributors": r["top_contributors"],
+            }
+            n_ok += X.shape[0]; n_bad += len(errors)
+            if stats is not None and "shadow_score" in r:
+                stats.observe(vid, r["score"], r["shadow_score"])
+            if self.writer is not None and X.shape[0]:
+                docs = vessels[vid]
+                ts = np.array([doc_epoch(docs[i]) for i in np.nonzero(ok)[0]])
+                ts[np.isnan(ts)] = time.time()          # no timestamp in the document: receive time
+                self.writer.append(vid, ts, X, r["score"], r["blackout_prob"])
+
+        elapsed = time.perf_counter() - t0
+        if self._m_samples is not None:
+            self._m_samples.inc(n_ok, "accepted")
+            if n_bad:
+                self._m_samples.inc(n_bad, "rejected")
+            self._m_seconds.observe(elapsed)
+        return {"vessels": out, "samples": n_ok + n_bad, "elapsed_ms": elapsed * 1e3}
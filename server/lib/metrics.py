@@ -0,0 +1,160 @@
+import bisect, threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Minimal Prometheus-style metrics (counter / gauge / histogram) rendered in the text exposition format.
+# Cheap enough for the per-tick path: observe() is a bisect + two adds under a lock.
+
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name; self.help = help
+        self.label_names: Tuple[str, ...] = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> Tuple[str, ...]:
+        if not self.label_names:
+            return ()
+        if isinstance(labels, str):
+            labels = (labels,)
+        return tuple(str(v) for v in labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, labels=()) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, labels=()) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self):
+        out = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for k, v in items:
+            out.append(f"{self.name}{_fmt_labels(self.label_names, k)} {_fmt_value(v)}")
+        return out
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels=()) -> None:
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = float(value)
+
+    def dec(self, amount: float = 1.0, labels=()) -> None:
+        self.inc(-amount, labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}      # per bucket (not cumulative) + overflow
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, labels=()) -> None:
+        k = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            c = self._counts.get(k)
+            if c is None:
+                c = self._counts[k] = [0] * (len(self.buckets) + 1)
+                self._sums[k] = 0.0
+            c[i] += 1
+            self._sums[k] += value
+
+    def count(self, labels=()) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, labels=()) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def quantile(self, q: float, labels=()) -> Optional[float]:
+        """Upper bucket bound holding the q-quantile (coarse; for logs/reports, not for alerting)."""
+        c = self._counts.get(self._key(labels))
+        if not c:
+            return None
+        target, acc = q * sum(c), 0
+        for i, n in enumerate(c):
+            acc += n
+            if acc >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def render(self):
+        out = super().render()
+        with self._lock:
+            snap = sorted((k, list(c), self._sums[k]) for k, c in self._counts.items())
+        for k, c, total in snap:
+            acc = 0
+            for b, n in zip(self.buckets + (float("inf"),), c):
+                acc += n
+                le = 'le="%s"' % _fmt_value(b)
+                out.append(f"{self.name}_bucket{_fmt_labels(self.label_names, k, le)} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.label_names, k)} {_fmt_value(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.label_names, k)} {acc}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, m: _Metric) -> _Metric:
+        if m.name in self._metrics:
+            raise ValueError(f"metric {m.name!r} already registered")
+        self._metrics[m.name] = m
+        return m
+
+    def counter(self, name, help, labels=()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics.values():
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
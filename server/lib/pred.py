@@ -1,9 +1,13 @@
-import os, json, joblib, numpy as np, torch
+import os, json, threading, time, numpy as np, torch
 import torch.nn as nn
-from collections import deque
 from math import exp
 from typing import Dict, List, Any
 
+from lib.schema import FeatureSchema
+from lib.backends import StaleBackend, artifact_path, build_backend, load_backend
+from lib.scaler import affine_params, load_scaler
+from lib.stats import WindowStats, FeatureStats, DEFAULT_HORIZONS
+
 # ------------------ Model ------------------
 class LSTMAutoencoder(nn.Module):
     def __init__(self, input_dim, hidden_dim=128, latent_dim=32, num_layers=2, dropout=0.0):
@@ -14,6 +18,21 @@ class LSTMAutoencoder(nn.Module):
         self.decoder = nn.LSTM(input_dim, hidden_dim, num_layers=num_layers, batch_first=True, dropout=dropout)
         self.out = nn.Linear(hidden_dim, input_dim)
         self.num_layers = num_layers; self.hidden_dim = hidden_dim
+        self._zeros: Dict[tuple, tuple] = {}    # (B,L,D,device,dtype) -> (c0, dec_in); read-only, shared by threads
+
+    def _zero_inputs(self, x):
+        """c0 and the zero decoder input for x's shape. Cached outside tracing (a trace must not bake a batch size)."""
+        if torch.jit.is_tracing():
+            return (torch.zeros(self.num_layers, x.size(0), self.hidden_dim, device=x.device, dtype=x.dtype),
+                    torch.zeros_like(x))
+        key = (*x.shape, x.device, x.dtype)
+        z = self._zeros.get(key)
+        if z is None:
+            if len(self._zeros) >= 8:           # fleet batches vary in size: keep the cache small
+                self._zeros.clear()
+            z = self._zeros[key] = (torch.zeros(self.num_layers, x.size(0), self.hidden_dim, device=x.device,
+                                                dtype=x.dtype), torch.zeros_like(x))
+        return z
 
     def forward(self, x):
         # Encode
@@ -21,31 +40,135 @@ class LSTMAutoencoder(nn.Module):
         h = h_n[-1]                   # (B, hidden)
         z = self.h2z(h)               # (B, latent)
         # Decode from latent
-        h0 = self.z2h(z).unsqueeze(0).repeat(self.num_layers, x.size(0), 1)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_dim, device=x.device)
-        dec_in = torch.zeros_like(x)   # zero input (as in training)
+        h0 = self.z2h(z).unsqueeze(0).repeat(self.num_layers, 1, 1)   # (layers,B,hidden)
+        c0, dec_in = self._zero_inputs(x)      # zero state + zero input (as in training)
         dec_out, _ = self.decoder(dec_in, (h0, c0))
         return self.out(dec_out)       # (B,L,D)
 
+# ------------------ Process-wide model registry ------------------
+# Every evaluator in the process (simulator, fleet ingest, CLIs) with the same weights file, backend and
+# device shares one loaded model: it is read from disk once and inference (eval, no_grad) does not mutate
+# it, so evaluators on different threads can use it concurrently. The key includes the mtimes of the .pth and
+# of the exported artifact, so a rewritten or re-exported file is loaded fresh. An export that was built from
+# other weights than the .pth (lib/backends.py SOURCE_FILE) is never served: eager runs instead, with a warning.
+_MODELS: Dict[tuple, Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def get_model(art_dir: str, n_features: int, seq_len: int, backend: str = "eager", device="cpu"):
+    """Shared (B,L,D) -> (B,L,D) model for art_dir/lstm_ae_best.pth in the requested backend."""
+    path = os.path.realpath(os.path.join(art_dir, "lstm_ae_best.pth"))
+    exported = artifact_path(art_dir, backend) if backend != "eager" else None
+    key = (path, os.path.getmtime(path), n_features, backend, str(device),
+           os.path.getmtime(exported) if exported and os.path.exists(exported) else None)
+    with _MODELS_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            model = LSTMAutoencoder(input_dim=n_features).to(device)
+            model.load_state_dict(torch.load(path, map_location=device))
+            model.eval()
+            # Inference backend: exported artifact next to the .pth if present, else built in-process
+            if backend != "eager":
+                try:
+                    fast = load_backend(art_dir, backend, device, source_pth=path)
+                    if fast is None:
+                        fast = build_backend(model, backend, seq_len, n_features, device)
+                    model = fast
+                except StaleBackend as e:
+                    print(f"[model] {e}; serving eager (re-run python -m lib.export_model)")
+            _MODELS[key] = model
+        return model
+
+
+class WindowRing:
+    """
+    Preallocated float32 window of the last seq_len rows.
+    Every row is written twice (slot i and i+L), so the chronological window is always the
+    contiguous view data[pos:pos+L] -- no per-tick stack/copy of the whole window.
+    """
+
+    def __init__(self, seq_len: int, n_features: int):
+        self.seq_len = int(seq_len)
+        self.data = np.zeros((2 * self.seq_len, n_features), dtype=np.float32)
+        self.pos = 0      # next write slot in [0, L)
+        self.count = 0
+        self.writes = 0   # appends + clears, never reset: lets running statistics notice out-of-band changes
+
+    def __len__(self):
+        return self.count
+
+    def append(self, row: np.ndarray) -> None:
+        self.data[self.pos] = row
+        self.data[self.pos + self.seq_len] = row
+        self.pos = (self.pos + 1) % self.seq_len
+        self.writes += 1
+        if self.count < self.seq_len:
+            self.count += 1
+
+    def extend(self, rows: np.ndarray) -> None:
+        """Append (n,D) rows in order; only the last seq_len can still be in the window."""
+        for row in rows[-self.seq_len:]:
+            self.append(row)
+
+    def view(self) -> np.ndarray:
+        """(count,D) rows oldest -> newest; a view, valid until the next append."""
+        if self.count < self.seq_len:
+            return self.data[:self.count]
+        return self.data[self.pos:self.pos + self.seq_len]
+
+    def clear(self) -> None:
+        self.pos = 0; self.count = 0
+        self.writes += 1
+
+
 class LSTMAE_Evaluator:
     MODE_MAP = {"startup": 1, "stable": 2, "high_load": 3, "bad_env": 4}
 
-    def __init__(self, artifacts_dir="artifacts", device=None, prob_alpha=0.25, topk=5):
+    def __init__(self, artifacts_dir="artifacts", device=None, prob_alpha=None, topk=5, backend=None,
+                 stride=None, adaptive_band=None, explain_above=None, prefilter=None, stats_horizons=None):
+        """
+        prob_alpha: width of the score -> blackout_prob sigmoid, as a fraction of the threshold; default from
+        config.json ("prob_alpha", written by lib/calibrate.py), else 0.25.
+        backend: 'eager' | 'torchscript' | 'int8' (see lib/backends.py); default from config.json, else eager.
+        stride: once the window is full, run the model every `stride` samples (1 = every sample).
+        adaptive_band: if set, score every sample while the last score is >= (1 - adaptive_band) * threshold.
+        Between scored samples the last result is returned with stale_for = samples since it was scored.
+        explain_above: push_vector_and_eval builds top_contributors only when score >= explain_above * threshold
+        (0 = always); below that the list is empty and explain_last() gives it on request.
+        prefilter: True / dict of settings (lib/prefilter.py) gates the model with a streaming detector instead
+        of a fixed stride; False = off. Results carry engine = "lstm" (scored now), "prefilter" / "stride"
+        (last score kept, by which policy) or None (not ready).
+        stats_horizons: horizons (samples) of the running feature statistics behind drift_report() (lib/stats.py).
+        stride / adaptive_band / explain_above / prefilter / stats_horizons default from config.json ("stride",
+        "adaptive_band", "explain_above", "prefilter", "stats_horizons"), else 1 / None / 0.5 / off /
+        (seq_len, 3600).
+        """
         self.art_dir = artifacts_dir
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.prob_alpha = float(prob_alpha)
         self.topk = int(topk)
 
         # Load config/scaler
         with open(os.path.join(self.art_dir, "config.json")) as f:
             cfg = json.load(f)
+        self.prob_alpha = float(prob_alpha if prob_alpha is not None else cfg.get("prob_alpha", 0.25))
 
         self.feature_cols: List[str] = cfg["feature_cols"]
         self.scaled_columns: List[str] = cfg.get("scaled_columns", [c for c in self.feature_cols if not c.endswith("_online")])
         self.seq_len: int = int(cfg["seq_len"])
         self.threshold: float = float(cfg["threshold"])
 
-        self.scaler = joblib.load(os.path.join(self.art_dir, "scaler.pkl"))
+        # Scoring stride policy
+        self.stride: int = max(1, int(stride if stride is not None else cfg.get("stride", 1)))
+        band = adaptive_band if adaptive_band is not None else cfg.get("adaptive_band")
+        self.adaptive_band = None if band is None else float(band)
+        self.explain_above = float(explain_above if explain_above is not None else cfg.get("explain_above", 0.5))
+        self._last_result = None
+        self._prev_score = None                 # score before the last one (pre-filter rise rule)
+        self._last_per_feat = None
+        self._since_scored = 0
+
+        self.scaler = load_scaler(self.art_dir, self.scaled_columns)     # scaler.npz, else scaler.pkl (sklearn)
+        self._center, self._scale = affine_params(self.scaler)
 
         # Strict contract: scaler vs scaled_columns
         if not hasattr(self.scaler, "n_features_in_"):
@@ -61,6 +184,7 @@ class LSTMAE_Evaluator:
             raise RuntimeError(f"scaled_columns not present in feature_cols: {missing}")
 
         self.name_to_idx = {c:i for i,c in enumerate(self.feature_cols)}
+        self.schema = FeatureSchema(self.feature_cols)      # nested JSON -> (D,) row, compiled once
         self.scale_idx = np.array([self.feature_cols.index(c) for c in self.scaled_columns], dtype=int)
         self.n_features = len(self.feature_cols)
 
@@ -97,14 +221,40 @@ class LSTMAE_Evaluator:
                 base_w[self.name_to_idx[k]] = min(base_w[self.name_to_idx[k]], np.float32(v))
         self.base_w = torch.from_numpy(base_w).to(self.device).view(1,1,-1)
 
-        # Model
-        self.model = LSTMAutoencoder(input_dim=self.n_features).to(self.device)
-        state = torch.load(os.path.join(self.art_dir, "lstm_ae_best.pth"), map_location=self.device)
-        self.model.load_state_dict(state)   # should succeed now
-        self.model.eval()
-
-        # Window buffer
-        self.buf = deque(maxlen=self.seq_len)
+        # Same groups as gather indices for the scoring kernel: online flag column per group (G,) and a
+        # (G,D) 0/1 matrix of each group's continuous columns (groups are disjoint)
+        groups = [g for g in self.gen_groups.values() if g["cont"]]
+        self._gen_online = torch.tensor([g["online"] for g in groups], dtype=torch.long, device=self.device)
+        gen_cont = torch.zeros(len(groups), self.n_features)
+        for i, g in enumerate(groups):
+            gen_cont[i, g["cont"]] = 1.0
+        self._gen_cont = gen_cont.to(self.device)
+        self._kernel = threading.local()        # scratch tensors of _score_batch, per thread
+
+        # Streaming pre-filter deciding when the model must run (lib/prefilter.py)
+        pf = prefilter if prefilter is not None else cfg.get("prefilter")
+        self.prefilter = None
+        if pf:
+            from lib.prefilter import StreamingPrefilter
+            self.prefilter = StreamingPrefilter.for_evaluator(self, **(pf if isinstance(pf, dict) else {}))
+
+        # Model: shared with every other evaluator of these artifacts (get_model)
+        self.backend: str = backend or cfg.get("backend", "eager")
+        self.model = get_model(self.art_dir, self.n_features, self.seq_len, self.backend, self.device)
+
+        # Window buffer: rows are imputed + scaled + clipped once, on arrival
+        self.ring = WindowRing(self.seq_len, self.n_features)
+
+        # Running statistics of the scaled columns, updated per row (lib/stats.py): the window's std for the
+        # scaling sanity check, and longer horizons + NaN rates for drift_report()
+        horizons = stats_horizons or cfg.get("stats_horizons") or (self.seq_len,) + DEFAULT_HORIZONS[1:]
+        self.window_stats = WindowStats(self.seq_len, self.scale_idx.size)
+        self.feature_stats = FeatureStats(self.scaled_columns, horizons)
+        online_of = {c: g["online"] for g in self.gen_groups.values() for c in g["cont"]}
+        self._stats_online = np.array([online_of.get(int(c), -1) for c in self.scale_idx], dtype=int)
+
+        # Seconds spent per stage in the last push_vector_and_eval ("scale", "inference", "explain")
+        self.last_timings: Dict[str, float] = {}
 
     # ---------- 1) Map mode -> integer (if requested by your features) ----------
     @staticmethod
@@ -151,11 +301,12 @@ class LSTMAE_Evaluator:
                 "Likely scaler/columns mismatch or passing raw (unscaled) inputs."
             )
 
-    def _impute_scale_inplace(self, window: np.ndarray) -> np.ndarray:
+    def _impute_scale_rows(self, rows: np.ndarray) -> np.ndarray:
+        """rows: (N,D) raw. Impute + scale continuous columns and clip, in place. No sanity check."""
         if self.scale_idx.size == 0:
-            return window
+            return rows
 
-        sub = window[:, self.scale_idx].astype(np.float64, copy=True)
+        sub = rows[:, self.scale_idx].astype(np.float64, copy=True)
 
         # --- get scaler center vector safely (no boolean 'or' on arrays) ---
         center = getattr(self.scaler, "center_", None)
@@ -175,11 +326,29 @@ class LSTMAE_Evaluator:
                 # broadcast per-column centers to rows
                 sub[mask] = np.take(center, np.nonzero(mask)[1])
 
-        sub_sc = self.scaler.transform(sub).astype(np.float32)
-        window[:, self.scale_idx] = sub_sc
+        if self._scale is not None:
+            # same arithmetic as RobustScaler/StandardScaler.transform, without sklearn's validation overhead
+            sub -= self._center
+            sub /= self._scale
+            sub_sc = sub.astype(np.float32)
+        else:
+            sub_sc = self.scaler.transform(sub).astype(np.float32)
+        rows[:, self.scale_idx] = sub_sc
 
         # optional safety
-        np.clip(window, -8.0, 8.0, out=window)
+        np.clip(rows, -8.0, 8.0, out=rows)
+        return rows
+
+    def _sanity_failures(self, windows_sc: np.ndarray) -> np.ndarray:
+        """windows_sc: (B,L,D) scaled. Returns (B,) bool, True where the scaled std looks wrong."""
+        s = np.nanstd(windows_sc[:, :, self.scale_idx], axis=1)     # (B,n_scaled)
+        return (np.nanmedian(s, axis=1) > 3.0) | (np.nanmax(s, axis=1) > 10.0)
+
+    def _impute_scale_inplace(self, window: np.ndarray) -> np.ndarray:
+        if self.scale_idx.size == 0:
+            return window
+
+        self._impute_scale_rows(window)
 
         # quick sanity
         s = np.nanstd(window[:, self.scale_idx], axis=0)
@@ -192,32 +361,93 @@ class LSTMAE_Evaluator:
 
 
     # ---------- 4) Dynamic mask + weighted contributions ----------
-    def _build_weight_mask(self, xb: torch.Tensor) -> torch.Tensor:
-        """xb: (1,L,D). Return W (1,L,D) with 0 on gen-continuous features when that gen is OFF."""
-        W = torch.ones_like(xb, device=xb.device)
-        for k, grp in self.gen_groups.items():
-            on_col = grp["online"]; cont_cols = grp["cont"]
-            if not cont_cols: continue
-            online = (xb[:, :, on_col] > 0.5).unsqueeze(-1)
-            off = ~online
-            W[:, :, cont_cols] = torch.where(off, torch.zeros_like(W[:, :, cont_cols]), W[:, :, cont_cols])
-        return W
-
-    def _score_with_explanations(self, xb: torch.Tensor, recon: torch.Tensor):
-        Wdyn = self._build_weight_mask(xb)      # dynamic mask
-        Wtot = Wdyn * self.base_w               # + base weights
-        diff2 = (xb - recon) ** 2               # (1,L,D)
-        masked = diff2 * Wtot                   # (1,L,D)
-
-        total_mse = masked.mean(dim=(1,2)).item()
-        per_feat = masked.mean(dim=1).squeeze(0).detach().cpu().numpy()   # (D,)
+    def _kernel_buffers(self, B: int, L: int):
+        """This thread's scratch tensors for B windows of length L (grown on demand, sliced to B)."""
+        k = self._kernel
+        if getattr(k, "cap", 0) < B or k.L != L:
+            G, D = self._gen_online.numel(), self.n_features
+            k.cap, k.L = B, L
+            k.sel = torch.empty(B, L, G, device=self.device)
+            k.on = torch.empty(B, L, G, dtype=torch.bool, device=self.device)
+            k.W = torch.empty(B, L, D, device=self.device)
+            k.masked = torch.empty(B, L, D, device=self.device)
+            k.res = torch.empty(B * (D + 1), device=self.device)      # per_feat (B,D) then total (B,)
+        return k.sel[:B], k.on[:B], k.W[:B], k.masked[:B], k.res
+
+    def _top_contributors(self, per_feat: np.ndarray) -> List[Dict[str, Any]]:
         s = per_feat.sum()
         pct = (per_feat / s) if s > 0 else np.zeros_like(per_feat)
 
         order = np.argsort(-per_feat)[:self.topk]
-        top = [{"name": self.feature_cols[i], "contribution": float(per_feat[i]), "percent": float(pct[i])}
-               for i in order]
-        return total_mse, per_feat, top
+        return [{"name": self.feature_cols[i], "contribution": float(per_feat[i]), "percent": float(pct[i])}
+                for i in order]
+
+    def _score_batch(self, xb: torch.Tensor, recon: torch.Tensor, explain: bool = True):
+        """
+        xb, recon: (B,L,D). Returns total (B,), per_feat (B,D) and one top-k list per window (None if not explain).
+        Weighted squared error: weight 0 on the continuous columns of a generator that is offline at that step,
+        else base_w. Runs on per-thread buffers (no allocation per call) with one device -> host copy per batch.
+        """
+        B, L, D = xb.shape
+        sel, on, W, masked, res = self._kernel_buffers(B, L)
+        if self._gen_online.numel():
+            torch.index_select(xb, 2, self._gen_online, out=sel)     # online flags (B,L,G)
+            torch.gt(sel, 0.5, out=on)
+            torch.logical_not(on, out=sel)                           # 1.0 = offline (NaN counts as offline)
+            torch.matmul(sel.view(B * L, -1), self._gen_cont, out=W.view(B * L, D))
+            W.neg_().add_(1.0)                                       # 0 on offline continuous columns, else 1
+            W.mul_(self.base_w)
+        else:
+            W.copy_(self.base_w.expand(B, L, D))
+        torch.sub(xb, recon, out=masked)
+        masked.square_()
+        masked.mul_(W)
+
+        torch.mean(masked, dim=1, out=res[:B * D].view(B, D))
+        torch.mean(masked, dim=(1, 2), out=res[B * D:B * (D + 1)])
+        host = res[:B * (D + 1)].to("cpu", copy=True).numpy()
+        per_feat, total = host[:B * D].reshape(B, D), host[B * D:]
+        tops = [self._top_contributors(pf) for pf in per_feat] if explain else None
+        return total, per_feat, tops
+
+    def score_windows(self, windows: np.ndarray, model=None, batch_size: int = 1024, explain: bool = True):
+        """
+        windows: (B,L,D) already imputed + scaled (may be a strided view). Runs `model` (default self.model)
+        in chunks of batch_size. Returns total (B,), per_feat (B,D) and one top-k list per window
+        (tops is None when explain=False; use top_table(per_feat) for a columnar breakdown).
+        """
+        model = self.model if model is None else model
+        totals, feats, tops = [], [], []
+        with torch.no_grad():
+            for i in range(0, windows.shape[0], batch_size):
+                x = torch.from_numpy(np.ascontiguousarray(windows[i:i + batch_size])).to(self.device)
+                t, f, k = self._score_batch(x, model(x), explain=explain)
+                totals.append(t); feats.append(f)
+                if explain:
+                    tops.extend(k)
+        if not totals:
+            return np.empty(0, np.float32), np.empty((0, self.n_features), np.float32), ([] if explain else None)
+        return np.concatenate(totals), np.concatenate(feats), (tops if explain else None)
+
+    def top_table(self, per_feat: np.ndarray):
+        """per_feat (B,D) -> (idx (B,k), contribution (B,k), percent (B,k)); same ranking as _top_contributors."""
+        k = min(self.topk, per_feat.shape[1])
+        idx = np.argsort(-per_feat, axis=1, kind="quicksort")[:, :k]
+        contrib = np.take_along_axis(per_feat, idx, axis=1)
+        s = per_feat.sum(axis=1, keepdims=True)
+        pct = np.divide(contrib, s, out=np.zeros_like(contrib), where=s > 0)
+        return idx, contrib, pct
+
+    def probs_from_scores(self, scores: np.ndarray) -> np.ndarray:
+        """Vectorized _prob_from_score."""
+        denom = max(self.prob_alpha * self.threshold, 1e-6)
+        z = (np.asarray(scores, dtype=np.float64) - self.threshold) / denom
+        with np.errstate(over="ignore"):
+            return 1.0 / (1.0 + np.exp(-z))
+
+    def _score_with_explanations(self, xb: torch.Tensor, recon: torch.Tensor):
+        total, per_feat, tops = self._score_batch(xb, recon)
+        return float(total[0]), per_feat[0], tops[0]
 
     def _prob_from_score(self, mse: float) -> float:
         denom = max(self.prob_alpha * self.threshold, 1e-6)
@@ -234,27 +464,131 @@ class LSTMAE_Evaluator:
           - threshold: float
           - blackout_prob: float (0..1)
           - top_contributors: list of {name, contribution, percent}
+          - stale_for: int, samples since this score was computed (0 = fresh; see stride)
         """
-        vec = self.vectorize(flat_sample)               # (D,)
-        self.buf.append(vec)
-
-        if len(self.buf) < self.seq_len:
-            return {
-                "ready": False,
-                "score": None,
-                "threshold": float(self.threshold),
-                "blackout_prob": 0.0,
-                "top_contributors": [],
-            }
-
-        window = np.stack(self.buf, axis=0).astype(np.float32)   # (L,D) raw
-        window = self._impute_scale_inplace(window.copy())       # scale continuous only
-
-        x = torch.from_numpy(window).unsqueeze(0).to(self.device).float()  # (1,L,D)
+        return self.push_vector_and_eval(self.vectorize(flat_sample))
+
+    def push_vector_and_eval(self, vec: np.ndarray) -> Dict[str, Any]:
+        """Same as push_sample_and_eval, for a raw (D,) vector (e.g. from self.schema.to_vector(nested))."""
+        self.last_timings = {}
+        self.push_vector(vec)
+
+        if len(self.ring) < self.seq_len:
+            return self._not_ready_result()
+
+        if self._last_result is not None:
+            self._since_scored += 1
+            if not self._score_due():
+                res = dict(self._last_result)
+                res["stale_for"] = self._since_scored
+                res["engine"] = "stride" if self.prefilter is None else "prefilter"
+                return res
+
+        window = self.ring.view()                       # (L,D) scaled, contiguous view
+        s = self.window_std()
+        if s.size and (np.median(s) > 3.0 or s.max() > 10.0):
+            raise RuntimeError(
+                f"Runtime scaling sanity failed: median std={float(np.median(s)):.2f}, max std={float(s.max()):.2f}. "
+                "Likely scaler/columns mismatch or raw inputs not matching training."
+            )
+
+        t0 = time.perf_counter()
+        x = torch.from_numpy(window).unsqueeze(0).to(self.device)    # (1,L,D)
         with torch.no_grad():
             recon = self.model(x)
-            total_mse, per_feat, top = self._score_with_explanations(x, recon)
+            t1 = time.perf_counter()
+            total, per_feat, _ = self._score_batch(x, recon, explain=False)
+        total_mse = float(total[0])
+        self._last_per_feat = per_feat[0]
+        top = self._top_contributors(per_feat[0]) if total_mse >= self.explain_above * self.threshold else []
+        self.last_timings["inference"] = t1 - t0
+        self.last_timings["explain"] = time.perf_counter() - t1
+
+        self._prev_score = self._last_result["score"] if self._last_result is not None else None
+        self._last_result = self._ready_result(total_mse, top)
+        self._since_scored = 0
+        if self.prefilter is not None:
+            self.prefilter.consumed()
+        return self._last_result
+
+    def window_std(self) -> np.ndarray:
+        """(n_scaled,) std of the scaled columns over the window, from the running statistics."""
+        ws = self.window_stats
+        if ws.writes != self.ring.writes:       # ring extended / cleared directly, or periodic refresh
+            ws.refresh(self.ring.view()[:, self.scale_idx], self.ring.writes)
+        return ws.std()
+
+    def drift_report(self, limits=None) -> Dict[str, Any]:
+        """Live distribution of the scaled columns vs the scaler (lib/stats.py FeatureStats.report)."""
+        out = self.feature_stats.report(limits)
+        out["window_std"] = np.round(self.window_std(), 4).tolist() if len(self.ring) else []
+        return out
+
+    def explain_last(self) -> List[Dict[str, Any]]:
+        """top_contributors of the last scored window, also when push_vector_and_eval skipped them."""
+        if self._last_result is not None and self._last_result["top_contributors"]:
+            return self._last_result["top_contributors"]
+        return self._top_contributors(self._last_per_feat) if self._last_per_feat is not None else []
+
+    def _score_due(self) -> bool:
+        """Stride / pre-filter policy: score now, or reuse the last result for this sample?"""
+        if self.prefilter is not None:
+            if self.prefilter.due or self._since_scored >= self.prefilter.background_stride:
+                return True
+            last = self._last_result["score"]
+            if self._prev_score is not None and last > self._prev_score + self.prefilter.rise * self.threshold:
+                return True
+            band = self.prefilter.band if self.adaptive_band is None else self.adaptive_band
+            return last >= (1.0 - band) * self.threshold
+        if self._since_scored >= self.stride:
+            return True
+        if self.adaptive_band is not None:
+            return self._last_result["score"] >= (1.0 - self.adaptive_band) * self.threshold
+        return False
+
+    def reset(self) -> None:
+        """Drop the window and the last score (e.g. new voyage / replay)."""
+        self.ring.clear()
+        self._last_result = None
+        self._prev_score = None
+        self._last_per_feat = None
+        self._since_scored = 0
+        self.feature_stats.reset()
+        if self.prefilter is not None:
+            self.prefilter.reset()
+
+    def push_vector(self, vec: np.ndarray) -> None:
+        """vec: (D,) raw feature vector. Impute + scale + clip it once and append it to the window."""
+        t0 = time.perf_counter()
+        row = np.array(vec, dtype=np.float32).reshape(1, -1)
+        nan = np.isnan(row[0, self.scale_idx])
+        self._impute_scale_rows(row)
+        ws, ring = self.window_stats, self.ring
+        synced = ws.writes == ring.writes
+        dropped = ring.data[ring.pos, self.scale_idx] if synced and len(ring) == ring.seq_len else None
+        ring.append(row[0])
+        x = row[0, self.scale_idx]
+        if synced:
+            ws.push(x, dropped)
+            ws.writes = ring.writes
+        on = self._stats_online
+        self.feature_stats.update(x, nan, (on < 0) | (row[0, on] > 0.5))     # offline genset: NaN expected
+        if self.prefilter is not None:
+            self.prefilter.update(row[0])
+        self.last_timings["scale"] = time.perf_counter() - t0
+
+    def _not_ready_result(self) -> Dict[str, Any]:
+        return {
+            "ready": False,
+            "score": None,
+            "threshold": float(self.threshold),
+            "blackout_prob": 0.0,
+            "top_contributors": [],
+            "stale_for": 0,
+            "engine": None,
+        }
 
+    def _ready_result(self, total_mse: float, top: List[Dict[str, Any]]) -> Dict[str, Any]:
         p = self._prob_from_score(total_mse)
         return {
             "ready": True,
@@ -262,10 +596,13 @@ class LSTMAE_Evaluator:
             "threshold": float(self.threshold),
             "blackout_prob": float(p),
             "top_contributors": top,
+            "stale_for": 0,
+            "engine": "lstm",
         }
 
     def getBuffer(self):
-        return self.buf
+        """Current window (oldest -> newest), already imputed + scaled. (n,D) copy."""
+        return self.ring.view().copy()
 # class AnomalyPredictor:
 #     def __init__(self, artifacts_dir="artifacts", device=None, smoothing_k=3,
 #                  prob_alpha=0.25, topk=5):
@@ -0,0 +1,145 @@
+"""
+Streaming pre-filter in front of the LSTM autoencoder: O(D) per sample, it decides whether a sample needs a
+fresh LSTM score now or can keep showing the last one.
+
+It sees the evaluator's window rows (imputed + scaled, so continuous columns are in scaler units):
+    z       EWMA mean / variance per continuous column, |z| > z_limit trips
+    cusum   two-sided CUSUM on z (slack cusum_k, limit cusum_h) for slow shifts the z test misses
+    roc     step |row - previous row| > roc_limit x its EWMA (+ roc_floor) on the frequency, busbar voltage and
+            lube oil pressure columns
+    state   a generator online flag or mode_code changed (that generator's statistics restart)
+A trip makes the evaluator run the LSTM on this sample and the next `hold` samples. Otherwise the LSTM runs
+every background_stride samples, on every sample while the last score is within `band` of the threshold, and
+while the score is climbing (last score > the one before + rise x threshold); see LSTMAE_Evaluator._score_due.
+The band and rise rules are what keep detection on time: the statistics adapt to a persistent anomaly within
+a few dozen samples, while the LSTM may need a full window to cross its threshold.
+
+    ev = LSTMAE_Evaluator("artifacts", prefilter=True)        # or {"background_stride": 20, ...}, or config.json
+    out = ev.push_vector_and_eval(vec)     # out["engine"]: "lstm" = scored now, "prefilter" = LSTM skipped
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROC_SUFFIXES = ("_frequency_hz", "_busbar_voltage_v", "_lube_oil_pressure_bar")
+DEFAULTS = {"background_stride": 10, "hold": 5, "band": 0.1, "rise": 0.02, "alpha": 0.05, "z_limit": 4.0, "cusum_k": 1.0,
+            "cusum_h": 20.0, "roc_limit": 6.0, "roc_floor": 0.05, "var_floor": 0.01, "warmup": 30}
+
+
+class StreamingPrefilter:
+    def __init__(self, feature_cols: List[str], scale_idx: np.ndarray, groups: Optional[Dict[int, dict]] = None,
+                 state_cols: Optional[List[str]] = None, **settings):
+        unknown = set(settings) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"unknown prefilter settings {sorted(unknown)}; expected {sorted(DEFAULTS)}")
+        cfg = {**DEFAULTS, **settings}
+        self.settings = cfg
+        self.background_stride = max(1, int(cfg["background_stride"]))
+        self.hold = int(cfg["hold"])
+        self.band = float(cfg["band"])
+        self.rise = float(cfg["rise"])
+        self.alpha = float(cfg["alpha"])
+        self.z_limit = float(cfg["z_limit"])
+        self.cusum_k = float(cfg["cusum_k"])
+        self.cusum_h = float(cfg["cusum_h"])
+        self.roc_limit = float(cfg["roc_limit"])
+        self.roc_floor = float(cfg["roc_floor"])
+        self.var_floor = float(cfg["var_floor"])
+        self.warmup = int(cfg["warmup"])
+
+        self.feature_cols = list(feature_cols)
+        self.idx = np.asarray(scale_idx, dtype=int)                 # continuous columns, in row order
+        pos = {int(c): j for j, c in enumerate(self.idx)}
+        self.roc_pos = np.array([pos[i] for i, c in enumerate(self.feature_cols)
+                                 if i in pos and c.endswith(ROC_SUFFIXES)], dtype=int)
+        state_cols = state_cols if state_cols is not None else \
+            [c for c in self.feature_cols if c.endswith("_online") or c == "mode_code"]
+        self.state_idx = np.array([self.feature_cols.index(c) for c in state_cols], dtype=int)
+        # state column -> positions (in idx) of the continuous columns that restart when it changes
+        self.restart = {}
+        for g in (groups or {}).values():
+            self.restart[int(g["online"])] = np.array([pos[c] for c in g["cont"] if c in pos], dtype=int)
+
+        n = self.idx.size
+        self.mean = np.zeros(n)
+        self.var = np.ones(n)
+        self.s_hi = np.zeros(n)
+        self.s_lo = np.zeros(n)
+        self.step = np.zeros(self.roc_pos.size)        # EWMA of |step| on the roc columns
+        self.age = np.zeros(n, dtype=np.int64)     # samples since the column's statistics (re)started
+        self.prev: Optional[np.ndarray] = None
+        self.prev_state: Optional[np.ndarray] = None
+        self.trigger: Optional[str] = None          # first reason since the LSTM last ran
+        self._hold = 0
+        self.trips: Dict[str, int] = {"z": 0, "cusum": 0, "roc": 0, "state": 0}
+
+    @classmethod
+    def for_evaluator(cls, ev, **settings) -> "StreamingPrefilter":
+        return cls(ev.feature_cols, ev.scale_idx, ev.gen_groups, **settings)
+
+    @property
+    def due(self) -> bool:
+        """Something looked off since the LSTM last ran, or we are within `hold` samples of it."""
+        return self.trigger is not None or self._hold > 0
+
+    def consumed(self) -> None:
+        """The LSTM scored this sample."""
+        self.trigger = None
+        if self._hold > 0:
+            self._hold -= 1
+
+    def reset(self) -> None:
+        self.mean[:] = 0.0; self.var[:] = 1.0; self.s_hi[:] = 0.0; self.s_lo[:] = 0.0; self.age[:] = 0
+        self.step[:] = 0.0
+        self.prev = self.prev_state = None
+        self.trigger = None
+        self._hold = 0
+
+    def update(self, row: np.ndarray) -> Optional[str]:
+        """One scaled (D,) row, oldest first. Returns the reason when this row trips, else None."""
+        x = row[self.idx].astype(np.float64)
+        state = row[self.state_idx]
+        reason = None
+
+        if self.prev_state is not None and (state != self.prev_state).any():
+            reason = "state"
+            for c in self.state_idx[state != self.prev_state]:
+                cols = self.restart.get(int(c))
+                if cols is not None:
+                    self.age[cols] = 0
+        if self.prev is not None and self.roc_pos.size:
+            step = np.abs(x[self.roc_pos] - self.prev[self.roc_pos])
+            warm = self.age[self.roc_pos] >= self.warmup
+            if reason is None and (warm & (step > self.roc_limit * self.step + self.roc_floor)).any():
+                reason = "roc"
+            a_step = np.maximum(self.alpha, 1.0 / self.age[self.roc_pos].clip(1))
+            self.step = np.where(self.age[self.roc_pos] <= 1, step, self.step + a_step * (step - self.step))
+
+        # EWMA statistics; a column is tested once it has `warmup` samples since its (re)start
+        a = np.maximum(self.alpha, 1.0 / (self.age + 1.0))
+        d = x - self.mean
+        z = d / np.sqrt(self.var + self.var_floor)
+        live = self.age >= self.warmup
+        zc = np.where(live, np.clip(z, -self.z_limit, self.z_limit), 0.0)
+        self.s_hi = np.maximum(0.0, self.s_hi + zc - self.cusum_k)
+        self.s_lo = np.maximum(0.0, self.s_lo - zc - self.cusum_k)
+        z_hit = live & (np.abs(z) > self.z_limit)
+        c_hit = (self.s_hi > self.cusum_h) | (self.s_lo > self.cusum_h)
+        if reason is None and (z_hit.any() or c_hit.any()):
+            reason = "z" if z_hit.any() else "cusum"
+        self.s_hi[z_hit | c_hit] = 0.0                 # restart the sums after an alarm
+        self.s_lo[z_hit | c_hit] = 0.0
+        restart = self.age == 0
+        self.mean = np.where(restart, x, self.mean + a * d)
+        self.var = np.where(restart, 1.0, (1.0 - a) * (self.var + a * d * d))
+        self.s_hi[restart] = 0.0
+        self.s_lo[restart] = 0.0
+        self.age += 1
+        self.prev, self.prev_state = x, state.copy()
+
+        if reason is not None:
+            self.trips[reason] += 1
+            if self.trigger is None:
+                self.trigger = reason
+            self._hold = self.hold
+        return reason
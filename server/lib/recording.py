@@ -0,0 +1,72 @@
+import importlib.util, os
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+from lib.schema import FeatureSchema
+
+# Recorded telemetry in the model schema: one row per sample, columns = feature_cols
+# (mode_code may be replaced by a 'mode' string column, timestamp is optional).
+
+
+def require_parquet(path: str) -> None:
+    """Raise early (before any work) when `path` is Parquet and no Parquet engine is installed."""
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq") and \
+            importlib.util.find_spec("pyarrow") is None and importlib.util.find_spec("fastparquet") is None:
+        raise ValueError(f"{path!r}: Parquet needs pyarrow (requirements.txt); use .csv or .npz instead.")
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """CSV / Parquet / NPZ -> DataFrame. NPZ: either one array per column, or 'X' (N,D) + 'columns'."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(path)
+    if ext in (".parquet", ".pq"):
+        require_parquet(path)
+        return pd.read_parquet(path)
+    if ext == ".npz":
+        with np.load(path, allow_pickle=False) as z:
+            if "X" in z.files:
+                cols = [str(c) for c in z["columns"]]
+                df = pd.DataFrame(z["X"], columns=cols)
+                for k in z.files:
+                    if k not in ("X", "columns"):
+                        df[k] = z[k]
+                return df
+            return pd.DataFrame({k: z[k] for k in z.files})
+    raise ValueError(f"Unsupported recording format {ext!r} (expected .csv, .parquet or .npz).")
+
+
+def table_to_matrix(df: pd.DataFrame, feature_cols: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    DataFrame -> raw (N,D) float32 in feature_cols order, with the same conventions as the live path:
+    'mode' strings -> mode_code, g{i}_online forced to 0/1, sensors of an offline generator -> NaN.
+    Returns (X, missing_columns); missing columns are filled with 0.0.
+    """
+    n = len(df)
+    X = np.zeros((n, len(feature_cols)), dtype=np.float32)
+    missing = []
+    for j, c in enumerate(feature_cols):
+        if c in df.columns:
+            X[:, j] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float32)
+        elif c == "mode_code" and "mode" in df.columns:
+            modes = df["mode"].astype(str).str.strip().str.lower()
+            X[:, j] = modes.map(FeatureSchema.MODE_MAP).fillna(0.0).to_numpy(dtype=np.float32)
+        else:
+            missing.append(c)
+
+    name_to_idx = {c: j for j, c in enumerate(feature_cols)}
+    for c, j in name_to_idx.items():
+        if not (c.startswith("g") and c.endswith("_online")):
+            continue
+        on = np.nan_to_num(X[:, j]) > 0.5
+        X[:, j] = on
+        prefix = c[:-len("online")]
+        sensors = [name_to_idx[prefix + s] for s in FeatureSchema.GEN_SENSORS if prefix + s in name_to_idx]
+        if sensors:
+            X[np.ix_(~on, sensors)] = np.nan
+    return X, missing
+
+
+def timestamps(df: pd.DataFrame) -> Optional[np.ndarray]:
+    return df["timestamp"].astype(str).to_numpy() if "timestamp" in df.columns else None
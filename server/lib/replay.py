@@ -0,0 +1,222 @@
+"""
+Recorded telemetry as the input of the live pipeline (server.py, REPLAY_FILE) instead of SimpleShipSim.
+
+    src = ReplaySource("recording.parquet", feature_cols)        # model schema (lib/recording.py conventions)
+    src = ReplaySource("ship_sensor_data.csv", feature_cols)     # legacy single-genset log via LEGACY_MAPPING
+    row = src.step()        # same dict shape as SimpleShipSim.step(), so row_to_nested_json -> schema ->
+                            # evaluator -> emit run exactly as for the simulator
+
+A recording that does not carry the feature columns is converted with a column mapping (JSON file, or
+LEGACY_MAPPING when the legacy columns are detected). Mapping values, per model column:
+    "col"                          source column
+    1.0                            constant
+    null                           not recorded: NaN (imputed by the evaluator like an offline sensor)
+    {"value": "stable"}            constant string (for "mode")
+    {"column": "c", "map": {...}}  categorical source column, unknown categories -> 0.0
+    {"column": "c", "scale": k}    source column * k
+    {"mean": ["a", "b", ...]}      row mean of several source columns
+
+Speed: "1" = recorded spacing, "N" = N times faster, "max" = no pacing (parse_speed). Pacing uses the median
+recorded interval. Timestamps are re-based onto the wall clock at the first step (recorded spacing kept) and
+keep increasing across loops, so the store and history see a monotonic series.
+"""
+import json, math, time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from lib.metrics import Histogram
+from lib.recording import read_table, table_to_matrix
+from lib.schema import FeatureSchema
+
+STAGES = ("generate", "flatten", "scale", "inference", "explain", "shadow", "emit")
+
+# ship_sensor_data.csv: one genset, 230 V three-phase, no environment / vibration / exhaust channels.
+# Units and ranges differ from the training data (kW of a small genset), so scores are high: the mapping is
+# for exercising the pipeline, not for judging the model on this log.
+_GENSET_ON = {"column": "genset_status", "map": {"ON": 1.0, "OFF": 0.0}}
+LEGACY_MAPPING: Dict[str, Any] = {
+    "timestamp": "timestamp",
+    "mode": {"value": "stable"},
+    "num_generators_online": _GENSET_ON,
+    "wave_height_meters": 0.0, "wind_speed_knots": 0.0, "ship_roll_degrees": 0.0, "ship_pitch_degrees": 0.0,
+    "g1_online": _GENSET_ON,
+    "g1_load_kw": "power_kW",
+    "g1_frequency_hz": "frequency",
+    "g1_lube_oil_pressure_bar": "oil_pressure",
+    "g1_coolant_temperature_celsius": "oil_temp",           # closest thermal channel in the log
+    "g1_exhaust_gas_temperature_celsius": None,
+    "g1_vibration_level_mm_s": None,
+    "g2_online": 0.0, "g3_online": 0.0, "g4_online": 0.0,
+    **{f"g{i}_{s}": None for i in (2, 3, 4) for s in FeatureSchema.GEN_SENSORS},
+    "msb_total_active_power_kw": "power_kW",
+    "msb_busbar_voltage_v": {"mean": ["voltage_L1", "voltage_L2", "voltage_L3"]},
+}
+_LEGACY_COLUMNS = ("genset_status", "power_kW", "frequency", "voltage_L1")
+
+
+class ReplayEnded(Exception):
+    """The recording is exhausted (loop=False)."""
+
+
+def parse_speed(speed: Any) -> float:
+    """'1' / '10' / 'max' -> replay speed factor (inf = as fast as possible)."""
+    if str(speed).strip().lower() in ("max", "inf", "0"):
+        return math.inf
+    v = float(speed)
+    if not v > 0:
+        raise ValueError(f"replay speed must be > 0 or 'max', got {speed!r}")
+    return v
+
+
+def load_mapping(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def detect_mapping(df: pd.DataFrame, feature_cols: List[str]) -> Optional[Dict[str, Any]]:
+    """None when the table already has the model columns, LEGACY_MAPPING for the legacy log."""
+    have = set(df.columns)
+    if all(c in have or (c == "mode_code" and "mode" in have) for c in feature_cols):
+        return None
+    if all(c in have for c in _LEGACY_COLUMNS):
+        return LEGACY_MAPPING
+    missing = [c for c in feature_cols if c not in have][:5]
+    raise ValueError(f"recording has neither the model columns (missing e.g. {missing}) nor the legacy "
+                     f"columns {_LEGACY_COLUMNS}; pass a column mapping")
+
+
+def apply_mapping(df: pd.DataFrame, mapping: Dict[str, Any]) -> pd.DataFrame:
+    """Source table -> table in the model schema, one column per mapping entry."""
+    out = {}
+    n = len(df)
+
+    def numeric(c):
+        return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+
+    for name, spec in mapping.items():
+        if spec is None:
+            out[name] = np.full(n, np.nan)
+        elif isinstance(spec, (int, float)):
+            out[name] = np.full(n, float(spec))
+        elif isinstance(spec, str):
+            out[name] = df[spec].to_numpy() if name in ("timestamp", "mode") else numeric(spec)
+        elif "value" in spec:
+            out[name] = np.full(n, spec["value"], dtype=object)
+        elif "map" in spec:
+            out[name] = df[spec["column"]].astype(str).str.strip().map(spec["map"]).fillna(0.0).to_numpy(np.float64)
+        elif "mean" in spec:
+            out[name] = np.nanmean(np.stack([numeric(c) for c in spec["mean"]], axis=1), axis=1)
+        elif "scale" in spec:
+            out[name] = numeric(spec["column"]) * float(spec["scale"])
+        else:
+            raise ValueError(f"mapping for {name!r}: unsupported spec {spec!r}")
+    return pd.DataFrame(out, index=df.index)
+
+
+class ReplaySource:
+    """Recorded rows one by one, in the SimpleShipSim.step() dict shape."""
+
+    def __init__(self, path: str, feature_cols: List[str], mapping: Optional[Dict[str, Any]] = None,
+                 loop: bool = True, default_dt: float = 1.0):
+        df = read_table(path)
+        if mapping is None:
+            mapping = detect_mapping(df, feature_cols)
+        if mapping is not None:
+            df = apply_mapping(df, mapping)
+        if len(df) == 0:
+            raise ValueError(f"recording {path!r} is empty")
+        X, self.missing = table_to_matrix(df, feature_cols)
+        self.feature_cols = list(feature_cols)
+        self.rows = X.astype(np.float64).tolist()           # python floats: the shape SimpleShipSim emits
+        self.modes = self._modes(df, X)
+        self.offsets = self._offsets(df, default_dt)         # seconds since the first recorded row
+        steps = np.diff(self.offsets)
+        steps = steps[steps > 0]
+        self.dt = float(np.median(steps)) if steps.size else float(default_dt)
+        self.span = float(self.offsets[-1]) + self.dt         # one lap, for monotonic timestamps when looping
+        self.loop = loop
+        self.i = 0
+        self.laps = 0
+        self._base: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _modes(self, df: pd.DataFrame, X: np.ndarray) -> List[str]:
+        if "mode" in df.columns:
+            return df["mode"].astype(str).str.strip().str.lower().tolist()
+        if "mode_code" in self.feature_cols:
+            names = {v: k for k, v in FeatureSchema.MODE_MAP.items()}
+            return [names.get(float(c), "unknown") for c in X[:, self.feature_cols.index("mode_code")]]
+        return ["unknown"] * len(X)
+
+    @staticmethod
+    def _offsets(df: pd.DataFrame, default_dt: float) -> np.ndarray:
+        n = len(df)
+        if "timestamp" in df.columns:
+            t = pd.to_datetime(df["timestamp"], errors="coerce")
+            if t.notna().all():
+                sec = (t - t.iloc[0]).dt.total_seconds().to_numpy()
+                if np.all(np.diff(sec) >= 0):
+                    return sec
+        return np.arange(n, dtype=np.float64) * default_dt   # no / unusable timestamps: even spacing
+
+    def step(self) -> Dict[str, Any]:
+        if self.i >= len(self.rows):
+            if not self.loop:
+                raise ReplayEnded(f"replay finished after {self.laps * len(self.rows) + self.i} samples")
+            self.i, self.laps = 0, self.laps + 1
+        i = self.i
+        self.i += 1
+        if self._base is None:
+            self._base = time.time()
+        ts = self._base + self.laps * self.span + float(self.offsets[i])
+        row = dict(zip(self.feature_cols, self.rows[i]))
+        row["timestamp"] = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        row["mode"] = self.modes[i]
+        return row
+
+
+class ThroughputReport:
+    """
+    Samples/s and mean cost per stage since the previous line, from the per-stage latency histogram.
+    "other" = wall time per sample not covered by a stage (queue hand-off, encode, store enqueue, ...); when
+    paced it also holds the wait for the next tick, so only at speed "max" does it show pipeline overhead.
+    """
+
+    def __init__(self, stage_seconds: Histogram, stages=STAGES):
+        self.hist = stage_seconds
+        self.stages = tuple(stages)
+        self._t0 = self._t = time.perf_counter()
+        self._start = self._last = self._snapshot()
+        self._n0 = self._n = 0
+
+    def _snapshot(self) -> Dict[str, tuple]:
+        return {s: (self.hist.count(s), self.hist.sum(s)) for s in self.stages}
+
+    @staticmethod
+    def _line(samples: int, elapsed: float, a: Dict[str, tuple], b: Dict[str, tuple]) -> str:
+        parts, covered = [], 0.0
+        for s in a:
+            dn, ds = b[s][0] - a[s][0], b[s][1] - a[s][1]
+            if dn:
+                parts.append(f"{s} {ds / dn * 1e3:.2f}ms")
+                covered += ds
+        if samples:
+            parts.append(f"other {max(0.0, elapsed - covered) / samples * 1e3:.2f}ms")
+        rate = samples / elapsed if elapsed > 0 else 0.0
+        return f"{samples} samples in {elapsed:.1f}s = {rate:.1f}/s | " + " ".join(parts)
+
+    def line(self, samples: int) -> str:
+        """Interval line; `samples` = total produced so far."""
+        now, snap = time.perf_counter(), self._snapshot()
+        out = self._line(samples - self._n, now - self._t, self._last, snap)
+        self._t, self._last, self._n = now, snap, samples
+        return out
+
+    def total(self, samples: int) -> str:
+        return "total: " + self._line(samples - self._n0, time.perf_counter() - self._t0, self._start,
+                                      self._snapshot())
@@ -0,0 +1,98 @@
+"""
+Scaler artifact without scikit-learn.
+
+The training scaler (RobustScaler) is a per-column affine map, so artifacts/scaler.npz stores it as plain
+arrays next to config.json and loading it needs neither joblib nor sklearn (~1 s of imports):
+
+    scaler.npz   center (n,) float64, scale (n,) float64, columns (n,) str = config.json scaled_columns
+
+load_scaler() prefers scaler.npz and falls back to scaler.pkl (sklearn import, any scaler with transform()).
+Write scaler.npz from scaler.pkl once per trained model; run from the server folder:
+
+    python -m lib.scaler artifacts
+"""
+import argparse, json, os
+from typing import List, Optional
+
+import numpy as np
+
+NPZ = "scaler.npz"
+PKL = "scaler.pkl"
+
+
+class AffineScaler:
+    """(x - center_) / scale_, with the attribute names of the sklearn scalers it replaces."""
+
+    def __init__(self, center: np.ndarray, scale: np.ndarray, columns: Optional[List[str]] = None):
+        self.center_ = np.asarray(center, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+        if self.center_.shape != self.scale_.shape or self.center_.ndim != 1:
+            raise ValueError(f"center {self.center_.shape} and scale {self.scale_.shape} must be equal 1-D shapes")
+        self.n_features_in_ = int(self.center_.shape[0])
+        self.columns = list(columns) if columns is not None else None
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.center_) / self.scale_
+
+
+def affine_params(scaler):
+    """(center, scale) of a fitted per-column affine scaler (RobustScaler / StandardScaler / AffineScaler)."""
+    scale = getattr(scaler, "scale_", None)
+    center = getattr(scaler, "center_", None)
+    if center is None:
+        center = getattr(scaler, "mean_", None)
+    if scale is None and center is None:
+        return None, None
+    n = int(scaler.n_features_in_)
+    center = np.zeros(n) if center is None else np.asarray(center, dtype=np.float64)
+    scale = np.ones(n) if scale is None else np.asarray(scale, dtype=np.float64)
+    return center, scale
+
+
+def load_scaler(art_dir: str, columns: Optional[List[str]] = None):
+    """AffineScaler from scaler.npz, else the pickled scaler. columns: expected scaled_columns (checked for npz)."""
+    path = os.path.join(art_dir, NPZ)
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as z:
+            sc = AffineScaler(z["center"], z["scale"], z["columns"].tolist() if "columns" in z.files else None)
+        if columns is not None and sc.columns is not None and sc.columns != list(columns):
+            raise RuntimeError(f"{path}: columns differ from config.json scaled_columns; re-export it "
+                               "(python -m lib.scaler)")
+        return sc
+    import joblib                               # sklearn comes in with the unpickle
+    return joblib.load(os.path.join(art_dir, PKL))
+
+
+def export_scaler(art_dir: str) -> str:
+    """scaler.pkl -> scaler.npz (columns from config.json). Refuses scalers that are not affine."""
+    import joblib
+    scaler = joblib.load(os.path.join(art_dir, PKL))
+    center, scale = affine_params(scaler)
+    if center is None:
+        raise ValueError(f"{type(scaler).__name__} is not a per-column affine scaler; keep using {PKL}")
+    with open(os.path.join(art_dir, "config.json")) as f:
+        cfg = json.load(f)
+    columns = cfg.get("scaled_columns", [c for c in cfg["feature_cols"] if not c.endswith("_online")])
+    if len(columns) != center.shape[0]:
+        raise ValueError(f"scaler has {center.shape[0]} columns, config.json scaled_columns has {len(columns)}")
+    path = os.path.join(art_dir, NPZ)
+    np.savez(path, center=center, scale=scale, columns=np.array(columns, dtype=str))
+
+    # same transform as the pickle, on a few synthetic rows
+    X = np.random.default_rng(0).normal(center, np.abs(scale) + 1.0, size=(64, center.shape[0]))
+    err = float(np.max(np.abs(load_scaler(art_dir, columns).transform(X) - scaler.transform(X))))
+    if err > 1e-9:
+        os.remove(path)
+        raise ValueError(f"exported scaler differs from {PKL} (max abs error {err:g})")
+    return path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write scaler.npz (plain center/scale arrays) from scaler.pkl")
+    ap.add_argument("artifacts_dir", nargs="?", default="artifacts")
+    args = ap.parse_args()
+    print("wrote", export_scaler(args.artifacts_dir))
+
+
+if __name__ == "__main__":
+    main()
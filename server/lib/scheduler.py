@@ -0,0 +1,117 @@
+"""
+Deadline-based fixed-rate tick scheduler on the event loop's monotonic clock.
+
+Tick k is due at start + k * period, independent of how long the previous tick took, so the rate does
+not drift with processing time (sleep(1.0) after the work gave a period of 1 s + work).
+
+    sched = TickScheduler(rate_hz=2.0, policy="skip", registry=metrics)
+    async for tick in sched:
+        ...   # tick.index, tick.lag, tick.missed
+
+Overrun policy (when a tick ends after the next deadline):
+    skip     -- missed deadlines are dropped; the next tick is the next deadline in the future
+    catchup  -- missed ticks are yielded back-to-back (tick.catchup=True), at most max_catchup of them;
+                anything beyond that is skipped
+    degrade  -- one tick now, with tick.missed = number of deadlines passed; the caller produces those
+                samples cheaply (e.g. push into the window without scoring / emitting) so the sample
+                spacing the model sees stays even
+
+unpaced() yields ticks with no pacing at all (replay at "max" speed).
+"""
+import asyncio
+from typing import NamedTuple, Optional
+
+from lib.metrics import Registry
+
+POLICIES = ("skip", "catchup", "degrade")
+
+
+class Tick(NamedTuple):
+    index: int          # deadline number since start
+    deadline: float     # loop.time() the tick was due
+    lag: float          # seconds between deadline and the moment the tick was handed out
+    missed: int         # deadlines skipped (skip) / to be produced cheaply (degrade) before this tick
+    catchup: bool       # yielded late, back-to-back, by the catchup policy
+
+
+class TickScheduler:
+    def __init__(self, rate_hz: float = 1.0, policy: str = "skip", max_catchup: int = 10,
+                 registry: Optional[Registry] = None):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be > 0")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overrun policy {policy!r}; expected one of {POLICIES}")
+        self.period = 1.0 / float(rate_hz)
+        self.policy = policy
+        self.max_catchup = int(max_catchup)
+        self.missed_total = 0
+
+        self._m_lag = self._m_jitter = self._m_missed = None
+        if registry is not None:
+            buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+            self._m_lag = registry.histogram("tick_lag_seconds", "Tick start minus its deadline", buckets=buckets)
+            self._m_jitter = registry.histogram("tick_jitter_seconds", "|interval between ticks - period|",
+                                                buckets=buckets)
+            self._m_missed = registry.counter("tick_missed_total", "Deadlines passed during an overrun",
+                                              labels=("policy",))
+
+    def __aiter__(self):
+        return self._ticks()
+
+    async def _ticks(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        k = 0
+        prev = None
+        while True:
+            deadline = start + k * self.period
+            now = loop.time()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+                now = loop.time()
+
+            behind = int((now - deadline) // self.period)      # further deadlines already passed
+            missed, burst = 0, 0
+            if behind > 0:
+                self.missed_total += behind
+                if self._m_missed is not None:
+                    self._m_missed.inc(behind, self.policy)
+                if self.policy == "catchup":
+                    burst = min(behind, self.max_catchup)
+                    missed = behind - burst
+                else:
+                    missed = behind
+
+            if self.policy == "skip" or self.policy == "catchup":
+                k += missed                                     # skipped deadlines: sample never produced
+                deadline = start + k * self.period
+            self._observe(now, deadline, prev)
+            prev = now
+            yield Tick(k, deadline, now - deadline, missed, False)
+            if self.policy == "degrade":
+                k += missed                                     # produced by the caller inside this tick
+            k += 1
+
+            for _ in range(burst):
+                now = loop.time()
+                deadline = start + k * self.period
+                self._observe(now, deadline, prev)
+                prev = now
+                yield Tick(k, deadline, now - deadline, 0, True)
+                k += 1
+
+    def _observe(self, now: float, deadline: float, prev: Optional[float]) -> None:
+        if self._m_lag is not None:
+            self._m_lag.observe(max(0.0, now - deadline))
+        if self._m_jitter is not None and prev is not None:
+            self._m_jitter.observe(abs(now - prev - self.period))
+
+
+async def unpaced():
+    """Ticks back-to-back (no deadlines) for running as fast as the consumer can; yields to the loop each time."""
+    loop = asyncio.get_running_loop()
+    k = 0
+    while True:
+        await asyncio.sleep(0)
+        yield Tick(k, loop.time(), 0.0, 0, False)
+        k += 1
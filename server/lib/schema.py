@@ -0,0 +1,154 @@
+import json, math, os, re
+from datetime import datetime
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def doc_epoch(doc: Dict[str, Any]) -> float:
+    """'timestamp' of a nested document (datetime or ISO string) -> epoch seconds; NaN if missing/invalid."""
+    ts = doc.get("timestamp")
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    try:
+        return datetime.fromisoformat(str(ts)).timestamp()
+    except ValueError:
+        return math.nan
+
+
+class FeatureSchema:
+    """
+    Nested telemetry JSON (row_to_nested_json shape) -> float32 feature row, compiled once from feature_cols.
+
+    Same result as flatten_nested_for_model + data_check + LSTMAE_Evaluator.vectorize, in one pass:
+      - generator_i == None  => g{i}_online = 0, its sensors NaN (imputed later by the evaluator)
+      - missing / None sensor on an online generator => NaN
+      - num_generators_online from contextual_features.system_status, else count of non-null generators
+      - env & distribution values: None/missing => 0.0
+      - 'mode' string => mode_code via MODE_MAP (unknown => 0.0)
+      - any other column in feature_cols => 0.0
+    """
+
+    MODE_MAP = {"startup": 1.0, "stable": 2.0, "high_load": 3.0, "bad_env": 4.0}
+    ENV_KEYS = ("wave_height_meters", "wind_speed_knots", "ship_roll_degrees", "ship_pitch_degrees")
+    DIST_KEYS = ("msb_total_active_power_kw", "msb_busbar_voltage_v")
+    GEN_SENSORS = ("load_kw", "frequency_hz", "lube_oil_pressure_bar", "coolant_temperature_celsius",
+                   "exhaust_gas_temperature_celsius", "vibration_level_mm_s")
+    _GEN_RE = re.compile(r"^g(\d+)_(.+)$")
+
+    def __init__(self, feature_cols: Iterable[str]):
+        self.feature_cols: List[str] = list(feature_cols)
+        self.n_features = len(self.feature_cols)
+
+        self._num_online_slot: Optional[int] = None
+        self._mode_slot: Optional[int] = None
+        self._env: List[tuple] = []             # (slot, key) in contextual_features.environmental
+        self._dist: List[tuple] = []            # (slot, key) in distribution_features
+        gens: Dict[int, dict] = {}
+
+        for slot, name in enumerate(self.feature_cols):
+            if name == "num_generators_online":
+                self._num_online_slot = slot
+            elif name == "mode_code":
+                self._mode_slot = slot
+            elif name in self.ENV_KEYS:
+                self._env.append((slot, name))
+            elif name in self.DIST_KEYS:
+                self._dist.append((slot, name))
+            else:
+                m = self._GEN_RE.match(name)
+                if m is None:
+                    continue                    # unknown column -> stays 0.0
+                k, field = int(m.group(1)), m.group(2)
+                g = gens.setdefault(k, {"online": None, "sensors": []})
+                if field == "online":
+                    g["online"] = slot
+                elif field in self.GEN_SENSORS:
+                    g["sensors"].append((slot, field))
+
+        # (generator key, online slot or None, [(slot, sensor)])
+        self._gens = [(f"generator_{k}", g["online"], g["sensors"]) for k, g in sorted(gens.items())]
+        self._gen_keys = tuple(f"generator_{k}" for k in range(1, 5))
+
+    @classmethod
+    def from_config(cls, artifacts_dir: str = "artifacts") -> "FeatureSchema":
+        with open(os.path.join(artifacts_dir, "config.json")) as f:
+            return cls(json.load(f)["feature_cols"])
+
+    # ---------- single document ----------
+    def row_values(self, doc: Dict[str, Any]) -> List[float]:
+        """One nested document -> list of D python floats in feature_cols order."""
+        row = [0.0] * self.n_features
+        cf = doc.get("contextual_features") or {}
+        main = doc.get("main_features") or {}
+
+        if self._num_online_slot is not None:
+            n = (cf.get("system_status") or {}).get("num_generators_online")
+            if n is None:
+                n = sum(1 for k in self._gen_keys if main.get(k) is not None)
+            row[self._num_online_slot] = float(n)
+
+        if self._env:
+            env = cf.get("environmental") or {}
+            for slot, key in self._env:
+                row[slot] = float(env.get(key) or 0.0)
+
+        if self._dist:
+            dist = doc.get("distribution_features") or {}
+            for slot, key in self._dist:
+                row[slot] = float(dist.get(key) or 0.0)
+
+        nan = np.nan
+        for key, on_slot, sensors in self._gens:
+            g = main.get(key)
+            if isinstance(g, dict):
+                if on_slot is not None:
+                    row[on_slot] = 1.0
+                for slot, field in sensors:
+                    v = g.get(field)
+                    row[slot] = nan if v is None else float(v)
+            else:
+                for slot, _ in sensors:
+                    row[slot] = nan
+
+        if self._mode_slot is not None:
+            m = doc.get("mode")
+            row[self._mode_slot] = self.MODE_MAP.get(m.strip().lower(), 0.0) if isinstance(m, str) else 0.0
+
+        return row
+
+    def to_vector(self, doc: Dict[str, Any]) -> np.ndarray:
+        """One nested document -> (D,) float32."""
+        return np.array(self.row_values(doc), dtype=np.float32)
+
+    # ---------- batch (bulk ingest / backfill) ----------
+    def to_matrix(self, docs: Iterable[Dict[str, Any]]) -> np.ndarray:
+        """List of nested documents -> (N,D) float32, one conversion for the whole batch."""
+        rows = [self.row_values(d) for d in docs]
+        if not rows:
+            return np.empty((0, self.n_features), dtype=np.float32)
+        return np.array(rows, dtype=np.float32)
+
+    def to_matrix_checked(self, docs: List[Any]) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+        """
+        Like to_matrix, but a bad document rejects only itself: returns (X (n_ok,D), ok (N,) bool,
+        {index: error}). Rejected: non-dict, non-numeric values, +-inf anywhere (NaN sensors are fine).
+        """
+        rows, ok, errors = [], np.zeros(len(docs), dtype=bool), {}
+        for i, d in enumerate(docs):
+            if not isinstance(d, dict):
+                errors[i] = "document must be an object"
+                continue
+            try:
+                rows.append(self.row_values(d))
+                ok[i] = True
+            except (TypeError, ValueError, AttributeError) as e:
+                errors[i] = f"invalid value: {e}"
+        X = np.array(rows, dtype=np.float32).reshape(-1, self.n_features)
+        inf = np.isinf(X).any(axis=1)
+        if inf.any():
+            idx = np.nonzero(ok)[0]
+            for i in idx[inf]:
+                errors[int(i)] = "non-finite value"
+            ok[idx[inf]] = False
+            X = X[~inf]
+        return X, ok, errors
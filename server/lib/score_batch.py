@@ -0,0 +1,128 @@
+"""
+Offline batch scoring of recorded telemetry (model feature_cols schema).
+
+Jalankan dari folder server:
+    python -m lib.score_batch recording.csv scores.parquet
+    python -m lib.score_batch day.npz scores.npz --batch-size 2048 --threads 8 --hop 1
+
+Input : CSV / Parquet / NPZ with feature_cols columns (or 'mode' instead of mode_code), optional timestamp.
+Output: one row per window (window ends at row `end_row`): score, blackout_prob, above_threshold,
+        sanity_ok, top{j}_name / top{j}_contribution / top{j}_percent. Format from the extension
+        (.parquet, .csv or .npz).
+
+The whole recording is imputed + scaled once, windows are zero-copy sliding views over it and
+the model runs in large batches -- no per-sample replay through push_sample_and_eval.
+"""
+import argparse, os, time
+import numpy as np
+import pandas as pd
+import torch
+
+from lib.pred import LSTMAE_Evaluator
+from lib.recording import read_table, require_parquet, table_to_matrix, timestamps
+
+
+def sliding_windows(X: np.ndarray, seq_len: int, hop: int = 1) -> np.ndarray:
+    """(N,D) -> (W,L,D) strided view, W = (N-L)//hop + 1. No copy."""
+    if X.shape[0] < seq_len:
+        return np.empty((0, seq_len, X.shape[1]), dtype=X.dtype)
+    win = np.lib.stride_tricks.sliding_window_view(X, seq_len, axis=0)    # (N-L+1, D, L)
+    return win.transpose(0, 2, 1)[::hop]
+
+
+def window_sanity_ok(ev: LSTMAE_Evaluator, X_sc: np.ndarray, hop: int = 1) -> np.ndarray:
+    """
+    Same test as the live path (per-window std of scaled columns: median <= 3, max <= 10), computed for
+    all windows at once with running sums -- O(N) instead of O(N*L).
+    """
+    L = ev.seq_len
+    sub = X_sc[:, ev.scale_idx].astype(np.float64)
+    c1 = np.vstack([np.zeros((1, sub.shape[1])), np.cumsum(sub, axis=0)])
+    c2 = np.vstack([np.zeros((1, sub.shape[1])), np.cumsum(sub * sub, axis=0)])
+    s1 = (c1[L:] - c1[:-L])[::hop]
+    s2 = (c2[L:] - c2[:-L])[::hop]
+    var = np.maximum(s2 / L - (s1 / L) ** 2, 0.0)
+    std = np.sqrt(var)
+    return (np.median(std, axis=1) <= 3.0) & (std.max(axis=1) <= 10.0)
+
+
+def score_matrix(ev: LSTMAE_Evaluator, X: np.ndarray, hop: int = 1, batch_size: int = 1024) -> dict:
+    """Raw (N,D) -> dict of per-window columns. X is imputed + scaled in place."""
+    ev._impute_scale_rows(X)
+    windows = sliding_windows(X, ev.seq_len, hop)
+    total, per_feat, _ = ev.score_windows(windows, batch_size=batch_size, explain=False)
+    idx, contrib, pct = ev.top_table(per_feat)
+
+    cols = {
+        "end_row": np.arange(ev.seq_len - 1, X.shape[0], hop)[:total.shape[0]],
+        "score": total.astype(np.float32),
+        "blackout_prob": ev.probs_from_scores(total).astype(np.float32),
+        "above_threshold": total > ev.threshold,
+        "sanity_ok": window_sanity_ok(ev, X, hop) if total.size else np.empty(0, bool),
+    }
+    names = np.asarray(ev.feature_cols)
+    for j in range(idx.shape[1]):
+        cols[f"top{j + 1}_name"] = names[idx[:, j]]
+        cols[f"top{j + 1}_contribution"] = contrib[:, j]
+        cols[f"top{j + 1}_percent"] = pct[:, j]
+    return cols
+
+
+def write_columns(cols: dict, path: str) -> None:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npz":
+        np.savez_compressed(path, **cols)
+        return
+    df = pd.DataFrame(cols)
+    if ext in (".parquet", ".pq"):
+        require_parquet(path)
+        df.to_parquet(path, index=False)
+    elif ext == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format {ext!r} (expected .parquet, .csv or .npz).")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Batch-score recorded telemetry with sliding windows")
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--artifacts", default="artifacts")
+    ap.add_argument("--backend", default=None, help="eager | torchscript | int8 (default: config.json)")
+    ap.add_argument("--batch-size", type=int, default=1024)
+    ap.add_argument("--hop", type=int, default=1, help="skor setiap window ke-hop (1 = semua window)")
+    ap.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = ap.parse_args()
+    for path in (args.input, args.output):          # gagal sebelum scoring, bukan sesudahnya
+        try:
+            require_parquet(path)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    ev = LSTMAE_Evaluator(artifacts_dir=args.artifacts, device="cpu", backend=args.backend)
+
+    t0 = time.perf_counter()
+    df = read_table(args.input)
+    X, missing = table_to_matrix(df, ev.feature_cols)
+    if missing:
+        print(f"warning: {len(missing)} feature column(s) missing, filled with 0.0: {missing}")
+    t1 = time.perf_counter()
+
+    cols = score_matrix(ev, X, hop=args.hop, batch_size=args.batch_size)
+    ts = timestamps(df)
+    if ts is not None:
+        cols = {"timestamp": ts[cols["end_row"]], **cols}
+    t2 = time.perf_counter()
+
+    write_columns(cols, args.output)
+    t3 = time.perf_counter()
+
+    n = cols["score"].shape[0]
+    print(f"{X.shape[0]} rows -> {n} windows | read {t1 - t0:.2f}s, score {t2 - t1:.2f}s "
+          f"({n / max(t2 - t1, 1e-9):.0f} windows/s), write {t3 - t2:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
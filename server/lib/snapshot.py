@@ -0,0 +1,75 @@
+"""
+Window state snapshots, so scoring resumes right after a restart instead of after seq_len warm-up samples.
+
+    fp = window_fingerprint(pred)
+    save_windows("data/state/sim.npz", {"sim": pred.ring}, fp)
+    rows = load_windows("data/state/sim.npz", fp, max_age=600)     # {"sim": (n,D) float32} or {}
+    pred.ring.extend(rows["sim"])
+
+One .npz (uncompressed; ~8.6 KB per full 60x36 window) holds any number of windows:
+    keys (K,) str, counts (K,) int, rows (sum(counts), D) float32 oldest -> newest per key,
+    saved_at () float64 epoch, fingerprint () str
+Rows are stored already imputed + scaled, so the fingerprint covers feature_cols, seq_len and the scaler's
+center / scale: a snapshot taken with another model or scaler is ignored. Writes go to a temp file that is
+renamed over the old snapshot, so a crash mid-write keeps the previous one.
+"""
+import hashlib, json, os, time
+from typing import TYPE_CHECKING, Dict, Mapping, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from lib.pred import WindowRing         # not at runtime: importing lib.pred loads torch
+
+
+def window_fingerprint(pred) -> str:
+    """Identity of the scaled row space of an LSTMAE_Evaluator."""
+    h = hashlib.sha1(json.dumps([pred.feature_cols, pred.seq_len]).encode())
+    h.update(np.ascontiguousarray(pred._center, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(pred._scale, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def copy_windows(rings: Mapping[str, "WindowRing"]) -> Dict[str, np.ndarray]:
+    """{key: ring} -> {key: (n,D) copy}. Call it where no other thread appends to the rings."""
+    return {str(k): r.view().copy() for k, r in rings.items() if len(r)}
+
+
+def save_windows(path: str, windows: Mapping[str, np.ndarray], fingerprint: str) -> int:
+    """windows: {key: (n,D) rows} (see copy_windows). Returns the number of windows written."""
+    keys = list(windows)
+    parts = [np.asarray(windows[k], np.float32) for k in keys]
+    D = parts[0].shape[1] if parts else 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:                 # file object: np.savez would append .npz to the tmp name
+        np.savez(f, keys=np.array(keys, dtype=str), counts=np.array([p.shape[0] for p in parts], np.int64),
+                 rows=np.concatenate(parts) if parts else np.empty((0, D), np.float32),
+                 saved_at=np.float64(time.time()), fingerprint=np.array(fingerprint))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(keys)
+
+
+def load_windows(path: str, fingerprint: str, max_age: Optional[float] = None,
+                 now: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    {key: (n,D) rows} from a snapshot; {} if there is none, it belongs to another model/scaler, it is older
+    than max_age seconds (a window that old is not a continuation of what arrives next), or it is unreadable.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            if str(z["fingerprint"]) != fingerprint:
+                return {}
+            now = time.time() if now is None else now
+            if max_age is not None and now - float(z["saved_at"]) > max_age:
+                return {}
+            keys, counts, rows = z["keys"].tolist(), z["counts"], z["rows"]
+    except (OSError, KeyError, ValueError) as e:
+        print(f"[snapshot] ignoring unreadable {path}: {e}")
+        return {}
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    return {k: rows[bounds[i]:bounds[i + 1]] for i, k in enumerate(keys)}
@@ -0,0 +1,151 @@
+"""
+Per-feature running statistics in O(D) per sample, so no tick has to reduce a whole window.
+
+    WindowStats     exact mean / variance of the rows currently in a WindowRing (sliding Welford: the new row
+                    replaces the one the ring overwrites). Drives the scaling sanity check.
+    FeatureStats    Welford mean / variance per horizon (samples; exact until the horizon is reached, then
+                    exponentially weighted with weight 1/horizon), NaN (= imputed) counts and the rate of
+                    values missing while expected (an offline generator's sensors are not expected).
+                    Drives the drift report.
+
+Both see the evaluator's rows after impute + scale + clip, so the live distribution is compared with the
+scaler directly:
+    shift   live mean in scaler units, i.e. (raw mean - scaler center) / scaler scale
+    spread  live std / scaler scale
+A RobustScaler scales by the IQR, so a stationary normal feature has spread ~0.74, not 1. Imputed samples
+sit at the center (shift 0) and clipped ones at +-8; nan_rate / nan_total tell how much of a figure is imputed.
+
+    ev.feature_stats.report()      # lib/pred.py LSTMAE_Evaluator.drift_report()
+    export_metrics(report, registry)
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_HORIZONS = (60, 3600)
+DRIFT_LIMITS = {"shift": 3.0, "spread": 3.0, "nan_rate": 0.5}
+
+
+class WindowStats:
+    """
+    Mean / population variance (= np.nanstd(window, axis=0) ** 2 on imputed rows) of the last seq_len rows.
+    `writes` is the WindowRing.writes value the statistics match; the owner recomputes them with refresh()
+    when the ring changed behind their back (extend, clear) and every refresh_every pushes, which bounds the
+    rounding error of the remove step.
+    """
+
+    def __init__(self, seq_len: int, n_features: int, refresh_every: int = 1024):
+        self.seq_len = int(seq_len)
+        self.refresh_every = int(refresh_every)
+        self.n = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.writes = -1                    # -1: not in sync with any ring yet
+        self._pushes = 0
+
+    def push(self, x: np.ndarray, dropped: Optional[np.ndarray] = None) -> None:
+        """x: new (n_features,) row; dropped: the row it pushed out of a full window, else None."""
+        x = x.astype(np.float64)
+        if dropped is not None and self.n == self.seq_len:
+            y = dropped.astype(np.float64)
+            d = x - y
+            mean = self.mean + d / self.n
+            self.m2 += d * (x - mean + y - self.mean)
+            self.mean = mean
+        else:
+            self.n += 1
+            d = x - self.mean
+            self.mean += d / self.n
+            self.m2 += d * (x - self.mean)
+        self._pushes += 1
+        if self._pushes >= self.refresh_every:
+            self.writes = -1
+
+    def refresh(self, rows: np.ndarray, writes: int) -> None:
+        """Recompute from the (n, n_features) rows now in the window."""
+        rows = np.asarray(rows, dtype=np.float64)
+        self.n = rows.shape[0]
+        self.mean = rows.mean(axis=0) if self.n else np.zeros_like(self.mean)
+        self.m2 = ((rows - self.mean) ** 2).sum(axis=0) if self.n else np.zeros_like(self.m2)
+        self.writes = writes
+        self._pushes = 0
+
+    def std(self) -> np.ndarray:
+        return np.sqrt(np.maximum(self.m2, 0.0) / max(self.n, 1))
+
+
+class FeatureStats:
+    """Running statistics of the scaled columns over several horizons (samples). Not thread-safe."""
+
+    def __init__(self, names: Sequence[str], horizons: Sequence[int] = DEFAULT_HORIZONS):
+        self.names = list(names)
+        self.horizons = tuple(sorted({int(h) for h in horizons}))
+        if not self.horizons or self.horizons[0] < 2:
+            raise ValueError(f"horizons must be >= 2 samples, got {list(horizons)}")
+        H, n = len(self.horizons), len(self.names)
+        self._h = np.array(self.horizons, dtype=np.float64)[:, None]
+        self.n = 0
+        self.mean = np.zeros((H, n))
+        self.var = np.zeros((H, n))
+        self.nan_rate = np.zeros((H, n))
+        self.nan_total = np.zeros(n, dtype=np.int64)
+
+    def update(self, x: np.ndarray, nan: np.ndarray, expected: Optional[np.ndarray] = None) -> None:
+        """
+        x: (n,) scaled values, nan: (n,) bool, True where the raw value was missing (imputed),
+        expected: (n,) bool, False where a missing value is normal (None = always expected).
+        """
+        self.n += 1
+        a = np.maximum(1.0 / self._h, 1.0 / self.n)       # 1/n = plain Welford while n < horizon
+        d = x - self.mean
+        self.mean += a * d
+        self.var = (1.0 - a) * (self.var + a * d * d)
+        self.nan_rate += a * ((nan if expected is None else nan & expected) - self.nan_rate)
+        self.nan_total += nan
+
+    def reset(self) -> None:
+        self.n = 0
+        self.mean[:] = 0.0; self.var[:] = 0.0; self.nan_rate[:] = 0.0; self.nan_total[:] = 0
+
+    def report(self, limits: Optional[Dict[str, float]] = None, warmup: int = 60) -> Dict[str, Any]:
+        """
+        {"samples", "features", "horizons", "shift", "spread", "nan_rate" (one list per horizon, in
+        feature order), "nan_total", "flagged": [{name, horizon, shift, spread, nan_rate}]}.
+        A feature is flagged on a horizon with >= min(horizon, warmup) samples when |shift|, spread or
+        nan_rate exceeds its limit (DRIFT_LIMITS).
+        """
+        lim = {**DRIFT_LIMITS, **(limits or {})}
+        spread = np.sqrt(np.maximum(self.var, 0.0))
+        flagged: List[Dict[str, Any]] = []
+        for k, h in enumerate(self.horizons):
+            if self.n < min(h, warmup):
+                continue
+            bad = (np.abs(self.mean[k]) > lim["shift"]) | (spread[k] > lim["spread"]) | \
+                (self.nan_rate[k] > lim["nan_rate"])
+            for j in np.nonzero(bad)[0]:
+                flagged.append({"name": self.names[j], "horizon": h, "shift": float(self.mean[k, j]),
+                                "spread": float(spread[k, j]), "nan_rate": float(self.nan_rate[k, j])})
+        return {"samples": self.n, "features": self.names, "horizons": list(self.horizons),
+                "shift": np.round(self.mean, 4).tolist(), "spread": np.round(spread, 4).tolist(),
+                "nan_rate": np.round(self.nan_rate, 4).tolist(), "nan_total": self.nan_total.tolist(),
+                "flagged": flagged}
+
+
+_GAUGES = (("shift", "drift_shift", "Live mean of a scaled feature, in scaler units from its center"),
+           ("spread", "drift_spread", "Live std of a scaled feature / scaler scale"),
+           ("nan_rate", "nan_ratio", "Share of samples missing while expected (imputed)"))
+
+
+def export_metrics(report: Dict[str, Any], registry, prefix: str = "feature") -> None:
+    """Set {prefix}_drift_shift / _drift_spread / _nan_ratio{feature,horizon} and {prefix}_drift_flagged."""
+    gauges = {}
+    for key, metric, help in _GAUGES:
+        name = f"{prefix}_{metric}"
+        gauges[key] = registry.get(name) or registry.gauge(name, help, labels=("feature", "horizon"))
+    flagged = registry.get(f"{prefix}_drift_flagged") or registry.gauge(
+        f"{prefix}_drift_flagged", "Feature x horizon pairs over a drift limit")
+    for k, h in enumerate(report["horizons"]):
+        for key, g in gauges.items():
+            for name, v in zip(report["features"], report[key][k]):
+                g.set(v, (name, h))
+    flagged.set(len(report["flagged"]))
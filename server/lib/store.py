@@ -0,0 +1,427 @@
+"""
+Embedded append-only time-series store for per-tick feature vectors and prediction outputs.
+
+Layout (one directory per vessel, columnar, chunked):
+
+    <root>/meta.json                          feature_cols of the stored vectors
+    <root>/<vessel>/raw/<seg>/ts.npy          float64 (capacity,)     epoch seconds
+                              x.npy           float32 (capacity, D)   raw features (NaN = offline sensor)
+                              score.npy       float32 (capacity,)     NaN = not scored
+                              prob.npy        float32 (capacity,)
+                              rows            number of valid rows (replaced atomically after each write)
+    <root>/<vessel>/minute/<seg>.npz          minute rollups of a sealed segment
+
+Segments are preallocated .npy files opened as memmaps, so appends are row writes and readers get
+np.load(mmap_mode="r")[:rows] without parsing. A segment is sealed when full; sealing writes its minute
+rollup (count, and non-NaN count / mean / min / max of every feature, score and blackout_prob).
+ts is sorted inside a segment: each batch is sorted by ts (rows with a non-finite ts are dropped) and
+merged into the open segment. Rows older than the open segment's first row (e.g. a simulator clock that
+restarted behind the stored data) seal it and start a new one, so segments may overlap in time and
+read() merges them.
+Retention: raw segments older than raw_days are deleted (their rollups stay), rollups older than
+rollup_days too.
+
+Writes go through StoreWriter: append() only enqueues, a background thread groups the queue by vessel
+and writes batches, so the tick never waits on disk.
+"""
+import json, os, queue, re, shutil, threading, time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+SEGMENT_ROWS = 4096
+VESSEL_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,127}")    # also the directory name: no "..", no "/"
+COLUMNS = ("ts", "x", "score", "prob")
+
+
+def valid_vessel_id(vessel) -> bool:
+    return isinstance(vessel, str) and VESSEL_ID.fullmatch(vessel) is not None
+
+
+def vessel_dir_name(vessel: str) -> str:
+    """The vessel's directory under the store root (the id itself). Raises ValueError for any other id."""
+    if not valid_vessel_id(vessel):
+        raise ValueError(f"invalid vessel id {str(vessel)[:128]!r}: expected {VESSEL_ID.pattern}")
+    return vessel
+
+
+class _Segment:
+    def __init__(self, path: str, n_features: int, capacity: int, create: bool):
+        self.path = path
+        if create:
+            os.makedirs(path)
+            self.cols = {
+                "ts": np.lib.format.open_memmap(os.path.join(path, "ts.npy"), "w+", np.float64, (capacity,)),
+                "x": np.lib.format.open_memmap(os.path.join(path, "x.npy"), "w+", np.float32, (capacity, n_features)),
+                "score": np.lib.format.open_memmap(os.path.join(path, "score.npy"), "w+", np.float32, (capacity,)),
+                "prob": np.lib.format.open_memmap(os.path.join(path, "prob.npy"), "w+", np.float32, (capacity,)),
+            }
+            self.rows = 0
+            self._write_rows()
+        else:
+            self.cols = {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r+") for c in COLUMNS}
+            self.rows = read_rows(path)
+        self.capacity = self.cols["ts"].shape[0]
+
+    def insert(self, ts, x, score, prob) -> tuple:
+        """
+        Merge sorted rows (ts >= the first stored ts) into the segment in ts order, as many as fit. Returns
+        the rows that did not fit (ts, x, score, prob), sorted; they may include stored rows pushed out.
+        """
+        r = self.rows
+        p = r if not r or ts[0] >= self.cols["ts"][r - 1] else \
+            int(np.searchsorted(self.cols["ts"][:r], ts[0], "right"))
+        new = (ts, x, score, prob)
+        if p < r:                               # late rows: merge with the stored tail (equal ts keep order)
+            new = tuple(np.concatenate([np.array(self.cols[c][p:r]), a]) for c, a in zip(COLUMNS, new))
+            order = np.argsort(new[0], kind="stable")
+            new = tuple(a[order] for a in new)
+        n = min(len(new[0]), self.capacity - p)
+        for c, a in zip(COLUMNS, new):
+            self.cols[c][p:p + n] = a[:n]
+        self.rows = p + n
+        return tuple(a[n:] for a in new)
+
+    def commit(self) -> None:
+        for a in self.cols.values():
+            a.flush()
+        self._write_rows()
+
+    def _write_rows(self) -> None:
+        tmp = os.path.join(self.path, "rows.tmp")
+        with open(tmp, "w") as f:
+            f.write(str(self.rows))
+        os.replace(tmp, os.path.join(self.path, "rows"))
+
+    @property
+    def full(self) -> bool:
+        return self.rows >= self.capacity
+
+
+def read_rows(seg_path: str) -> int:
+    try:
+        with open(os.path.join(seg_path, "rows")) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def segment_start(seg_path: str) -> float:
+    """Segments are named <first ts in ms>-<seq>."""
+    return int(os.path.basename(seg_path).split("-")[0]) / 1000.0
+
+
+def minute_rollup(ts: np.ndarray, x: np.ndarray, score: np.ndarray, prob: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-minute aggregates of one chunk of rows (ts sorted): "ts" (minute start), "count", and for each of
+    x (per feature), score and prob: <col>_n (non-NaN values), <col>_mean, <col>_min, <col>_max.
+    """
+    minute = np.floor(ts / 60.0) * 60.0
+    keys, start, count = np.unique(minute, return_index=True, return_counts=True)
+    if keys.size == 0:
+        return {}
+    out = {"ts": keys, "count": count}
+    for name, a in (("x", x), ("score", score), ("prob", prob)):
+        a = np.asarray(a, np.float32)
+        ok = ~np.isnan(a)
+        n = np.add.reduceat(ok.astype(np.int64), start, axis=0)
+        total = np.add.reduceat(np.where(ok, a, 0.0).astype(np.float64), start, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[f"{name}_mean"] = np.where(n > 0, total / np.maximum(n, 1), np.nan).astype(np.float32)
+        out[f"{name}_n"] = n.astype(np.int32)
+        out[f"{name}_min"] = np.fmin.reduceat(a, start, axis=0)
+        out[f"{name}_max"] = np.fmax.reduceat(a, start, axis=0)
+    return out
+
+
+class TimeSeriesStore:
+    """Single writer (StoreWriter thread or the caller), any number of readers."""
+
+    def __init__(self, root: str, feature_cols: List[str], segment_rows: int = SEGMENT_ROWS,
+                 raw_days: float = 7.0, rollup_days: float = 365.0):
+        self.root = root
+        self.feature_cols = list(feature_cols)
+        self.n_features = len(self.feature_cols)
+        self.segment_rows = int(segment_rows)
+        self.raw_days = raw_days
+        self.rollup_days = rollup_days
+        self._open: Dict[str, _Segment] = {}       # vessel dir name -> active segment
+        self._rollup_cache: Dict[str, tuple] = {}  # rollup path -> (mtime, arrays); rollups are immutable
+        self._last_cache: Dict[str, tuple] = {}    # segment path -> (rows, last ts)
+        self.rejected = 0                          # rows dropped for a non-finite ts
+        os.makedirs(root, exist_ok=True)
+
+        meta_path = os.path.join(root, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                stored = json.load(f)["feature_cols"]
+            if stored != self.feature_cols:
+                raise ValueError(f"Store at {root!r} holds different feature_cols; use another directory.")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"feature_cols": self.feature_cols}, f)
+
+    # ---------- paths ----------
+    def _raw_dir(self, vessel: str) -> str:
+        return os.path.join(self.root, vessel_dir_name(vessel), "raw")
+
+    def _rollup_dir(self, vessel: str) -> str:
+        return os.path.join(self.root, vessel_dir_name(vessel), "minute")
+
+    def vessels(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def _segments(self, vessel: str) -> List[str]:
+        d = self._raw_dir(vessel)
+        return [os.path.join(d, s) for s in sorted(os.listdir(d))] if os.path.isdir(d) else []
+
+    # ---------- write ----------
+    def append(self, vessel: str, ts: np.ndarray, x: np.ndarray, score: np.ndarray, prob: np.ndarray) -> None:
+        """
+        Append rows in any order (sorted by ts here; rows with a NaN / inf ts are dropped and counted in
+        `rejected`). Not thread-safe: one writer per store.
+        """
+        ts = np.asarray(ts, np.float64).reshape(-1)
+        x = np.asarray(x, np.float32).reshape(-1, self.n_features)
+        score = np.asarray(score, np.float32).reshape(-1)
+        prob = np.asarray(prob, np.float32).reshape(-1)
+        if not (ts.size == x.shape[0] == score.size == prob.size):
+            raise ValueError(f"row counts differ: ts {ts.size}, x {x.shape[0]}, score {score.size}, prob {prob.size}")
+        ok = np.isfinite(ts)
+        if not ok.all():
+            self.rejected += int(ts.size - ok.sum())
+            ts, x, score, prob = ts[ok], x[ok], score[ok], prob[ok]
+        if ts.size > 1 and (np.diff(ts) < 0).any():
+            order = np.argsort(ts, kind="stable")
+            ts, x, score, prob = ts[order], x[order], score[order], prob[order]
+        while ts.size:
+            seg = self._active(vessel, ts[0])
+            if seg.rows and ts[0] < seg.cols["ts"][0]:      # older than the whole open segment
+                self._seal(vessel, seg)
+                continue
+            ts, x, score, prob = seg.insert(ts, x, score, prob)
+            seg.commit()
+            if seg.full:
+                self._seal(vessel, seg)
+
+    def _active(self, vessel: str, t0: float) -> _Segment:
+        key = vessel_dir_name(vessel)
+        seg = self._open.get(key)
+        if seg is None:
+            existing = self._segments(vessel)
+            if existing and read_rows(existing[-1]) < self.segment_rows and \
+                    not os.path.exists(self._rollup_path(vessel, existing[-1])):
+                seg = _Segment(existing[-1], self.n_features, self.segment_rows, create=False)
+            else:
+                seq = len(existing)
+                while os.path.exists(os.path.join(self._raw_dir(vessel), f"{int(t0 * 1000):015d}-{seq:06d}")):
+                    seq += 1
+                name = f"{int(t0 * 1000):015d}-{seq:06d}"
+                seg = _Segment(os.path.join(self._raw_dir(vessel), name), self.n_features, self.segment_rows, True)
+            self._open[key] = seg
+        return seg
+
+    def _rollup_path(self, vessel: str, seg_path: str) -> str:
+        return os.path.join(self._rollup_dir(vessel), os.path.basename(seg_path) + ".npz")
+
+    def _seal(self, vessel: str, seg: _Segment) -> None:
+        seg.commit()
+        r = seg.rows
+        agg = minute_rollup(seg.cols["ts"][:r], seg.cols["x"][:r], seg.cols["score"][:r], seg.cols["prob"][:r])
+        os.makedirs(self._rollup_dir(vessel), exist_ok=True)
+        path = self._rollup_path(vessel, seg.path)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **agg)
+        os.replace(tmp, path)
+        self._open.pop(vessel_dir_name(vessel), None)
+
+    def flush(self) -> None:
+        for seg in self._open.values():
+            seg.commit()
+
+    # ---------- read ----------
+    def read(self, vessel: str, t0: float = -np.inf, t1: float = np.inf,
+             columns: Iterable[str] = COLUMNS) -> Dict[str, np.ndarray]:
+        """
+        Rows with t0 <= ts < t1, oldest first. Single-segment results are memmap slices (no copy); segments
+        that overlap in time are merged by ts (stable, so equal ts keep their write order).
+        """
+        columns = tuple(columns)
+        parts: Dict[str, list] = {c: [] for c in columns + ("ts",)}
+        for path in self._segments(vessel):
+            if segment_start(path) >= t1:        # names sort by first ts: every later segment starts later
+                break
+            rows, last = self._last(path)
+            if rows == 0 or last < t0:
+                continue
+            ts = np.load(os.path.join(path, "ts.npy"), mmap_mode="r")[:rows]
+            i0, i1 = np.searchsorted(ts, t0, "left"), np.searchsorted(ts, t1, "left")
+            if i1 <= i0:
+                continue
+            for c in parts:
+                a = ts if c == "ts" else np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r")
+                parts[c].append(a[i0:i1])
+        out = {}
+        order = None
+        if len(parts["ts"]) > 1:
+            ts = np.concatenate(parts["ts"])
+            if (np.diff(ts) < 0).any():
+                order = np.argsort(ts, kind="stable")
+        for c in columns:
+            p = parts[c]
+            if len(p) == 1:
+                out[c] = p[0]
+            elif p:
+                out[c] = np.concatenate(p) if order is None else np.concatenate(p)[order]
+            else:
+                out[c] = np.empty((0, self.n_features) if c == "x" else 0, np.float32 if c != "ts" else np.float64)
+        return out
+
+    def _last(self, path: str) -> tuple:
+        """(rows, ts of the last row) of a segment; -inf when empty."""
+        rows = read_rows(path)
+        hit = self._last_cache.get(path)
+        if hit is None or hit[0] != rows:
+            last = float(np.load(os.path.join(path, "ts.npy"), mmap_mode="r")[rows - 1]) if rows else -np.inf
+            hit = self._last_cache[path] = (rows, last)
+        return hit
+
+    def read_rollup(self, vessel: str, t0: float = -np.inf, t1: float = np.inf) -> Dict[str, np.ndarray]:
+        """Minute rollups of sealed segments with t0 <= minute < t1, oldest first."""
+        d = self._rollup_dir(vessel)
+        parts: Dict[str, list] = {}
+        for name in (sorted(os.listdir(d)) if os.path.isdir(d) else []):
+            if not name.endswith(".npz") or name.endswith(".tmp.npz"):
+                continue
+            z = self._load_rollup(os.path.join(d, name))
+            ts = z.get("ts")
+            if ts is None or ts.size == 0 or ts[0] >= t1 or ts[-1] < t0:
+                continue
+            i0, i1 = np.searchsorted(ts, t0, "left"), np.searchsorted(ts, t1, "left")
+            for k, a in z.items():
+                parts.setdefault(k, []).append(a[i0:i1])
+        out = {k: np.concatenate(v) for k, v in parts.items()}
+        if len(parts.get("ts", ())) > 1 and (np.diff(out["ts"]) < 0).any():      # overlapping segments
+            order = np.argsort(out["ts"], kind="stable")
+            out = {k: v[order] for k, v in out.items()}
+        return out
+
+    def _load_rollup(self, path: str) -> Dict[str, np.ndarray]:
+        mtime = os.path.getmtime(path)
+        hit = self._rollup_cache.get(path)
+        if hit is None or hit[0] != mtime:
+            with np.load(path) as z:
+                hit = self._rollup_cache[path] = (mtime, {k: z[k] for k in z.files})
+        return hit[1]
+
+    def unsealed_start(self, vessel: str) -> float:
+        """ts of the first row not covered by a rollup yet (inf when every raw row is rolled up)."""
+        first = np.inf
+        for path in self._segments(vessel):     # the open segment may sort before sealed ones that overlap it
+            if read_rows(path) and not os.path.exists(self._rollup_path(vessel, path)):
+                first = min(first, float(np.load(os.path.join(path, "ts.npy"), mmap_mode="r")[0]))
+        return first
+
+    def last_ts(self, vessel: str) -> float:
+        """ts of the newest stored row (NaN when the vessel has none)."""
+        last = max((self._last(p)[1] for p in self._segments(vessel)), default=-np.inf)
+        return last if last > -np.inf else np.nan
+
+    # ---------- retention / compaction ----------
+    def enforce_retention(self, now: Optional[float] = None) -> int:
+        """Delete raw segments older than raw_days (rolled up first) and rollups older than rollup_days."""
+        now = time.time() if now is None else now
+        removed = 0
+        for v in self.vessels():
+            open_seg = self._open.get(v)
+            for path in self._segments(v):
+                rows = read_rows(path)
+                if rows == 0 or (open_seg is not None and open_seg.path == path):
+                    continue
+                last = float(np.load(os.path.join(path, "ts.npy"), mmap_mode="r")[rows - 1])
+                if last >= now - self.raw_days * 86400:
+                    continue
+                if not os.path.exists(self._rollup_path(v, path)):
+                    self._seal(v, _Segment(path, self.n_features, self.segment_rows, create=False))
+                shutil.rmtree(path)
+                self._last_cache.pop(path, None)
+                removed += 1
+            d = self._rollup_dir(v)
+            for name in (os.listdir(d) if os.path.isdir(d) else []):
+                p = os.path.join(d, name)
+                with np.load(p) as z:
+                    old = "ts" in z.files and z["ts"].size and z["ts"][-1] < now - self.rollup_days * 86400
+                if old:
+                    os.remove(p)
+                    self._rollup_cache.pop(p, None)
+                    removed += 1
+        return removed
+
+
+class StoreWriter:
+    """Background batched writer: append() enqueues and returns immediately."""
+
+    def __init__(self, store: TimeSeriesStore, flush_interval: float = 1.0, retention_interval: float = 3600.0,
+                 max_pending: int = 100_000):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.retention_interval = retention_interval
+        self._q: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0                 # rows of batches the store could not write (logged, skipped)
+        self._thread = threading.Thread(target=self._run, name="store-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, vessel: str, ts, x, score, prob) -> None:
+        """One row ((D,) x, scalar ts/score/prob) or a batch ((n,) / (n,D)). Drops (and counts) when full."""
+        try:
+            self._q.put_nowait((vessel, ts, x, score, prob))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _drain(self) -> None:
+        batches: Dict[str, list] = {}
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+            batches.setdefault(item[0], []).append(item[1:])
+        for vessel, items in batches.items():
+            try:
+                self._write(vessel, items)
+            except Exception:           # retry one by one: only the bad item is lost, not what follows it
+                for item in items:
+                    try:
+                        self._write(vessel, [item])
+                    except Exception as e:
+                        self.failed += int(np.size(item[0]))
+                        print(f"store writer: rows for {vessel!r} skipped:", e)
+
+    def _write(self, vessel: str, items: list) -> None:
+        D = self.store.n_features
+        ts = np.concatenate([np.atleast_1d(np.asarray(i[0], np.float64)) for i in items])
+        x = np.concatenate([np.asarray(i[1], np.float32).reshape(-1, D) for i in items])
+        score = np.concatenate([np.atleast_1d(np.asarray(i[2], np.float32)) for i in items])
+        prob = np.concatenate([np.atleast_1d(np.asarray(i[3], np.float32)) for i in items])
+        self.store.append(vessel, ts, x, score, prob)
+        self.written += ts.size
+
+    def _run(self) -> None:
+        next_retention = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._drain()
+                if time.monotonic() >= next_retention:
+                    self.store.enforce_retention()
+                    next_retention = time.monotonic() + self.retention_interval
+            except Exception as e:          # disk full / permissions: keep the thread alive, report
+                print("store writer error:", e)
+        self._drain()
+        self.store.flush()
@@ -0,0 +1,369 @@
+"""
+Streaming (re)training of LSTMAutoencoder into a versioned artifact set that LSTMAE_Evaluator loads unchanged.
+
+Jalankan dari folder server:
+    python -m lib.train v2 --sim-seeds 0-15 --sim-ticks 20000 --epochs 5 --workers 2 --threads 4
+    python -m lib.train v3 --recording data/a.csv data/b.npz --val-recording data/c.csv --init artifacts
+
+Sources are simulator runs (SimpleShipSim, one per seed) and recordings (lib/recording.py schema, or a column
+mapping as in lib/replay.py). No step holds more than one chunk of raw rows per source (a CSV is read in
+chunks; Parquet / NPZ files one at a time) plus a bounded shuffle buffer of windows:
+
+  1. scaler  every training row streams once through a KLL sketch per scaled column (lib/sketch.py):
+             median / IQR, the RobustScaler fit, written as scaler.npz (lib/scaler.py)
+  2. train   WindowStream (IterableDataset) imputes + scales each chunk exactly like the evaluator, cuts a
+             window every window_stride rows and draws random batches from a buffer of shuffle_buffer
+             windows. DataLoader worker i takes sources i, i + workers, ...; each worker runs torch on one
+             thread, the training step on --threads.
+  3. write   artifacts/versions/<name>/ (lib/versions.py): config.json (the base contract + threshold +
+             "training" metadata), lstm_ae_best.pth (epoch with the lowest validation loss), scaler.npz.
+             threshold = threshold_quantile of the new model's scores on the validation windows, scored by
+             an LSTMAE_Evaluator loaded from the written files.
+
+feature_cols / scaled_columns come from --base (seq_len too, unless --seq-len) and the architecture is the
+LSTMAutoencoder default, so the server picks the result up like any other version (POST /admin/model/activate
+or artifacts/ACTIVE). Throughput is printed per phase: rows/s for the scaler pass, windows/s for training.
+"""
+import argparse, copy, json, os, time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from lib.pred import LSTMAutoencoder, LSTMAE_Evaluator
+from lib.recording import read_table, table_to_matrix
+from lib.scaler import NPZ
+from lib.schema import FeatureSchema
+from lib.score_batch import sliding_windows
+from lib.sketch import KLLSketch
+from lib.versions import BASE, publish_version, staging_dir, version_dir
+
+CLIP = 8.0          # LSTMAE_Evaluator._impute_scale_rows clips scaled rows to +-8
+
+# ("sim", seed, ticks) | ("file", path, mapping or None)
+Source = Tuple[str, Any, Any]
+
+
+def parse_seeds(spec: str) -> List[int]:
+    """"0-15", "3,7,9" or "0-3,10" -> seeds."""
+    seeds: List[int] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        lo, _, hi = part.partition("-")
+        seeds.extend(range(int(lo), int(hi) + 1) if hi else [int(lo)])
+    return seeds
+
+
+def _mapped(df, feature_cols: List[str], mapping: Optional[Dict[str, Any]]):
+    from lib.replay import apply_mapping, detect_mapping      # pandas helpers shared with replay
+    mapping = mapping if mapping is not None else detect_mapping(df, feature_cols)
+    return (df if mapping is None else apply_mapping(df, mapping)), mapping
+
+
+def iter_chunks(source: Source, feature_cols: List[str], chunk: int) -> Iterator[np.ndarray]:
+    """Raw (n,D) float32 rows of one source in feature_cols order, oldest first, n <= chunk."""
+    kind, arg, extra = source
+    if kind == "sim":
+        from lib.generator1 import SimpleShipSim, row_to_nested_json
+        sim, schema = SimpleShipSim(seed=arg), FeatureSchema(feature_cols)
+        for start in range(0, extra, chunk):
+            yield schema.to_matrix(row_to_nested_json(sim.step()) for _ in range(min(chunk, extra - start)))
+        return
+    mapping = extra
+    if os.path.splitext(arg)[1].lower() == ".csv":
+        import pandas as pd
+        for df in pd.read_csv(arg, chunksize=chunk):
+            df, mapping = _mapped(df, feature_cols, mapping)
+            yield table_to_matrix(df, feature_cols)[0]
+        return
+    df, _ = _mapped(read_table(arg), feature_cols, mapping)
+    X = table_to_matrix(df, feature_cols)[0]
+    del df
+    for start in range(0, X.shape[0], chunk):
+        yield X[start:start + chunk]
+
+
+def impute_scale(X: np.ndarray, scale_idx: np.ndarray, center: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """LSTMAE_Evaluator._impute_scale_rows for an affine scaler, in place on raw (n,D) float32 rows."""
+    sub = X[:, scale_idx].astype(np.float64)
+    nan = np.isnan(sub)
+    if nan.any():
+        sub[nan] = np.take(center, np.nonzero(nan)[1])
+    sub -= center
+    sub /= scale
+    X[:, scale_idx] = sub.astype(np.float32)
+    np.clip(X, -CLIP, CLIP, out=X)
+    return X
+
+
+def _worker_init(_):
+    torch.set_num_threads(1)            # parallelism comes from the workers
+
+
+def _my_sources(sources: Sequence[Source]) -> Sequence[Source]:
+    info = get_worker_info()
+    return sources if info is None else sources[info.id::info.num_workers]
+
+
+class RowStream(IterableDataset):
+    """Raw (n,D) row chunks of the sources (scaler pass)."""
+
+    def __init__(self, sources: Sequence[Source], feature_cols: List[str], chunk: int = 2048):
+        self.sources, self.feature_cols, self.chunk = list(sources), list(feature_cols), int(chunk)
+
+    def __iter__(self):
+        for src in _my_sources(self.sources):
+            yield from iter_chunks(src, self.feature_cols, self.chunk)
+
+
+class WindowStream(IterableDataset):
+    """
+    Shuffled (B,L,D) float32 batches of scaled windows, one pass over the sources per iteration. Memory per
+    worker: shuffle_buffer windows + one chunk. Set `epoch` before iterating for a new shuffle order.
+    """
+
+    def __init__(self, sources: Sequence[Source], feature_cols: List[str], scale_idx: np.ndarray,
+                 center: np.ndarray, scale: np.ndarray, seq_len: int, batch_size: int = 128,
+                 window_stride: int = 5, shuffle_buffer: int = 4096, chunk: int = 2048, seed: int = 0,
+                 max_windows: Optional[int] = None):
+        self.sources, self.feature_cols = list(sources), list(feature_cols)
+        self.scale_idx, self.center, self.scale = np.asarray(scale_idx), np.asarray(center), np.asarray(scale)
+        self.seq_len, self.batch_size, self.window_stride = int(seq_len), int(batch_size), int(window_stride)
+        self.shuffle_buffer = max(int(shuffle_buffer), self.batch_size)
+        self.chunk, self.seed, self.max_windows = int(chunk), int(seed), max_windows
+        self.epoch = 0
+
+    def windows(self, sources: Sequence[Source]) -> Iterator[np.ndarray]:
+        """(w,L,D) strided views, in stream order: a window starts every window_stride rows of each source."""
+        L, hop = self.seq_len, self.window_stride
+        for src in sources:
+            tail, skip = None, 0            # rows carried into the next chunk / rows to skip at its start
+            for X in iter_chunks(src, self.feature_cols, self.chunk):
+                impute_scale(X, self.scale_idx, self.center, self.scale)
+                ext = X if tail is None else np.concatenate([tail, X])
+                w = sliding_windows(ext[skip:], L, hop)
+                if w.shape[0]:
+                    yield w
+                nxt = skip + w.shape[0] * hop      # start of the next window in ext
+                tail, skip = ext[min(nxt, ext.shape[0]):], max(0, nxt - ext.shape[0])
+
+    def __iter__(self):
+        info = get_worker_info()
+        wid, nw = (info.id, info.num_workers) if info is not None else (0, 1)
+        rng = np.random.default_rng((self.seed, self.epoch, wid))
+        limit = None if self.max_windows is None else max(1, self.max_windows // nw)
+        B, cap = self.batch_size, self.shuffle_buffer
+        buf = np.empty((cap, self.seq_len, len(self.feature_cols)), dtype=np.float32)
+        free = np.arange(cap)           # empty slots; the buffer is full when there are none
+        sent = 0
+        for w in self.windows(_my_sources(self.sources)):
+            i = 0
+            while i < w.shape[0]:
+                take = min(free.size, w.shape[0] - i)
+                buf[free[:take]] = w[i:i + take]
+                free, i = free[take:], i + take
+                if free.size == 0:
+                    free = rng.choice(cap, B, replace=False)
+                    yield torch.from_numpy(buf[free])          # fancy index: a copy
+                    sent += B
+                    if limit is not None and sent >= limit:
+                        return
+        held = np.setdiff1d(np.arange(cap), free)
+        rng.shuffle(held)
+        for s in range(0, held.size, B):
+            if limit is not None and sent >= limit:
+                return
+            yield torch.from_numpy(buf[held[s:s + B]])
+            sent += min(B, held.size - s)
+
+
+def fit_scaler(sources: Sequence[Source], feature_cols: List[str], scaled_columns: List[str], workers: int = 0,
+               chunk: int = 2048, k: int = 400) -> Dict[str, Any]:
+    """Streaming RobustScaler fit: median and IQR per scaled column from KLL sketches (NaN ignored)."""
+    idx = [feature_cols.index(c) for c in scaled_columns]
+    sketches = [KLLSketch(k, seed=j) for j in range(len(idx))]
+    loader = DataLoader(RowStream(sources, feature_cols, chunk), batch_size=None, num_workers=workers,
+                        worker_init_fn=_worker_init)
+    rows, t0 = 0, time.perf_counter()
+    for X in loader:
+        X = X.numpy()
+        for sk, j in zip(sketches, idx):
+            sk.update(X[:, j])
+        rows += X.shape[0]
+    q = np.array([sk.quantiles([0.25, 0.5, 0.75]) for sk in sketches])      # (n_scaled, 3)
+    center = np.nan_to_num(q[:, 1])             # a column that was never observed: 0 / 1
+    scale = q[:, 2] - q[:, 0]
+    scale[~(scale > 0)] = 1.0                   # constant column: sklearn's _handle_zeros_in_scale
+    return {"center": center, "scale": scale, "rows": rows, "seconds": time.perf_counter() - t0}
+
+
+def collect_windows(stream: WindowStream, sources: Sequence[Source], n: int) -> np.ndarray:
+    """First n windows of the sources, in order (validation set; n bounds its memory)."""
+    parts, have = [], 0
+    for w in stream.windows(sources):
+        parts.append(np.array(w[:n - have]))
+        have += parts[-1].shape[0]
+        if have >= n:
+            break
+    if not parts:
+        raise ValueError("validation sources produced no full window")
+    return np.concatenate(parts)
+
+
+def evaluate(model: torch.nn.Module, windows: np.ndarray, batch_size: int = 512) -> float:
+    model.eval()
+    total = 0.0
+    with torch.no_grad():
+        for i in range(0, windows.shape[0], batch_size):
+            x = torch.from_numpy(windows[i:i + batch_size])
+            total += float(F.mse_loss(model(x), x, reduction="sum"))
+    return total / windows.size
+
+
+def train(model: torch.nn.Module, stream: WindowStream, val: np.ndarray, epochs: int, lr: float = 1e-3,
+          workers: int = 0, clip: float = 1.0) -> Dict[str, Any]:
+    """Adam on the reconstruction MSE; returns the state of the epoch with the lowest validation loss."""
+    opt = torch.optim.Adam(model.parameters(), lr=lr)
+    best, best_state, history = float("inf"), None, []
+    for epoch in range(epochs):
+        stream.epoch = epoch
+        loader = DataLoader(stream, batch_size=None, num_workers=workers, worker_init_fn=_worker_init)
+        model.train()
+        n, loss_sum, wait = 0, 0.0, 0.0
+        t0 = t_wait = time.perf_counter()
+        for x in loader:
+            wait += time.perf_counter() - t_wait
+            opt.zero_grad(set_to_none=True)
+            loss = F.mse_loss(model(x), x)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), clip)
+            opt.step()
+            n += x.shape[0]
+            loss_sum += loss.item() * x.shape[0]
+            t_wait = time.perf_counter()
+        dt = time.perf_counter() - t0
+        val_loss = evaluate(model, val)
+        history.append({"epoch": epoch + 1, "windows": n, "seconds": round(dt, 2),
+                        "windows_per_s": round(n / max(dt, 1e-9), 1), "data_wait": round(wait / max(dt, 1e-9), 3),
+                        "train_loss": loss_sum / max(n, 1), "val_loss": val_loss})
+        h = history[-1]
+        print(f"epoch {h['epoch']}: {n} windows in {dt:.1f}s = {h['windows_per_s']:.0f} windows/s "
+              f"({h['windows_per_s'] * stream.window_stride:.0f} rows/s, data wait {h['data_wait']:.0%}) | "
+              f"train {h['train_loss']:.4f} val {val_loss:.4f}")
+        if val_loss < best:
+            best, best_state = val_loss, copy.deepcopy(model.state_dict())
+    return {"state": best_state, "val_loss": best, "history": history}
+
+
+def write_version(root: str, name: str, cfg: Dict[str, Any], state: Dict[str, torch.Tensor], center: np.ndarray,
+                  scale: np.ndarray, val: np.ndarray, threshold_quantile: float, force: bool = False) -> str:
+    """Write + load-check artifacts/versions/<name>/. The folder appears complete or not at all."""
+    tmp = staging_dir(root, name)
+    torch.save(state, os.path.join(tmp, "lstm_ae_best.pth"))
+    np.savez(os.path.join(tmp, NPZ), center=center, scale=scale, columns=np.array(cfg["scaled_columns"], dtype=str))
+    with open(os.path.join(tmp, "config.json"), "w") as f:
+        json.dump(cfg, f, indent=4)
+
+    ev = LSTMAE_Evaluator(artifacts_dir=tmp, device="cpu")         # exactly how the server will load it
+    scores, _, _ = ev.score_windows(val, explain=False)
+    cfg["threshold"] = float(np.quantile(scores, threshold_quantile))
+    cfg["training"]["val_scores"] = {f"q{q:g}": float(np.quantile(scores, q)) for q in (0.5, 0.9, 0.99, 0.999)}
+    with open(os.path.join(tmp, "config.json"), "w") as f:
+        json.dump(cfg, f, indent=4)
+
+    return publish_version(root, name, tmp, force)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Train LSTMAutoencoder from streamed windows into a model version")
+    ap.add_argument("name", help="versi baru: artifacts/versions/<name>/")
+    ap.add_argument("--root", default="artifacts", help="folder artifacts (lib/versions.py)")
+    ap.add_argument("--base", default=None, help="config.json sumber kontrak fitur (default: --root)")
+    ap.add_argument("--init", default=None, help="folder artifacts yang bobotnya dipakai sebagai titik awal")
+    ap.add_argument("--sim-seeds", default=None, help='simulator per seed, mis. "0-15" (default bila tanpa --recording)')
+    ap.add_argument("--sim-ticks", type=int, default=5000, help="baris per seed simulator")
+    ap.add_argument("--recording", nargs="*", default=[], help="rekaman training (.csv / .parquet / .npz)")
+    ap.add_argument("--mapping", default=None, help="file JSON pemetaan kolom rekaman (lib/replay.py)")
+    ap.add_argument("--val-seeds", default="100000", help="seed simulator untuk validasi")
+    ap.add_argument("--val-recording", nargs="*", default=[], help="rekaman validasi (menggantikan --val-seeds)")
+    ap.add_argument("--val-windows", type=int, default=2048)
+    ap.add_argument("--seq-len", type=int, default=None)
+    ap.add_argument("--window-stride", type=int, default=5, help="jarak (baris) antar window training")
+    ap.add_argument("--epochs", type=int, default=3)
+    ap.add_argument("--batch-size", type=int, default=128)
+    ap.add_argument("--lr", type=float, default=1e-3)
+    ap.add_argument("--max-windows", type=int, default=None, help="batas window per epoch")
+    ap.add_argument("--shuffle-buffer", type=int, default=4096, help="window di buffer acak per worker")
+    ap.add_argument("--chunk", type=int, default=2048, help="baris per chunk sumber")
+    ap.add_argument("--workers", type=int, default=0, help="worker DataLoader (0 = proses utama)")
+    ap.add_argument("--threads", type=int, default=None, help="torch.set_num_threads untuk langkah training")
+    ap.add_argument("--sketch-k", type=int, default=400, help="ukuran sketch KLL untuk fit scaler")
+    ap.add_argument("--threshold-quantile", type=float, default=0.995)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--force", action="store_true", help="timpa versi yang sudah ada")
+    args = ap.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+    if args.name == BASE or (os.path.exists(version_dir(args.root, args.name)) and not args.force):
+        raise SystemExit(f"version {args.name!r} is {BASE} or exists; pick another name or --force")
+    with open(os.path.join(args.base or args.root, "config.json")) as f:
+        cfg = json.load(f)
+    feature_cols = cfg["feature_cols"]
+    scaled_columns = cfg.get("scaled_columns", [c for c in feature_cols if not c.endswith("_online")])
+    seq_len = args.seq_len or int(cfg["seq_len"])
+    mapping = None
+    if args.mapping:
+        from lib.replay import load_mapping
+        mapping = load_mapping(args.mapping)
+
+    sim_seeds = parse_seeds(args.sim_seeds) if args.sim_seeds else ([] if args.recording else parse_seeds("0-7"))
+    sources: List[Source] = [("sim", s, args.sim_ticks) for s in sim_seeds]
+    sources += [("file", p, mapping) for p in args.recording]
+    val_sources: List[Source] = [("file", p, mapping) for p in args.val_recording] or \
+        [("sim", s, seq_len + args.val_windows * args.window_stride) for s in parse_seeds(args.val_seeds)]
+    if set(sim_seeds) & {s[1] for s in val_sources if s[0] == "sim"}:
+        raise SystemExit("--val-seeds overlaps --sim-seeds")
+    print(f"{len(sources)} training source(s), {len(val_sources)} validation source(s), "
+          f"{len(feature_cols)} features, seq_len {seq_len}, torch threads {torch.get_num_threads()}, "
+          f"workers {args.workers}")
+
+    sc = fit_scaler(sources, feature_cols, scaled_columns, args.workers, args.chunk, args.sketch_k)
+    print(f"scaler: {sc['rows']} rows in {sc['seconds']:.1f}s = {sc['rows'] / max(sc['seconds'], 1e-9):.0f} rows/s")
+
+    scale_idx = np.array([feature_cols.index(c) for c in scaled_columns], dtype=int)
+    stream = WindowStream(sources, feature_cols, scale_idx, sc["center"], sc["scale"], seq_len, args.batch_size,
+                          args.window_stride, args.shuffle_buffer, args.chunk, args.seed, args.max_windows)
+    val = collect_windows(stream, val_sources, args.val_windows)
+
+    model = LSTMAutoencoder(input_dim=len(feature_cols))
+    if args.init:
+        model.load_state_dict(torch.load(os.path.join(args.init, "lstm_ae_best.pth"), map_location="cpu"))
+    print(f"validation: {val.shape[0]} windows, loss before training {evaluate(model, val):.4f}")
+    t0 = time.perf_counter()
+    out = train(model, stream, val, args.epochs, args.lr, args.workers)
+    dt = time.perf_counter() - t0
+    n = sum(h["windows"] for h in out["history"])
+    print(f"training: {n} windows in {dt:.1f}s = {n / max(dt, 1e-9):.0f} windows/s overall, "
+          f"best val loss {out['val_loss']:.4f}")
+
+    new_cfg = {**cfg, "feature_cols": feature_cols, "scaled_columns": scaled_columns, "seq_len": seq_len,
+               "threshold": cfg.get("threshold"),
+               "training": {"created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                            "base": args.base or args.root, "init": args.init,
+                            "sources": [f"{k}:{a}" for k, a, _ in sources],
+                            "validation": [f"{k}:{a}" for k, a, _ in val_sources],
+                            "scaler_rows": sc["rows"], "window_stride": args.window_stride,
+                            "batch_size": args.batch_size, "lr": args.lr, "epochs": out["history"],
+                            "threshold_quantile": args.threshold_quantile}}
+    path = write_version(args.root, args.name, new_cfg, out["state"], sc["center"], sc["scale"], val,
+                         args.threshold_quantile, args.force)
+    print(f"wrote {path} (threshold {new_cfg['threshold']:.4f} = q{args.threshold_quantile:g} of validation scores)")
+    print(f"aktifkan: POST /admin/model/activate {{\"version\": \"{args.name}\"}} atau tulis nama ke "
+          f"{os.path.join(args.root, 'ACTIVE')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Versioned model artifacts, hot swap without a restart and shadow scoring of a candidate.
+
+    artifacts/                        version "base" (config.json, lstm_ae_best.pth, scaler.npz / scaler.pkl)
+    artifacts/versions/<name>/        one complete artifact set per version (copy the unchanged files too)
+    artifacts/ACTIVE                  name of the version loaded at startup (missing = "base")
+
+    cand, report = load_candidate("artifacts", "v2", active=pred, probe=pred.ring.view())
+    worker.swap(cand)                 # lib/inference.py: applied between two samples, window carried over
+    set_active("artifacts", "v2")
+
+load_candidate() builds and validates the candidate (same feature_cols / scaled_columns, finite score on the
+current window) and is blocking: run it off the event loop. The owner of the windows applies the swap between
+samples, so no tick ever sees half of each model. Windows are carried over with carry_rows(): unchanged when
+the scaler is the same, otherwise un-scaled with the old scaler and re-scaled with the new one (exact except
+for values the old scaler clipped at +-8; imputed values move to the new center).
+
+Shadow: the candidate scores the same windows right after the primary forward, on the same thread. Its scores
+only go to ShadowStats (metrics + optional CSV log); results, frames and alarms come from the primary alone.
+"""
+import os, re, shutil, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from lib.metrics import Registry
+
+BASE = "base"
+ACTIVE_FILE = "ACTIVE"
+_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def version_dir(root: str, name: str) -> str:
+    """Artifact folder of a version. Raises ValueError on a name that is not a plain folder name."""
+    if name == BASE:
+        return root
+    if not _NAME.match(name) or name in (".", ".."):
+        raise ValueError(f"invalid model version {name!r}")
+    return os.path.join(root, "versions", name)
+
+
+def list_versions(root: str) -> List[str]:
+    """"base" + every folder under versions/ that has a config.json."""
+    vdir = os.path.join(root, "versions")
+    names = sorted(n for n in os.listdir(vdir) if os.path.exists(os.path.join(vdir, n, "config.json"))) \
+        if os.path.isdir(vdir) else []
+    return [BASE] + [n for n in names if _NAME.match(n)]
+
+
+def active_version(root: str) -> str:
+    """Version named in ACTIVE; "base" when there is no ACTIVE or it names a version that is gone."""
+    try:
+        with open(os.path.join(root, ACTIVE_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return BASE
+    try:
+        if name and os.path.exists(os.path.join(version_dir(root, name), "config.json")):
+            return name
+    except ValueError:
+        pass
+    print(f"[versions] {ACTIVE_FILE} names unknown version {name!r}, using {BASE}")
+    return BASE
+
+
+def set_active(root: str, name: str) -> None:
+    version_dir(root, name)                     # validates the name
+    path = os.path.join(root, ACTIVE_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def staging_dir(root: str, name: str) -> str:
+    """
+    Empty folder to build version `name` in (lib/train.py, lib/calibrate.py). It sits outside versions/, so
+    list_versions() never sees a half-written version; publish_version() moves it into place.
+    """
+    version_dir(root, name)
+    if name == BASE:
+        raise ValueError(f"{BASE!r} is the hand-managed artifacts folder; pick a version name")
+    path = os.path.join(root, f".stage-{name}.tmp")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def publish_version(root: str, name: str, staged: str, force: bool = False) -> str:
+    """Rename a staged folder to versions/<name>. Replacing an existing version needs force (never the active one)."""
+    final = version_dir(root, name)
+    if os.path.exists(final):
+        if not force:
+            raise ValueError(f"version {name!r} exists ({final}); use force to replace it")
+        if name == active_version(root):
+            raise ValueError(f"version {name!r} is active; activate another version before replacing it")
+        shutil.rmtree(final)
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    os.replace(staged, final)
+    return final
+
+
+# ---------- windows across scalers ----------
+def same_scaling(a, b) -> bool:
+    """True when two evaluators put raw rows into the same scaled space (windows can be shared as-is)."""
+    if a.feature_cols != b.feature_cols or not np.array_equal(a.scale_idx, b.scale_idx):
+        return False
+    if a._center is None or b._center is None:
+        return a.scaler is b.scaler
+    return np.array_equal(a._center, b._center) and np.array_equal(a._scale, b._scale)
+
+
+def carry_rows(rows: np.ndarray, old, new) -> np.ndarray:
+    """(..., D) rows scaled by evaluator `old` -> a copy scaled by evaluator `new`."""
+    out = np.array(rows, dtype=np.float32, copy=True)
+    if same_scaling(old, new):
+        return out
+    if old._center is None:
+        raise ValueError(f"{type(old.scaler).__name__} is not affine: windows cannot be carried to a new scaler")
+    flat = out.reshape(-1, out.shape[-1])
+    sub = flat[:, old.scale_idx].astype(np.float64)
+    raw = sub * old._scale + old._center
+    raw[sub == 0.0] = np.nan                    # imputed (old center): let the new scaler impute its own center
+    flat[:, old.scale_idx] = raw.astype(np.float32)
+    new._impute_scale_rows(flat)
+    return out
+
+
+# ---------- candidate ----------
+def validate(candidate, active, probe: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Raises ValueError when `candidate` cannot replace or shadow `active`: other feature_cols / scaled_columns,
+    or a non-finite / insane score on the probe window (active's last rows; zeros when there is no full window).
+    Returns {"probe", "score", "active_score", "threshold"}.
+    """
+    if candidate.feature_cols != active.feature_cols:
+        raise ValueError("feature_cols differ from the active model")
+    if list(candidate.scaled_columns) != list(active.scaled_columns):
+        raise ValueError("scaled_columns differ from the active model")
+    L = candidate.seq_len
+    if probe is not None and len(probe) >= L:
+        window, kind = carry_rows(probe[-L:], active, candidate), "window"
+    else:
+        window, kind = np.zeros((L, candidate.n_features), np.float32), "zeros"
+    if candidate._sanity_failures(window[None])[0]:
+        raise ValueError("scaling sanity fails on the current window with the candidate scaler")
+    score = float(candidate.score_windows(window[None], explain=False)[0][0])
+    if not np.isfinite(score):
+        raise ValueError(f"candidate score on the {kind} probe is not finite")
+    report = {"probe": kind, "score": score, "active_score": None, "threshold": candidate.threshold}
+    if kind == "window" and active.seq_len == L:
+        report["active_score"] = float(active.score_windows(np.ascontiguousarray(probe[-L:])[None],
+                                                            explain=False)[0][0])
+    return report
+
+
+def load_candidate(root: str, name: str, active, probe: Optional[np.ndarray] = None) -> Tuple[Any, Dict[str, Any]]:
+    """Build + validate version `name` with the active evaluator's settings. Blocking (torch, file I/O)."""
+    from lib.pred import LSTMAE_Evaluator      # torch: the active evaluator has loaded it already
+    path = version_dir(root, name)
+    if not os.path.exists(os.path.join(path, "config.json")):
+        raise ValueError(f"unknown model version {name!r}")
+    cand = LSTMAE_Evaluator(artifacts_dir=path, device=active.device, topk=active.topk,    # own prob_alpha
+                            prefilter=False if active.prefilter is None else active.prefilter.settings)
+    cand.version = name
+    report = validate(cand, active, probe)
+    report["version"] = name
+    return cand, report
+
+
+# ---------- shadow comparison ----------
+class ShadowStats:
+    """
+    Primary vs shadow scores on the same windows. Thread-safe; observe() is called from whichever thread
+    scored (inference thread for the simulator, ingest threads for the fleet).
+    A disagreement is a window one model puts over its threshold and the other does not.
+    """
+
+    def __init__(self, version: str, primary_threshold: float, shadow_threshold: float,
+                 registry: Optional[Registry] = None, log_path: Optional[str] = None):
+        self.version = version
+        self.primary_threshold = float(primary_threshold)
+        self.shadow_threshold = float(shadow_threshold)
+        self.started = time.time()
+        self.n = 0
+        self.sum_abs = 0.0
+        self.max_abs = 0.0
+        self.disagreements = 0
+        self._lock = threading.Lock()
+        self.log_path = log_path
+        self._log = None
+        if log_path:
+            os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+            new = not os.path.exists(log_path)
+            self._log = open(log_path, "a", buffering=1 << 16)
+            if new:
+                self._log.write("ts,source,primary,shadow\n")
+
+        self._m_scored = self._m_disagree = self._m_diff = None
+        if registry is not None:    # shared across shadow runs: a second registration would raise
+            self._m_scored = registry.get("shadow_scored_total") or registry.counter(
+                "shadow_scored_total", "Windows scored by the shadow model", labels=("version",))
+            self._m_disagree = registry.get("shadow_disagreements_total") or registry.counter(
+                "shadow_disagreements_total", "Windows where primary and shadow disagree on the threshold",
+                labels=("version",))
+            self._m_diff = registry.get("shadow_score_abs_diff") or registry.histogram(
+                "shadow_score_abs_diff", "|shadow score - primary score| per window", labels=("version",))
+
+    def observe(self, source: str, primary, shadow, ts: Optional[float] = None) -> None:
+        """primary, shadow: scores of the same windows (scalars or (n,) arrays; NaN pairs are skipped)."""
+        p = np.atleast_1d(np.asarray(primary, dtype=np.float64))
+        s = np.atleast_1d(np.asarray(shadow, dtype=np.float64))
+        ok = np.isfinite(p) & np.isfinite(s)
+        if not ok.any():
+            return
+        p, s = p[ok], s[ok]
+        diff = np.abs(s - p)
+        disagree = int(((p >= self.primary_threshold) != (s >= self.shadow_threshold)).sum())
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self.n += p.size
+            self.sum_abs += float(diff.sum())
+            self.max_abs = max(self.max_abs, float(diff.max()))
+            self.disagreements += disagree
+            if self._log is not None:
+                self._log.writelines(f"{ts:.3f},{source},{a:.6g},{b:.6g}\n" for a, b in zip(p.tolist(), s.tolist()))
+        if self._m_scored is not None:
+            self._m_scored.inc(p.size, self.version)
+            if disagree:
+                self._m_disagree.inc(disagree, self.version)
+            for d in diff.tolist():
+                self._m_diff.observe(d, self.version)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"version": self.version, "since": self.started, "windows": self.n,
+                    "mean_abs_diff": self.sum_abs / self.n if self.n else None,
+                    "max_abs_diff": self.max_abs if self.n else None,
+                    "disagreements": self.disagreements,
+                    "primary_threshold": self.primary_threshold, "shadow_threshold": self.shadow_threshold,
+                    "log": self.log_path}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
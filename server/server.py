@@ -1,20 +1,171 @@
 # server.py
-import asyncio, socketio, uvicorn, numpy as np
-from fastapi import FastAPI
+import time
+T_START = time.perf_counter()       # acuan startup_seconds (waktu sejak import modul ini)
 
-from lib.pred import LSTMAE_Evaluator
+import asyncio, atexit, collections, contextvars, json, os, socketio, numpy as np
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+# torch / model / pandas tidak di-import di sini: server sudah listen selagi model dimuat di thread
+# (load_sim_evaluator), pandas hanya untuk replay. Lihat bench/startup.py.
+if TYPE_CHECKING:
+    from lib.pred import LSTMAE_Evaluator
 from lib.generator1 import SimpleShipSim, row_to_nested_json
+from lib.metrics import Registry, CONTENT_TYPE
+from lib.inference import InferenceWorker, monitor_loop_lag
+from lib.scheduler import TickScheduler, unpaced
+from lib.frames import FrameEncoder
+from lib.ingest import IngestService, BatchTooLarge
+from lib.store import TimeSeriesStore, StoreWriter, valid_vessel_id
+from lib.schema import doc_epoch
+from lib.history import RecentRing, query_history
+from lib.snapshot import copy_windows, load_windows, save_windows, window_fingerprint
+from lib.stats import export_metrics
+from lib.versions import ShadowStats, active_version, list_versions, load_candidate, set_active, version_dir
 
 # ---------- Socket.IO (ASGI) ----------
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
-app = FastAPI()
-app.mount("/", socketio.ASGIApp(sio))
+# Socket.IO menangani /socket.io/, request lain diteruskan ke FastAPI (dulu app.mount("/") menutupi semua route).
+class SizedJSON:
+    """
+    Modul json paket Socket.IO yang mencatat panjang hasil encode terakhir (per task asyncio, jadi emit dari
+    coroutine lain tidak menimpanya): metrik byte tanpa encode ulang.
+    """
+    last = contextvars.ContextVar("sio_encoded_len", default=0)
+    loads = staticmethod(json.loads)
+
+    @classmethod
+    def dumps(cls, *args, **kwargs) -> str:
+        out = json.dumps(*args, **kwargs)
+        cls.last.set(len(out))
+        return out
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', json=SizedJSON)
+
+def room_size(room: str, skip=()) -> int:
+    """Client di room (server ini saja), tanpa sid di skip."""
+    return sum(1 for sid, _ in sio.manager.get_participants("/", room) if sid not in skip)
+
+@asynccontextmanager
+async def lifespan(_app):
+    """
+    Evaluator + produce_loop hidup sepanjang proses (bukan per client); window dipulihkan dari snapshot.
+    Model dimuat di dalam produce_loop (thread), jadi startup tidak menunggu torch dan server langsung listen.
+    """
+    global producer_task, lag_task, snapshot_task
+    producer_task = asyncio.create_task(produce_loop())
+    lag_task = asyncio.create_task(monitor_loop_lag(LOOP_LAG))
+    snapshot_task = asyncio.create_task(snapshot_loop()) if STATE_DIR else None
+    print("Producer loop started.")
+    try:
+        yield
+    finally:
+        tasks = [t for t in (producer_task, lag_task, snapshot_task) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)   # produce_loop menyimpan snapshot terakhir
+        await save_fleet_snapshot()
+        if shadow_stats is not None:
+            shadow_stats.close()
+        if store_writer is not None:
+            await asyncio.to_thread(store_writer.close)
+
+app = FastAPI(lifespan=lifespan)
+asgi_app = socketio.ASGIApp(sio, other_asgi_app=app)
+
+# ---------- Metrics (GET /metrics, format teks Prometheus) ----------
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram("telemetry_stage_seconds", "Per-tick stage latency in seconds", labels=("stage",))
+TICKS = metrics.counter("telemetry_ticks_total", "Telemetry ticks produced")
+SCORES = metrics.counter("telemetry_scores_total", "Scored ticks per engine (lstm = model ran, prefilter / stride = "
+                         "last score kept)", labels=("engine",))
+ERRORS = metrics.counter("telemetry_errors_total", "Ticks that failed and emitted telemetry_error")
+EMITTED_BYTES = metrics.counter("telemetry_emit_bytes_total", "Bytes of telemetry sent to clients per format "
+                                "(payload size x recipients)", labels=("format",))
+CLIENTS = metrics.gauge("socketio_connected_clients", "Connected Socket.IO clients")
+LOOP_LAG = metrics.histogram("event_loop_lag_seconds", "How late a 100 ms asyncio sleep wakes up")
+STARTUP = metrics.gauge("startup_seconds", "Seconds from server module import to each startup phase",
+                        labels=("phase",))
+
+# Inference jalan di thread sendiri (lib/inference.py); event loop hanya generate + emit.
+TORCH_THREADS = int(os.environ.get("TORCH_NUM_THREADS", "0")) or None    # None = default torch
+INFERENCE_QUEUE = int(os.environ.get("INFERENCE_QUEUE", "8"))             # drop-oldest bila penuh
+# Pre-filter statistik (lib/prefilter.py) di depan LSTM: model hanya jalan bila ada yang janggal, skor dekat
+# threshold / naik, atau tiap background_stride sampel; di antaranya alarm memakai skor terakhir. Default ikut
+# config.json ("prefilter", tidak ada = nonaktif). Aktifkan hanya bila `python -m bench.prefilter` pada data kapal
+# itu lolos (hemat CPU bersih >= --min-saving, tanpa deteksi terlambat). PREFILTER=1 paksa aktif, 0 paksa mati.
+PREFILTER = os.environ.get("PREFILTER", "")
+
+# Tick berbasis deadline (lib/scheduler.py): rate boleh < 1 s, policy overrun skip | catchup | degrade.
+TICK_RATE_HZ = float(os.environ.get("TICK_RATE_HZ", "1.0"))
+TICK_POLICY = os.environ.get("TICK_POLICY", "degrade")
+
+# Format ke client (lib/frames.py): default frame biner (schema sekali, lalu key/delta per tick).
+# Client lama bisa opt-in JSON penuh dengan query ?format=json. Room "frames" / "json".
+KEYFRAME_EVERY = int(os.environ.get("KEYFRAME_EVERY", "30"))
+need_keyframe = set()      # sid yang butuh schema + keyframe (baru connect / minta resync)
+
+# Penyimpanan time-series (lib/store.py): fitur mentah + skor per tick, ditulis thread background.
+# STORE_DIR kosong = nonaktif. Data mentah STORE_RAW_DAYS hari, rollup per menit STORE_ROLLUP_DAYS hari.
+STORE_DIR = os.environ.get("STORE_DIR", "data/store")
+STORE_RAW_DAYS = float(os.environ.get("STORE_RAW_DAYS", "7"))
+STORE_ROLLUP_DAYS = float(os.environ.get("STORE_ROLLUP_DAYS", "365"))
+# Replay (lib/replay.py): REPLAY_FILE = rekaman (skema model atau ship_sensor_data.csv lama) menggantikan
+# SimpleShipSim lewat jalur yang sama. REPLAY_SPEED 1 | N | max, REPLAY_MAPPING = file JSON pemetaan kolom
+# (default: deteksi otomatis), REPLAY_LOOP=0 berhenti di akhir rekaman. Sampel/s + biaya per stage dicetak
+# tiap REPLAY_REPORT_SEC detik dan di akhir.
+REPLAY_FILE = os.environ.get("REPLAY_FILE", "")
+REPLAY_SPEED = os.environ.get("REPLAY_SPEED", "1")
+REPLAY_MAPPING = os.environ.get("REPLAY_MAPPING", "")
+REPLAY_LOOP = os.environ.get("REPLAY_LOOP", "1") != "0"
+REPLAY_REPORT_SEC = float(os.environ.get("REPLAY_REPORT_SEC", "10"))
+
+SIM_VESSEL = "replay" if REPLAY_FILE else "sim"
+store_writer = None
+
+# Riwayat (lib/history.py): GET /history untuk rentang bebas (downsample di server), dan HISTORY_RECENT_MIN
+# menit terakhir dari ring di memori yang dikirim sekali saat connect (event "history").
+HISTORY_RECENT_MIN = float(os.environ.get("HISTORY_RECENT_MIN", "10"))
+recent_ring = None
+
+# Ingest dari kapal (lib/ingest.py): evaluator fleet terpisah dari simulator, dibuat saat request pertama.
+ingest_service = None
+ingest_lock = asyncio.Lock()
+
+# Snapshot window (lib/snapshot.py) ke STATE_DIR tiap SNAPSHOT_INTERVAL detik dan saat shutdown; dipulihkan
+# saat start bila umurnya <= SNAPSHOT_MAX_AGE detik dan model/scaler sama. STATE_DIR kosong = nonaktif.
+STATE_DIR = os.environ.get("STATE_DIR", "data/state")
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", "30"))
+SNAPSHOT_MAX_AGE = float(os.environ.get("SNAPSHOT_MAX_AGE", "600"))
+
+# Versi model (lib/versions.py): artifacts/ = "base", artifacts/versions/<nama>/ = versi lain, artifacts/ACTIVE =
+# versi yang dimuat saat start. POST /admin/model/activate menukar model tanpa restart (window dibawa),
+# POST /admin/model/shadow menjalankan kandidat berdampingan: skornya hanya ke metrik shadow_* dan CSV di
+# SHADOW_LOG_DIR, tidak pernah ke client / alarm. ADMIN_TOKEN diisi = header X-Admin-Token wajib.
+ARTIFACTS = "artifacts"
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+SHADOW_LOG_DIR = os.environ.get("SHADOW_LOG_DIR", "data/shadow")
+inference_worker = None
+shadow_stats = None
+
+# Drift fitur (lib/stats.py): statistik berjalan per fitur (O(D) per sampel) dibandingkan dengan center/scale
+# scaler. Tiap DRIFT_INTERVAL detik laporan dikirim ke semua client (event "drift"), ke metrik feature_* dan
+# GET /drift. DRIFT_INTERVAL=0 = nonaktif.
+DRIFT_INTERVAL = float(os.environ.get("DRIFT_INTERVAL", "10"))
+drift_report = None
+model_lock = asyncio.Lock()
 
 clients = set()
 producer_task = None
+lag_task = None
+snapshot_task = None
 
 
 # ---------- Helper: flatten nested JSON -> dict flat sesuai feature_cols ----------
+# Jalur dict lama (dipakai generate-test.py / kode luar). produce_loop memakai pred.schema
+# (lib/schema.py): nested JSON -> vektor float32 dalam satu pass.
 def flatten_nested_for_model(doc: dict, feature_cols: list[str]) -> dict:
     """
     Mengambil JSON bertingkat dari generator dan mengubahnya menjadi dict flat
@@ -78,7 +229,7 @@ def flatten_nested_for_model(doc: dict, feature_cols: list[str]) -> dict:
 
     return row
 
-def data_check(flat_dict:dict, nested:dict, model:LSTMAE_Evaluator):
+def data_check(flat_dict:dict, nested:dict, model:"LSTMAE_Evaluator"):
     MODE_MAP = {"startup": 1.0, "stable": 2.0, "high_load": 3.0, "bad_env": 4.0}
     if "mode_code" in model.feature_cols:
         m = nested.get("mode") or flat_dict.get("mode")
@@ -103,70 +254,487 @@ def data_check(flat_dict:dict, nested:dict, model:LSTMAE_Evaluator):
 
     return flat_dict
 
-async def produce_loop():
-    """Generate (nested) -> flatten -> predict -> emit setiap 1s."""
-    pred = LSTMAE_Evaluator(artifacts_dir="artifacts", prob_alpha=0.25, topk=5)
-    data_generator = SimpleShipSim(seed=346)
+def make_sample(pred: "LSTMAE_Evaluator", data_generator: SimpleShipSim):
+    """generate (nested) -> vektor (urutan feature_cols, termasuk mode_code). Return (nested, vec)."""
+    t0 = time.perf_counter()
+    data = data_generator.step()
+    t1 = time.perf_counter()
+    nested = row_to_nested_json(data)
+    # nested = maybe_anomaly(nested)  # boleh dilepas jika tak ingin injeksi anomaly random
+    vec = pred.schema.to_vector(nested)              # (D,) float32
+    STAGE_SECONDS.observe(t1 - t0, "generate")
+    STAGE_SECONDS.observe(time.perf_counter() - t1, "flatten")
+    return nested, vec
 
-    t = 0
+def state_path(name: str) -> str:
+    return os.path.join(STATE_DIR, f"{name}.npz")
+
+def load_sim_evaluator() -> "LSTMAE_Evaluator":
+    """Import torch + evaluator (model dari registry proses, scaler.npz) + pulihkan window. Blocking."""
+    from lib.pred import LSTMAE_Evaluator
+    version = active_version(ARTIFACTS)
+    pred = LSTMAE_Evaluator(artifacts_dir=version_dir(ARTIFACTS, version), topk=5,
+                            prefilter=None if PREFILTER == "" else PREFILTER != "0")
+    pred.version = version
+    print("Model versi", version)
+    restore_sim_window(pred)
+    STARTUP.set(time.perf_counter() - T_START, "model_loaded")
+    return pred
+
+def restore_sim_window(pred: "LSTMAE_Evaluator") -> None:
+    if not STATE_DIR:
+        return
+    rows = load_windows(state_path(SIM_VESSEL), window_fingerprint(pred), SNAPSHOT_MAX_AGE).get(SIM_VESSEL)
+    if rows is not None:
+        pred.ring.extend(rows)
+        print(f"Window {SIM_VESSEL} dipulihkan dari snapshot: {len(pred.ring)}/{pred.seq_len} baris")
+
+async def save_snapshot(name: str, windows: dict, fingerprint: str) -> None:
     try:
-        while True:
-            data = data_generator.step()
-            nested = row_to_nested_json(data)
-            # nested = maybe_anomaly(nested)  # boleh dilepas jika tak ingin injeksi anomaly random
-
-            # flatten sesuai feature_cols yang dipakai model
-            flat_dict = flatten_nested_for_model(nested, pred.feature_cols)
-            # --- Map 'mode' -> 'mode_code' jika model memakainya ---
-            
-            eval_data = data_check(flat_dict, nested, pred)
-
-            # --- Vectorize (urutan sesuai feature_cols) dan evaluasi ---
+        await asyncio.to_thread(save_windows, state_path(name), windows, fingerprint)
+    except OSError as e:
+        print(f"snapshot {name} gagal:", e)
+
+async def save_fleet_snapshot() -> None:
+    if STATE_DIR and ingest_service is not None:
+        windows = await asyncio.to_thread(ingest_service.copy_windows)
+        await save_snapshot("fleet", windows, window_fingerprint(ingest_service.fleet.core))
+
+async def snapshot_loop():
+    """Window fleet (ingest) disimpan berkala; window simulator disimpan oleh produce_loop sendiri."""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        await save_fleet_snapshot()
+
+async def produce_loop(pred: "LSTMAE_Evaluator | None" = None):
+    """
+    Generate (nested) -> flatten -> antre ke thread inference, satu kali per tick (TICK_RATE_HZ). Producer tidak
+    menunggu forward pass: hasil diproses consume_loop (store, ring, encode, emit) sesuai urutan tick. Bila
+    scoring lebih lambat dari tick, antrean InferenceWorker (INFERENCE_QUEUE, drop-oldest) yang menahan beban.
+    Replay REPLAY_SPEED=max tidak boleh membuang sampel: producer menunggu bila antrean hampir penuh.
+    """
+    global inference_worker
+    if pred is None:
+        pred = await asyncio.to_thread(load_sim_evaluator)
+    worker = inference_worker = InferenceWorker(pred, maxsize=INFERENCE_QUEUE, threads=TORCH_THREADS,
+                                                registry=metrics, stage_seconds=STAGE_SECONDS)
+    report = None
+    lossless = False
+    end_of_input = ()           # simulator tidak pernah habis
+    if REPLAY_FILE:
+        from lib.replay import ReplaySource, ReplayEnded, ThroughputReport, load_mapping, parse_speed
+        end_of_input = ReplayEnded
+        data_generator = ReplaySource(REPLAY_FILE, pred.feature_cols, loop=REPLAY_LOOP,
+                                      mapping=load_mapping(REPLAY_MAPPING) if REPLAY_MAPPING else None)
+        speed = parse_speed(REPLAY_SPEED)
+        lossless = speed == float("inf")
+        scheduler = unpaced() if lossless else \
+            TickScheduler(rate_hz=speed / data_generator.dt, policy=TICK_POLICY, registry=metrics)
+        report = ThroughputReport(STAGE_SECONDS)
+        print(f"Replay {REPLAY_FILE}: {len(data_generator)} sampel, dt {data_generator.dt:g}s, speed {REPLAY_SPEED}",
+              f"(kolom tidak ada -> 0.0: {data_generator.missing})" if data_generator.missing else "")
+    else:
+        # satu langkah simulator = satu deadline: timestamp sampel mengikuti jadwal tick, bukan 5 s per tick
+        data_generator = SimpleShipSim(seed=346, dt_seconds=1.0 / TICK_RATE_HZ)
+        scheduler = TickScheduler(rate_hz=TICK_RATE_HZ, policy=TICK_POLICY, registry=metrics)
+    writer = get_store_writer(pred.feature_cols)
+    # (nested, vec, future) per tick. Tidak dibatasi: future sampel yang di-drop worker langsung selesai,
+    # jadi antrean ini tidak lebih panjang dari antrean worker + sampel yang sedang di-encode / emit.
+    results: asyncio.Queue = asyncio.Queue()
+    consumer = asyncio.create_task(consume_loop(worker, results, writer, report is None))
+    pending: collections.deque = collections.deque()       # lossless: future yang belum selesai
+
+    n_samples = 0               # termasuk sampel terlewat (degrade) yang hanya masuk window
+    next_report = time.perf_counter() + REPLAY_REPORT_SEC
+    next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+    next_drift = time.monotonic() + DRIFT_INTERVAL
+    try:
+        async for tick in scheduler:
+            pred = worker.pred                  # bisa ditukar POST /admin/model/activate
             try:
-                # vec = pred.vectorize(flat_dict)         # (D,) float32
-                out = pred.push_sample_and_eval(eval_data)        # {ready, score, threshold, blackout_prob, consecutive_above, top_contributors}
+                if tick.missed and TICK_POLICY != "degrade" and not REPLAY_FILE:
+                    data_generator.advance(tick.missed)     # deadline terlewat: jam simulator tetap ikut maju
+                for _ in range(tick.missed if TICK_POLICY == "degrade" else 0):
+                    missed_doc, missed_vec = make_sample(pred, data_generator)
+                    worker.push(missed_vec)                             # sampel terlewat: masuk window saja
+                    n_samples += 1
+                    if writer is not None:
+                        writer.append(SIM_VESSEL, doc_epoch(missed_doc), missed_vec, np.nan, np.nan)
+                nested, vec = make_sample(pred, data_generator)
+                n_samples += 1
+                fut = worker.submit(vec)            # tidak ditunggu: hasilnya ke consume_loop
+                results.put_nowait((nested, vec, fut))
+                if lossless:
+                    pending.append(fut)
+                    if len(pending) >= worker.maxsize:     # antrean worker tidak pernah penuh -> tanpa drop
+                        await asyncio.wait([pending.popleft()])
+            except end_of_input:
+                break
             except Exception as e:
-                # kirim error ke client agar gampang di-debug
+                # kirim error ke client agar gampang di-debug, dan skip satu iterasi (jangan hard-crash loop)
+                ERRORS.inc()
                 await sio.emit("telemetry_error", {"error": str(e)})
-                # dan skip satu iterasi (jangan hard-crash loop)
-                await asyncio.sleep(1.0)
-                t += 1
                 continue
 
-            # --- Emit ke client: nested JSON + hasil prediksi ---
-            print(t+1)
-            payload = {
-                "data": nested,       # nested JSON asli
-                "prediction": out,    # hasil AE (tanpa is_anomaly), ada blackout_prob & top_contributors
-            }
-            await sio.emit("telemetry", payload)
-
-            await asyncio.sleep(1.0)
-            t += 1
+            if STATE_DIR and time.monotonic() >= next_snapshot:
+                # disalin di thread inference di antara dua sampel (window tidak sedang ditulis)
+                rows, fingerprint = await worker.call(
+                    lambda: (copy_windows({SIM_VESSEL: worker.pred.ring}), window_fingerprint(worker.pred)))
+                await save_snapshot(SIM_VESSEL, rows, fingerprint)
+                next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+            if DRIFT_INTERVAL > 0 and time.monotonic() >= next_drift:
+                await publish_drift(worker)
+                next_drift = time.monotonic() + DRIFT_INTERVAL
+            if report is not None and time.perf_counter() >= next_report:
+                print("[replay]", report.line(n_samples))
+                next_report = time.perf_counter() + REPLAY_REPORT_SEC
+        results.put_nowait(None)            # input habis: consumer menyelesaikan sisa hasil
+        await consumer
     except asyncio.CancelledError:
         pass
+    finally:
+        consumer.cancel()
+        inference_worker = None
+        worker.close()
+        pred = worker.pred
+        if STATE_DIR:           # thread inference sudah berhenti
+            try:
+                save_windows(state_path(SIM_VESSEL), copy_windows({SIM_VESSEL: pred.ring}), window_fingerprint(pred))
+            except OSError as e:
+                print(f"snapshot {SIM_VESSEL} gagal:", e)
+        if report is not None:
+            print("[replay]", report.total(n_samples))
+
+
+def record_tick(encoder: FrameEncoder, writer, ring: RecentRing, nested: dict, vec, out: dict) -> tuple[dict, bytes]:
+    """Hasil satu tick -> metrik, store (enqueue), ring riwayat. Return (payload JSON, frame biner) untuk emit_tick."""
+    TICKS.inc()
+    if out["ready"] and not out.get("dropped"):
+        SCORES.inc(1, out.get("engine") or "lstm")
+    payload = {"data": nested, "prediction": out}
+    frame = encoder.encode(vec, nested, out)
+    if writer is not None:                  # hanya enqueue; tulis ke disk di thread writer
+        fresh = out["ready"] and out["score"] is not None and not out.get("dropped")
+        writer.append(SIM_VESSEL, doc_epoch(nested), vec, out["score"] if fresh else np.nan,
+                      out["blackout_prob"] if fresh else np.nan)
+    ring.append(doc_epoch(nested), np.append(vec, [np.nan if out["score"] is None else out["score"],
+                                                   out["blackout_prob"]]))
+    return payload, frame
+
+async def emit_tick(encoder: FrameEncoder, payload: dict, frame: bytes, new_schema: bool) -> None:
+    """Frame ke room "frames" (schema + keyframe untuk client yang baru sync), JSON penuh ke room "json"."""
+    t0 = time.perf_counter()
+    syncing = list(need_keyframe); need_keyframe.clear()
+    if new_schema:                     # threshold baru; frame pertama encoder baru adalah keyframe
+        await sio.emit("frame_schema", encoder.schema(), room="frames", skip_sid=syncing or None)
+    await sio.emit("frame", frame, room="frames", skip_sid=syncing or None)
+    sent = len(frame) * room_size("frames", syncing)
+    for sid in syncing:
+        await sio.emit("frame_schema", encoder.schema(), to=sid)
+        sync = encoder.sync_frame()
+        await sio.emit("frame", sync, to=sid)
+        sent += len(sync)
+    EMITTED_BYTES.inc(sent, "frames")
+    n_json = room_size("json")
+    if n_json:                  # JSON penuh hanya di-encode bila ada client lama; sekali per tick
+        await sio.emit("telemetry", payload, room="json")
+        EMITTED_BYTES.inc(SizedJSON.last.get() * n_json, "json")
+    STAGE_SECONDS.observe(time.perf_counter() - t0, "emit")
+
+async def consume_loop(worker: InferenceWorker, results: asyncio.Queue, writer, verbose: bool) -> None:
+    """Hasil inference sesuai urutan tick -> record_tick (metrik, store, ring) -> emit_tick."""
+    pred = worker.pred
+    encoder = FrameEncoder(pred.feature_cols, pred.threshold, keyframe_every=KEYFRAME_EVERY)
+    ring = get_recent_ring(pred.feature_cols)
+    scored = False
+    t = 0
+    while True:
+        item = await results.get()
+        if item is None:
+            return
+        nested, vec, fut = item
+        await asyncio.wait([fut])               # event loop tetap bebas selama forward pass
+        if fut.cancelled():                     # worker ditutup: sampel ini tidak pernah di-score
+            continue
+        try:
+            out = fut.result()
+            new_schema = worker.pred is not pred
+            if new_schema:                      # model ditukar (POST /admin/model/activate) sebelum sampel ini
+                pred = worker.pred
+                encoder = FrameEncoder(pred.feature_cols, pred.threshold, keyframe_every=KEYFRAME_EVERY)
+            if out["ready"] and not scored:
+                scored = True
+                STARTUP.set(time.perf_counter() - T_START, "first_score")
+            payload, frame = record_tick(encoder, writer, ring, nested, vec, out)
+        except Exception as e:
+            ERRORS.inc()
+            await sio.emit("telemetry_error", {"error": str(e)})
+            t += 1
+            continue
+
+        if verbose:                             # replay: ringkasan berkala saja, bukan per tick
+            print(t+1)
+        await emit_tick(encoder, payload, frame, new_schema)
+        t += 1
+
+
+async def publish_drift(worker: InferenceWorker) -> None:
+    """Laporan drift -> metrik + semua client. Statistik dibaca di thread inference, di antara dua sampel."""
+    global drift_report
+    report, version = await worker.call(lambda: (worker.pred.drift_report(), getattr(worker.pred, "version", None)))
+    report["vessel"] = SIM_VESSEL
+    report["version"] = version
+    export_metrics(report, metrics)
+    drift_report = report
+    await sio.emit("drift", report)
+
+@app.get("/drift")
+def get_drift():
+    """Laporan drift terakhir (lihat publish_drift)."""
+    if drift_report is None:
+        return JSONResponse({"error": "no drift report yet"}, status_code=503)
+    return JSONResponse(drift_report)
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
+def get_store_writer(feature_cols: list[str]):
+    """StoreWriter bersama (dibuat sekali), None bila STORE_DIR kosong."""
+    global store_writer
+    if store_writer is None and STORE_DIR:
+        store = TimeSeriesStore(STORE_DIR, feature_cols, raw_days=STORE_RAW_DAYS, rollup_days=STORE_ROLLUP_DAYS)
+        store_writer = StoreWriter(store)
+        atexit.register(store_writer.close)     # antrean terakhir tetap tertulis saat proses berhenti
+    return store_writer
+
+def get_recent_ring(feature_cols: list[str]) -> RecentRing:
+    global recent_ring
+    if recent_ring is None:
+        capacity = max(1, int(HISTORY_RECENT_MIN * 60 * TICK_RATE_HZ))
+        recent_ring = RecentRing(capacity, list(feature_cols) + ["score", "blackout_prob"])
+    return recent_ring
+
+@app.get("/history")
+async def get_history(vessel: str = SIM_VESSEL, series: str = "score", start: float | None = None,
+                      end: float | None = None, points: int = 1000, method: str = "minmax"):
+    """Riwayat satu seri (fitur / score / blackout_prob), start/end epoch detik (default: 1 jam sampai data terbaru)."""
+    if not STORE_DIR:
+        return JSONResponse({"error": "store disabled (STORE_DIR empty)"}, status_code=503)
+    # store dibuka produce_loop / ingest dengan feature_cols model yang berjalan; tidak membaca config.json di sini
+    writer = store_writer
+    if writer is None and inference_worker is not None:
+        writer = get_store_writer(inference_worker.pred.feature_cols)
+    if writer is None:
+        return JSONResponse({"error": "store not open yet (model loading)"}, status_code=503)
+    if not valid_vessel_id(vessel):
+        return JSONResponse({"error": f"invalid vessel id {vessel[:128]!r}"}, status_code=400)
+    if end is None:     # data terbaru (jam simulator bisa mendahului jam dinding)
+        end = float(np.nanmax([time.time(), writer.store.last_ts(vessel) + 1e-3]))
+    start = end - 3600 if start is None else start
+    try:
+        out = await asyncio.to_thread(query_history, writer.store, vessel, series, start, end, points, method)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(out)
+
+async def get_ingest_service() -> IngestService:
+    global ingest_service
+    async with ingest_lock:
+        if ingest_service is None:
+            version = active_version(ARTIFACTS)
+            service = await asyncio.to_thread(IngestService, version_dir(ARTIFACTS, version), None, None, metrics)
+            service.fleet.core.version = version
+            service.writer = get_store_writer(service.fleet.feature_cols)
+            if STATE_DIR:
+                windows = load_windows(state_path("fleet"), window_fingerprint(service.fleet.core), SNAPSHOT_MAX_AGE)
+                service.restore_windows(windows)
+            stats = shadow_stats
+            if stats is not None:           # shadow sudah jalan di simulator: fleet ikut
+                cand, _ = await asyncio.to_thread(load_candidate, ARTIFACTS, stats.version, service.fleet.core)
+                service.set_shadow(cand, stats)
+            ingest_service = service
+    return ingest_service
+
+async def run_ingest(body) -> tuple[dict, int]:
+    """Body request -> (response, status HTTP). Validasi + scoring jalan di thread, bukan di event loop."""
+    try:
+        service = await get_ingest_service()
+        return await asyncio.to_thread(service.handle, body), 200
+    except BatchTooLarge as e:
+        return {"error": str(e)}, 413
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+@app.post("/ingest")
+async def post_ingest(request: Request):
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        return JSONResponse({"error": "body is not valid JSON"}, status_code=400)
+    out, status = await run_ingest(body)
+    return JSONResponse(out, status_code=status)
+
+
+# ---------- Admin: versi model, hot swap, shadow ----------
+def admin_denied(request: Request):
+    if ADMIN_TOKEN and request.headers.get("x-admin-token") != ADMIN_TOKEN:
+        return JSONResponse({"error": "admin token required (X-Admin-Token)"}, status_code=403)
+    return None
+
+async def read_version(request: Request) -> str:
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        raise ValueError("body is not valid JSON")
+    version = body.get("version") if isinstance(body, dict) else None
+    if not isinstance(version, str) or not version:
+        raise ValueError('body must be {"version": "<name>"}')
+    return version
+
+async def load_candidates(version: str):
+    """Kandidat untuk simulator (+ fleet bila ingest aktif), dimuat + divalidasi di thread. Return (sim, fleet, report)."""
+    worker = inference_worker
+    probe = await worker.call(lambda: worker.pred.ring.view().copy())    # window saat ini, disalin di thread inference
+    cand, report = await asyncio.to_thread(load_candidate, ARTIFACTS, version, worker.pred, probe)
+    fleet_cand = None
+    if ingest_service is not None:
+        fleet_cand, _ = await asyncio.to_thread(load_candidate, ARTIFACTS, version, ingest_service.fleet.core)
+    return cand, fleet_cand, report
+
+async def stop_shadow() -> dict | None:
+    global shadow_stats
+    if shadow_stats is None:
+        return None
+    if inference_worker is not None:
+        await inference_worker.set_shadow(None)
+    if ingest_service is not None:
+        await asyncio.to_thread(ingest_service.set_shadow, None)
+    summary, stats, shadow_stats = shadow_stats.summary(), shadow_stats, None
+    stats.close()
+    return summary
+
+def model_error(e: Exception) -> JSONResponse:
+    # ValueError: versi tidak ada / tidak cocok; lainnya: artefak rusak (state_dict, scaler, config)
+    return JSONResponse({"error": str(e)}, status_code=400 if isinstance(e, ValueError) else 422)
+
+@app.get("/admin/model")
+async def get_model(request: Request):
+    if denied := admin_denied(request):
+        return denied
+    worker = inference_worker
+    return JSONResponse({
+        "active": getattr(worker.pred, "version", None) if worker is not None else None,
+        "startup_version": active_version(ARTIFACTS),
+        "versions": list_versions(ARTIFACTS),
+        "shadow": shadow_stats.summary() if shadow_stats is not None else None,
+    })
+
+@app.post("/admin/model/activate")
+async def post_model_activate(request: Request):
+    """{"version": "<nama>"}: muat + validasi di background, tukar di antara dua tick, simpan ke artifacts/ACTIVE."""
+    if denied := admin_denied(request):
+        return denied
+    if inference_worker is None:
+        return JSONResponse({"error": "model not loaded yet"}, status_code=503)
+    async with model_lock:
+        try:
+            version = await read_version(request)
+            cand, fleet_cand, report = await load_candidates(version)
+        except Exception as e:
+            return model_error(e)
+        shadow = await stop_shadow()        # pembanding shadow adalah model lama
+        await inference_worker.swap(cand)
+        if fleet_cand is not None:
+            await asyncio.to_thread(ingest_service.swap, fleet_cand)
+        await asyncio.to_thread(set_active, ARTIFACTS, version)
+    print("Model ditukar ke versi", version, report)
+    return JSONResponse({"active": version, "validation": report, "shadow": shadow})
+
+@app.post("/admin/model/shadow")
+async def post_model_shadow(request: Request):
+    """{"version": "<nama>"}: kandidat menilai window yang sama dengan model aktif, hasil hanya ke statistik."""
+    global shadow_stats
+    if denied := admin_denied(request):
+        return denied
+    if inference_worker is None:
+        return JSONResponse({"error": "model not loaded yet"}, status_code=503)
+    async with model_lock:
+        try:
+            version = await read_version(request)
+            cand, fleet_cand, report = await load_candidates(version)
+            if cand.seq_len != inference_worker.pred.seq_len:
+                raise ValueError("shadow model needs the active seq_len (it scores the same windows)")
+        except Exception as e:
+            return model_error(e)
+        previous = await stop_shadow()
+        log = os.path.join(SHADOW_LOG_DIR, f"{version}.csv") if SHADOW_LOG_DIR else None
+        stats = ShadowStats(version, inference_worker.pred.threshold, cand.threshold, registry=metrics, log_path=log)
+        await inference_worker.set_shadow(cand, stats)
+        if fleet_cand is not None:
+            await asyncio.to_thread(ingest_service.set_shadow, fleet_cand, stats)
+        shadow_stats = stats
+    return JSONResponse({"shadow": version, "validation": report, "previous": previous})
+
+@app.delete("/admin/model/shadow")
+async def delete_model_shadow(request: Request):
+    if denied := admin_denied(request):
+        return denied
+    async with model_lock:
+        summary = await stop_shadow()
+    return JSONResponse({"stopped": summary})
 
 
 @sio.event
 async def connect(sid, environ):
-    global producer_task
     clients.add(sid)
+    CLIENTS.set(len(clients))
     print("Client connected:", sid, " total:", len(clients))
     await sio.emit("server_info", {"msg": "ship AE online"}, to=sid)
 
-    if producer_task is None or producer_task.done():
-        producer_task = asyncio.create_task(produce_loop())
-        print("Producer loop started.")
+    fmt = (parse_qs(environ.get("QUERY_STRING", "")).get("format") or ["frames"])[0]
+    if fmt == "json":
+        await sio.enter_room(sid, "json")
+    else:
+        await sio.enter_room(sid, "frames")
+        need_keyframe.add(sid)             # schema + keyframe dikirim producer pada tick berikutnya
+    if recent_ring is not None and recent_ring.count:
+        await sio.emit("history", recent_ring.message(SIM_VESSEL), to=sid)
+    if drift_report is not None:
+        await sio.emit("drift", drift_report, to=sid)
 
 @sio.event
 async def disconnect(sid):
-    global producer_task
+    # produce_loop tetap jalan tanpa client (dimiliki lifespan), window tetap hangat
     clients.discard(sid)
+    need_keyframe.discard(sid)
+    CLIENTS.set(len(clients))
     print("Client disconnected:", sid, " total:", len(clients))
-    if not clients and producer_task and not producer_task.done():
-        producer_task.cancel()
-        print("Producer loop stopped (no clients).")
+
+@sio.event
+async def frame_resync(sid, data=None):
+    """Client kehilangan frame (seq loncat) -> kirim ulang schema + keyframe pada tick berikutnya."""
+    need_keyframe.add(sid)
+
+@sio.event
+async def explain(sid, data=None):
+    """
+    Top contributor skor terakhir simulator, hasil lewat ack. Tick dengan skor < explain_above x threshold
+    (config.json, default 0.5) mengirim top_contributors kosong; client memintanya lewat event ini.
+    """
+    worker = inference_worker
+    if worker is None:
+        return {"top_contributors": []}
+    return {"top_contributors": await worker.call(lambda: worker.pred.explain_last())}
+
+@sio.event
+async def ingest(sid, data):
+    """Sama dengan POST /ingest; hasil dikirim sebagai ack."""
+    out, _ = await run_ingest(data)
+    return out
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import uvicorn
+    uvicorn.run(asgi_app, host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))